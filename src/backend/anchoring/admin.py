@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import AnchorJob
+
+@admin.register(AnchorJob)
+class AnchorJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'target', 'object_id', 'status', 'attempts', 'next_attempt_at', 'updated_at')
+    list_filter = ('target', 'status')
+    search_fields = ('digest', 'reference')
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,50 @@
+"""
+Anchor backends submit record digests to a chain and return a reference.
+
+A backend receives a batch of AnchorRequest and returns a mapping of request
+key to reference. Requests missing from the mapping are retried later; raising
+AnchorBackendError fails the whole batch. Backends must be idempotent per key:
+resubmitting the same key and digest has to return the same reference, which
+is what makes worker retries and write-back safe.
+"""
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+AnchorRequest = namedtuple('AnchorRequest', ['key', 'digest'])
+
+
+class AnchorBackendError(Exception):
+    pass
+
+
+class BaseAnchorBackend:
+    def submit(self, requests):
+        raise NotImplementedError
+
+
+class FakeAnchorBackend(BaseAnchorBackend):
+    """
+    In-process backend for development and tests.
+
+    References are derived from the digest, so they are stable across retries.
+    Set ``fail_next`` to make the next N submissions raise.
+    """
+    fail_next = 0
+    submitted = []
+
+    def submit(self, requests):
+        if FakeAnchorBackend.fail_next:
+            FakeAnchorBackend.fail_next -= 1
+            raise AnchorBackendError('Simulated backend outage')
+        FakeAnchorBackend.submitted.append([request.key for request in requests])
+        return {
+            request.key: '0x' + hashlib.sha256(f'anchor:{request.digest}'.encode()).hexdigest()
+            for request in requests
+        }
+
+
+def get_backend():
+    return import_string(settings.ANCHOR_BACKEND)()
@@ -0,0 +1,31 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from anchoring import queue
+from anchoring.backends import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Submit pending blockchain anchor jobs in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ANCHOR_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Process ready jobs and exit')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        worker = uuid.uuid4().hex
+        self.stdout.write(f'Anchor worker {worker} using {backend.__class__.__name__}')
+        while True:
+            succeeded, failed = queue.run_once(options['batch_size'], backend=backend, worker=worker)
+            if succeeded or failed:
+                self.stdout.write(f'Anchored {succeeded}, failed {failed}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,45 @@
+from django.db import models
+from django.conf import settings
+
+class AnchorJob(models.Model):
+    TARGETS = [
+        ('PARCEL', 'Land Parcel'),
+        ('TRANSACTION', 'Land Transaction'),
+        ('DOCUMENT', 'Document'),
+    ]
+    STATUSES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+
+    target = models.CharField(max_length=20, choices=TARGETS)
+    object_id = models.BigIntegerField()
+    digest = models.CharField(max_length=64)  # SHA-256 of the record being anchored
+    status = models.CharField(max_length=20, choices=STATUSES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=64, blank=True)
+    reference = models.CharField(max_length=256, blank=True)  # Hash returned by the anchor backend
+    last_error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='anchor_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='anchor_job_ready_idx'),
+            models.Index(fields=['target', 'object_id'], name='anchor_job_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"Anchor {self.target} {self.object_id} ({self.status})"
@@ -0,0 +1,180 @@
+"""
+DB-backed queue of blockchain anchor requests.
+
+Views enqueue a job in the same database transaction as the status change
+they anchor and return immediately. ``run_anchor_worker`` claims ready jobs in
+batches, submits their digests to the configured backend in one call, writes
+the returned reference back onto the record and retries failures with
+exponential backoff.
+"""
+import hashlib
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from documents.models import Document
+from land_management import response_cache
+from land_registry.models import LandParcel, LandTransaction
+from .backends import AnchorBackendError, AnchorRequest, get_backend
+from .models import AnchorJob
+
+# target -> (model, field the backend reference is written to, response cache namespace)
+TARGETS = {
+    'PARCEL': (LandParcel, 'blockchain_hash', 'parcel'),
+    'TRANSACTION': (LandTransaction, 'transaction_hash', None),
+    'DOCUMENT': (Document, 'blockchain_reference', 'document'),
+}
+
+
+def _digest(payload):
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def record_digest(target, obj):
+    if target == 'PARCEL':
+        return _digest({
+            'parcel_id': obj.parcel_id,
+            'owner': obj.current_owner_id,
+            'area': obj.area,
+            'coordinates': obj.coordinates,
+            'status': obj.status,
+        })
+    if target == 'TRANSACTION':
+        entry = getattr(obj, 'ledger_entry', None)
+        if entry is not None:
+            return entry.entry_hash
+        return _digest({
+            'parcel': obj.land_parcel_id,
+            'from_owner': obj.from_owner_id,
+            'to_owner': obj.to_owner_id,
+            'price': obj.price,
+            'status': obj.status,
+        })
+    return _digest({
+        'parcel': obj.land_parcel_id,
+        'title': obj.title,
+        'ipfs_hash': obj.ipfs_hash,
+        'verified_by': obj.verified_by_id,
+    })
+
+
+def enqueue(target, obj, requested_by=None):
+    """Queue ``obj`` for anchoring; an identical pending job is reused."""
+    digest = record_digest(target, obj)
+    existing = AnchorJob.objects.filter(
+        target=target, object_id=obj.pk, digest=digest, status__in=['PENDING', 'RUNNING']
+    ).first()
+    if existing is not None:
+        return existing
+    return AnchorJob.objects.create(
+        target=target,
+        object_id=obj.pk,
+        digest=digest,
+        next_attempt_at=timezone.now(),
+        requested_by=requested_by,
+    )
+
+
+def enqueue_many(target, objects, requested_by=None):
+    now = timezone.now()
+    return AnchorJob.objects.bulk_create([
+        AnchorJob(target=target, object_id=obj.pk, digest=record_digest(target, obj),
+                  next_attempt_at=now, requested_by=requested_by)
+        for obj in objects
+    ], batch_size=1000)
+
+
+def claim_batch(batch_size, worker=None):
+    """
+    Atomically take up to ``batch_size`` ready jobs for ``worker``.
+
+    Jobs whose lock expired (a worker died mid-batch) are ready again. The
+    conditional UPDATE means two workers can never claim the same job.
+    """
+    worker = worker or uuid.uuid4().hex
+    now = timezone.now()
+    ready = (
+        Q(status='PENDING', next_attempt_at__lte=now)
+        | Q(status='RUNNING', locked_until__lt=now)
+    )
+    with transaction.atomic():
+        candidates = list(
+            AnchorJob.objects.filter(ready).order_by('next_attempt_at').values_list('pk', flat=True)[:batch_size]
+        )
+        AnchorJob.objects.filter(ready, pk__in=candidates).update(
+            status='RUNNING',
+            worker=worker,
+            locked_until=now + timedelta(seconds=settings.ANCHOR_LOCK_SECONDS),
+        )
+    return list(AnchorJob.objects.filter(pk__in=candidates, status='RUNNING', worker=worker))
+
+
+def retry_delay(attempts):
+    delay = settings.ANCHOR_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+    return timedelta(seconds=min(delay, settings.ANCHOR_RETRY_MAX_SECONDS))
+
+
+def _fail(job, error, now):
+    job.attempts += 1
+    job.last_error = error
+    job.locked_until = None
+    job.worker = ''
+    if job.attempts >= settings.ANCHOR_MAX_ATTEMPTS:
+        job.status = 'FAILED'
+    else:
+        job.status = 'PENDING'
+        job.next_attempt_at = now + retry_delay(job.attempts)
+
+
+def write_back(job):
+    """Store the job's reference on its record; a no-op if already stored."""
+    model, field, cache_namespace = TARGETS[job.target]
+    updated = model.objects.filter(pk=job.object_id).exclude(**{field: job.reference}).update(**{field: job.reference})
+    # update() skips save signals, so drop cached responses here
+    if updated and cache_namespace:
+        response_cache.invalidate(cache_namespace, job.object_id)
+
+
+def process_batch(jobs, backend=None):
+    """Submit claimed jobs in one backend call and record the outcome."""
+    if not jobs:
+        return 0, 0
+    backend = backend or get_backend()
+    requests = [AnchorRequest(key=str(job.pk), digest=job.digest) for job in jobs]
+    now = timezone.now()
+    try:
+        references = backend.submit(requests)
+        error = 'Backend returned no reference'
+    except AnchorBackendError as exc:
+        references = {}
+        error = str(exc)
+
+    succeeded = 0
+    with transaction.atomic():
+        for job in jobs:
+            reference = references.get(str(job.pk))
+            if reference:
+                job.reference = reference
+                job.status = 'SUCCEEDED'
+                job.attempts += 1
+                job.locked_until = None
+                job.last_error = ''
+                write_back(job)
+                succeeded += 1
+            else:
+                _fail(job, error, now)
+        AnchorJob.objects.bulk_update(
+            jobs, ['reference', 'status', 'attempts', 'locked_until', 'worker', 'last_error', 'next_attempt_at']
+        )
+    return succeeded, len(jobs) - succeeded
+
+
+def run_once(batch_size=None, backend=None, worker=None):
+    jobs = claim_batch(batch_size or settings.ANCHOR_BATCH_SIZE, worker=worker)
+    return process_batch(jobs, backend=backend)
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from .models import AnchorJob
+
+class AnchorJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnchorJob
+        fields = ['id', 'target', 'object_id', 'digest', 'status', 'attempts',
+                 'next_attempt_at', 'reference', 'last_error', 'created_at', 'updated_at']
+        read_only_fields = fields
@@ -0,0 +1,132 @@
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from documents.models import Document
+from documents.storage import LocalChunkStore
+from land_registry.models import LandParcel, LandTransaction
+from .backends import FakeAnchorBackend
+from .models import AnchorJob
+from . import queue
+
+User = get_user_model()
+
+class AnchorQueueTests(APITestCase):
+    def setUp(self):
+        FakeAnchorBackend.fail_next = 0
+        FakeAnchorBackend.submitted = []
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.citizen = User.objects.create_user(
+            username='citizen',
+            password='CitizenPass123!',
+            national_id='citizen123'
+        )
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='ANCHOR1',
+            address='Anchor Road',
+            area=Decimal('10.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.citizen,
+            blockchain_hash=''
+        )
+        self.client.force_authenticate(user=self.officer)
+
+    def test_verify_returns_202_and_worker_writes_back(self):
+        """Test that verification queues a job the worker anchors in a batch"""
+        response = self.client.post(reverse('landparcel-verify', kwargs={'pk': self.land_parcel.pk}))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['job_status'], 'PENDING')
+        self.land_parcel.refresh_from_db()
+        self.assertEqual(self.land_parcel.status, 'ACTIVE')
+        self.assertEqual(self.land_parcel.blockchain_hash, '')
+
+        call_command('run_anchor_worker', once=True, stdout=StringIO())
+
+        job = AnchorJob.objects.get(pk=response.data['job'])
+        self.assertEqual(job.status, 'SUCCEEDED')
+        self.land_parcel.refresh_from_db()
+        self.assertEqual(self.land_parcel.blockchain_hash, job.reference)
+
+        response = self.client.get(response.data['job_url'])
+        self.assertEqual(response.data['status'], 'SUCCEEDED')
+
+    def test_jobs_are_submitted_in_batches(self):
+        """Test that approvals and document verifications share one backend call"""
+        buyer = User.objects.create_user(username='buyer', password='x', national_id='buyer123')
+        transaction = LandTransaction.objects.create(
+            land_parcel=self.land_parcel,
+            from_owner=self.citizen,
+            to_owner=buyer,
+            price=Decimal('10.00')
+        )
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        document = Document.objects.create(
+            title='Deed',
+            document_type='TITLE_DEED',
+            land_parcel=self.land_parcel,
+            uploaded_by=self.citizen,
+            ipfs_hash=LocalChunkStore(root=root.name).put(iter([b'deed'])).cid,
+            blockchain_reference=''
+        )
+        self.client.post(reverse('landtransaction-approve', kwargs={'pk': transaction.pk}))
+        with override_settings(BLOB_STORE_ROOT=root.name):
+            self.client.post(reverse('document-verify-document', kwargs={'pk': document.pk}))
+
+        self.assertEqual(queue.run_once(), (2, 0))
+        self.assertEqual(len(FakeAnchorBackend.submitted), 1)
+        transaction.refresh_from_db()
+        document.refresh_from_db()
+        self.assertTrue(transaction.transaction_hash.startswith('0x'))
+        self.assertTrue(document.blockchain_reference.startswith('0x'))
+
+    @override_settings(ANCHOR_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        """Test retry with backoff and a terminal failure after max attempts"""
+        job = queue.enqueue('PARCEL', self.land_parcel)
+        FakeAnchorBackend.fail_next = 2
+
+        self.assertEqual(queue.run_once(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('PENDING', 1))
+        self.assertGreater(job.next_attempt_at, timezone.now())
+        self.assertEqual(queue.run_once(), (0, 0))  # Not ready until the backoff passes
+
+        AnchorJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+        queue.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+
+    def test_expired_claims_are_retried_idempotently(self):
+        """Test that a job abandoned by a dead worker is reclaimed with the same result"""
+        job = queue.enqueue('PARCEL', self.land_parcel)
+        self.assertEqual(queue.enqueue('PARCEL', self.land_parcel).pk, job.pk)
+        claimed = queue.claim_batch(10, worker='dead-worker')
+        self.assertEqual([claimed_job.pk for claimed_job in claimed], [job.pk])
+        self.assertEqual(queue.claim_batch(10), [])
+
+        AnchorJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(queue.run_once(), (1, 0))
+        queue.process_batch(claimed)  # The dead worker wakes up and finishes late
+        job.refresh_from_db()
+        self.land_parcel.refresh_from_db()
+        self.assertEqual(self.land_parcel.blockchain_hash, job.reference)
+
+    def test_citizens_only_see_their_own_jobs(self):
+        """Test job status scoping by requester"""
+        job = queue.enqueue('PARCEL', self.land_parcel, requested_by=self.officer)
+        self.client.force_authenticate(user=self.citizen)
+        response = self.client.get(reverse('anchorjob-detail', kwargs={'pk': job.pk}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,26 @@
+from rest_framework import viewsets, permissions, status
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from land_management.instrumentation import TimedViewMixin
+from .models import AnchorJob
+from .serializers import AnchorJobSerializer
+
+def accepted(request, job, **extra):
+    """202 response pointing the client at the anchor job status."""
+    return Response({
+        **extra,
+        'job': job.pk,
+        'job_status': job.status,
+        'job_url': reverse('anchorjob-detail', kwargs={'pk': job.pk}, request=request),
+    }, status=status.HTTP_202_ACCEPTED)
+
+class AnchorJobViewSet(TimedViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = AnchorJob.objects.all()
+    serializer_class = AnchorJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    query_budgets = {'list': 3, 'retrieve': 2}
+
+    def get_queryset(self):
+        if self.request.user.user_type == 'ADMIN' or self.request.user.user_type == 'LAND_OFFICER':
+            return AnchorJob.objects.all()
+        return AnchorJob.objects.filter(requested_by=self.request.user)
@@ -0,0 +1,203 @@
+"""
+Concurrent connection capacity of the WSGI and ASGI request paths.
+
+Map and dashboard clients keep many slow connections open at once. Each
+simulated connection here takes ``client_delay`` seconds to deliver its
+request before the application can answer it, then waits for the response.
+Three server paths are driven in-process:
+
+``wsgi``
+    The DRF endpoints through WSGIHandler on a pool of ``workers`` threads,
+    as a threaded WSGI server runs them. A worker is busy for the whole
+    request, slow upload included, so connections beyond the pool queue.
+``asgi``
+    The DRF endpoints through the ASGI application. Waiting on the client
+    costs nothing, but each sync view runs on the sync-to-async thread.
+``asgi-async``
+    The async endpoints under /api/async/ through the ASGI application;
+    no thread is held while a connection waits.
+"""
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+
+from .loadtest import percentile
+
+MODES = ('wsgi', 'asgi', 'asgi-async')
+# (name, DRF path, async path)
+ENDPOINTS = [
+    ('parcels', '/api/land/parcels/', '/api/async/land/parcels/'),
+    ('me', '/api/users/me/', '/api/async/users/me/'),
+]
+
+
+class ThreadSampler:
+    """Records the highest number of live threads while running."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def _sample(self):
+        while not self.stopped.is_set():
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(self.interval)
+
+
+def summarize(results, elapsed, peak_threads):
+    latencies = sorted(round(latency, 3) for latency, _ in results)
+    errors = sum(1 for _, status in results if status is None or status >= 400)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else None,
+        },
+        'peak_threads': peak_threads,
+    }
+
+
+class WSGIDriver:
+    def __init__(self, workers, host='localhost'):
+        self.workers = workers
+        self.host = host
+        self.handler = WSGIHandler()
+
+    def _handle(self, path, token, client_delay):
+        time.sleep(client_delay)  # The worker is tied up while the client trickles its request in
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured['status'] = int(status.split(' ', 1)[0])
+
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'HTTP_AUTHORIZATION': f'Bearer {token}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(b''),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        response = self.handler(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        return captured.get('status')
+
+    def run(self, path, tokens, connections_count, requests, client_delay):
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+
+        def client(offset):
+            results = []
+            for index in range(offset, requests, connections_count):
+                started = time.perf_counter()
+                status = pool.submit(self._handle, path, tokens[index % len(tokens)], client_delay).result()
+                results.append(((time.perf_counter() - started) * 1000, status))
+            return results
+
+        with ThreadSampler() as sampler:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=connections_count) as clients:
+                results = [item for chunk in clients.map(client, range(connections_count)) for item in chunk]
+            elapsed = time.perf_counter() - started
+        # Client threads are the load generator, not server capacity
+        peak = sampler.peak - connections_count
+        pool.submit(connections.close_all).result()
+        pool.shutdown()
+        return summarize(results, elapsed, peak)
+
+
+class ASGIDriver:
+    def __init__(self, application, host='localhost'):
+        self.application = application
+        self.host = host
+
+    async def _request(self, path, token, client_delay):
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', self.host.encode()), (b'authorization', f'Bearer {token}'.encode())],
+            'client': ('127.0.0.1', 50000),
+            'server': (self.host, 80),
+        }
+        finished = asyncio.Event()
+        delivered = False
+        status = None
+
+        async def receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                await asyncio.sleep(client_delay)  # The slow client; no thread waits on it
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                finished.set()
+
+        started = time.perf_counter()
+        await self.application(scope, receive, send)
+        finished.set()
+        return (time.perf_counter() - started) * 1000, status
+
+    async def _run(self, path, tokens, connections_count, requests, client_delay):
+        async def client(offset):
+            return [await self._request(path, tokens[index % len(tokens)], client_delay)
+                    for index in range(offset, requests, connections_count)]
+
+        chunks = await asyncio.gather(*(client(offset) for offset in range(connections_count)))
+        return [item for chunk in chunks for item in chunk]
+
+    def run(self, path, tokens, connections_count, requests, client_delay):
+        with ThreadSampler() as sampler:
+            started = time.perf_counter()
+            results = asyncio.run(self._run(path, tokens, connections_count, requests, client_delay))
+            elapsed = time.perf_counter() - started
+        return summarize(results, elapsed, sampler.peak)
@@ -0,0 +1,144 @@
+"""
+Load driver for the REST API.
+
+Requests go either through Django's test client in this process (the full
+middleware and URL stack, without a socket) or over HTTP to a running server.
+Each endpoint is driven by ``concurrency`` threads for ``requests`` calls and
+reported as throughput plus latency percentiles.
+"""
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.test import Client
+
+ENDPOINTS = [
+    ('token', 'POST', '/api/token/'),
+    ('parcels', 'GET', '/api/land/parcels/'),
+    ('transactions', 'GET', '/api/land/transactions/'),
+    ('documents', 'GET', '/api/documents/documents/'),
+    ('me', 'GET', '/api/users/me/'),
+]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of already sorted ``samples``."""
+    if not samples:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(samples)))
+    return samples[rank - 1]
+
+
+class InProcessTransport:
+    def __init__(self, host='localhost'):
+        self.host = host
+        self.local = threading.local()
+
+    def request(self, method, path, token=None, data=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client(HTTP_HOST=self.host)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if method == 'POST':
+            response = client.post(path, data, content_type='application/json', **headers)
+        else:
+            response = client.get(path, **headers)
+        return response.status_code, response.content
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTransport:
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, token=None, data=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+    def close(self):
+        pass
+
+
+class LoadDriver:
+    def __init__(self, transport, credentials, concurrency=4):
+        """``credentials`` is a list of (username, password) pairs requests rotate through."""
+        self.transport = transport
+        self.credentials = credentials
+        self.concurrency = concurrency
+        self.tokens = []
+
+    def login(self):
+        """Obtain one access token per user before timing starts."""
+        self.tokens = []
+        for username, password in self.credentials:
+            status, body = self.transport.request('POST', '/api/token/', data={
+                'username': username, 'password': password,
+            })
+            if status != 200:
+                raise RuntimeError(f'Login failed for {username}: HTTP {status}')
+            self.tokens.append(json.loads(body)['access'])
+
+    def _call(self, index, method, path):
+        if method == 'POST':
+            username, password = self.credentials[index % len(self.credentials)]
+            args = {'data': {'username': username, 'password': password}}
+        else:
+            args = {'token': self.tokens[index % len(self.tokens)]}
+        started = time.perf_counter()
+        status, _ = self.transport.request(method, path, **args)
+        return round((time.perf_counter() - started) * 1000, 3), status
+
+    def run_endpoint(self, method, path, requests, warmup=0):
+        for index in range(warmup):
+            self._call(index, method, path)
+
+        def worker(offset):
+            results = [self._call(index, method, path) for index in range(offset, requests, self.concurrency)]
+            self.transport.close()
+            return results
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = [item for chunk in pool.map(worker, range(self.concurrency)) for item in chunk]
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in results)
+        statuses = {}
+        for _, status in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            'method': method,
+            'path': path,
+            'requests': len(results),
+            'errors': sum(count for status, count in statuses.items() if int(status) >= 400),
+            'statuses': statuses,
+            'seconds': round(elapsed, 3),
+            'throughput_rps': round(len(results) / elapsed, 2) if elapsed else None,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': latencies[-1] if latencies else None,
+            },
+        }
+
+    def run(self, endpoints, requests, warmup=0):
+        self.login()
+        return {name: self.run_endpoint(method, path, requests, warmup) for name, method, path in endpoints}
@@ -0,0 +1,103 @@
+import json
+import subprocess
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from benchmarks.loadtest import ENDPOINTS, HttpTransport, InProcessTransport, LoadDriver
+from benchmarks.seed import BENCH_PASSWORD, DatasetSeeder
+from users.models import User
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Seed a deterministic dataset and report API throughput and latency percentiles per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--parcels', type=int, default=100000)
+        parser.add_argument('--transactions', type=int, default=100000)
+        parser.add_argument('--documents', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=500, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--clients', type=int, default=20, help='Distinct users requests rotate through')
+        parser.add_argument('--endpoints', help='Comma separated subset of: ' + ', '.join(name for name, _, _ in ENDPOINTS))
+        parser.add_argument('--base-url', help='Drive a running server over HTTP instead of in-process')
+        parser.add_argument('--host', default='localhost', help='Host header for in-process requests')
+        parser.add_argument('--output', help='Write results as JSON to this path')
+        parser.add_argument('--compare', help='Earlier results JSON to print deltas against')
+
+    def handle(self, *args, **options):
+        endpoints = ENDPOINTS
+        if options['endpoints']:
+            wanted = options['endpoints'].split(',')
+            endpoints = [endpoint for endpoint in ENDPOINTS if endpoint[0] in wanted]
+            if not endpoints:
+                raise CommandError(f"No known endpoints in '{options['endpoints']}'")
+
+        seeder = DatasetSeeder(seed=options['seed'], log=lambda message: self.stdout.write(f'seeded {message}'))
+        if seeder.load_users():
+            self.stdout.write(f"Reusing the dataset seeded with --seed {options['seed']}")
+        else:
+            seeder.run(options['users'], options['parcels'], options['transactions'], options['documents'])
+
+        # Mostly citizens, with every staff role represented
+        user_ids = []
+        for role in ('ADMIN', 'LAND_OFFICER', 'NOTARY'):
+            user_ids.extend(seeder.sample_users(role))
+        user_ids.extend(seeder.sample_users('CITIZEN', max(1, options['clients'] - len(user_ids))))
+        usernames = User.objects.filter(pk__in=user_ids).values_list('username', flat=True)
+        credentials = [(username, BENCH_PASSWORD) for username in usernames]
+
+        if options['base_url']:
+            transport = HttpTransport(options['base_url'])
+        else:
+            transport = InProcessTransport(host=options['host'])
+        driver = LoadDriver(transport, credentials, concurrency=options['concurrency'])
+        endpoint_results = driver.run(endpoints, options['requests'], warmup=options['warmup'])
+
+        results = {
+            'generated_at': timezone.now().isoformat(),
+            'revision': git_revision(),
+            'target': options['base_url'] or 'in-process',
+            'dataset': {
+                'seed': options['seed'],
+                'users': User.objects.filter(username__startswith=f"bench{options['seed']}_").count(),
+                'parcels': options['parcels'],
+                'transactions': options['transactions'],
+                'documents': options['documents'],
+            },
+            'concurrency': options['concurrency'],
+            'clients': len(credentials),
+            'endpoints': endpoint_results,
+        }
+        baseline = json.loads(Path(options['compare']).read_text()) if options['compare'] else None
+        self.report(results, baseline)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, results, baseline=None):
+        self.stdout.write(f"{'endpoint':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, result in results['endpoints'].items():
+            latency = result['latency_ms']
+            line = (
+                f"{name:<14}{result['throughput_rps']:>10.1f}{latency['p50']:>10.2f}"
+                f"{latency['p95']:>10.2f}{latency['p99']:>10.2f}{result['errors']:>8}"
+            )
+            previous = (baseline or {}).get('endpoints', {}).get(name)
+            if previous and previous['latency_ms']['p95']:
+                change = (latency['p95'] - previous['latency_ms']['p95']) / previous['latency_ms']['p95'] * 100
+                line += f"   p95 {change:+.1f}% vs {baseline.get('revision') or 'baseline'}"
+            self.stdout.write(line)
@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from benchmarks.asgi import ENDPOINTS, MODES, ASGIDriver, WSGIDriver
+from benchmarks.management.commands.bench_api import git_revision
+from benchmarks.seed import DatasetSeeder
+from land_management.asgi import application
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Hold many slow client connections open against the WSGI, ASGI and async ASGI request paths '
+        'in-process and report throughput, latency percentiles and peak threads for each'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--parcels', type=int, default=5000)
+        parser.add_argument('--transactions', type=int, default=5000)
+        parser.add_argument('--documents', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--connections', type=int, default=200, help='Concurrent client connections')
+        parser.add_argument('--requests', type=int, default=1000, help='Timed requests per endpoint and mode')
+        parser.add_argument('--client-delay', type=float, default=0.05,
+                            help='Seconds each client takes to deliver its request')
+        parser.add_argument('--workers', type=int, default=16, help='Threads of the simulated WSGI server')
+        parser.add_argument('--clients', type=int, default=20, help='Distinct users requests rotate through')
+        parser.add_argument('--modes', help='Comma separated subset of: ' + ', '.join(MODES))
+        parser.add_argument('--endpoints', help='Comma separated subset of: ' + ', '.join(name for name, _, _ in ENDPOINTS))
+        parser.add_argument('--host', default='localhost', help='Host header for requests')
+        parser.add_argument('--output', help='Write results as JSON to this path')
+
+    def handle(self, *args, **options):
+        modes = options['modes'].split(',') if options['modes'] else list(MODES)
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        endpoints = ENDPOINTS
+        if options['endpoints']:
+            wanted = options['endpoints'].split(',')
+            endpoints = [endpoint for endpoint in ENDPOINTS if endpoint[0] in wanted]
+            if not endpoints:
+                raise CommandError(f"No known endpoints in '{options['endpoints']}'")
+
+        seeder = DatasetSeeder(seed=options['seed'], log=lambda message: self.stdout.write(f'seeded {message}'))
+        if seeder.load_users():
+            self.stdout.write(f"Reusing the dataset seeded with --seed {options['seed']}")
+        else:
+            seeder.run(options['users'], options['parcels'], options['transactions'], options['documents'])
+
+        user_ids = []
+        for role in ('ADMIN', 'LAND_OFFICER', 'NOTARY'):
+            user_ids.extend(seeder.sample_users(role))
+        user_ids.extend(seeder.sample_users('CITIZEN', max(1, options['clients'] - len(user_ids))))
+        tokens = [str(AccessToken.for_user(user)) for user in User.objects.filter(pk__in=user_ids)]
+
+        drivers = {
+            'wsgi': WSGIDriver(options['workers'], host=options['host']),
+            'asgi': ASGIDriver(application, host=options['host']),
+            'asgi-async': ASGIDriver(application, host=options['host']),
+        }
+        mode_results = {}
+        for mode in modes:
+            mode_results[mode] = {}
+            for name, path, async_path in endpoints:
+                mode_results[mode][name] = drivers[mode].run(
+                    async_path if mode == 'asgi-async' else path, tokens, options['connections'],
+                    options['requests'], options['client_delay'],
+                )
+
+        results = {
+            'generated_at': timezone.now().isoformat(),
+            'revision': git_revision(),
+            'connections': options['connections'],
+            'client_delay': options['client_delay'],
+            'wsgi_workers': options['workers'],
+            'clients': len(tokens),
+            'modes': mode_results,
+        }
+        self.report(results)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'mode':<12}{'endpoint':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'threads':>9}{'errors':>8}"
+        )
+        for mode, endpoints in results['modes'].items():
+            for name, result in endpoints.items():
+                latency = result['latency_ms']
+                self.stdout.write(
+                    f"{mode:<12}{name:<10}{result['throughput_rps']:>10.1f}{latency['p50']:>10.2f}"
+                    f"{latency['p95']:>10.2f}{result['peak_threads']:>9}{result['errors']:>8}"
+                )
@@ -0,0 +1,121 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from benchmarks.seed import DatasetSeeder
+from documents.views import DocumentViewSet
+from land_management.scoping import viewset_queryset
+from land_registry.models import LandTransaction
+from land_registry.views import LandParcelViewSet, LandTransactionViewSet
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+def full_scans(plan):
+    """Plan lines reading a whole table without an index."""
+    lines = []
+    for line in plan.splitlines():
+        text = line.strip()
+        if connection.vendor == 'sqlite':
+            if ' SCAN ' in f' {text} ' and 'USING' not in text and 'SUBQUERY' not in text:
+                lines.append(text)
+        elif 'Seq Scan' in text:
+            lines.append(text)
+    return lines
+
+
+class Command(BaseCommand):
+    help = 'Seed a dataset, record EXPLAIN plans and timings of role-scoped queries, and flag full scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--parcels', type=int, default=200000)
+        parser.add_argument('--transactions', type=int, default=200000)
+        parser.add_argument('--documents', type=int, default=200000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Write results as JSON to this path')
+        parser.add_argument('--check', action='store_true',
+                            help='Exit with an error if any scoped query plan scans a whole table')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded rows instead of rolling back')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                results = self.run(options)
+                if not options['keep']:
+                    raise Rollback
+        except Rollback:
+            pass
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+
+        regressions = [scenario['name'] for scenario in results['scenarios'] if scenario['full_scans']]
+        if regressions and options['check']:
+            raise CommandError(f"Full table scans in: {', '.join(regressions)}")
+
+    def run(self, options):
+        started = time.monotonic()
+        seeder = DatasetSeeder(seed=options['seed'], log=lambda message: self.stdout.write(f'seeded {message}'))
+        seeder.run(options['users'], options['parcels'], options['transactions'], options['documents'])
+        self.stdout.write(f'Seeding took {time.monotonic() - started:.1f}s')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        admin = User.objects.get(pk=seeder.sample_users('ADMIN')[0])
+        citizen = User.objects.get(pk=seeder.sample_users('CITIZEN')[0])
+        scenarios = [
+            ('parcels: admin list', viewset_queryset(LandParcelViewSet, admin)),
+            ('parcels: citizen list', viewset_queryset(LandParcelViewSet, citizen)),
+            ('transactions: admin list', viewset_queryset(LandTransactionViewSet, admin)),
+            ('transactions: citizen list', viewset_queryset(LandTransactionViewSet, citizen)),
+            ('transactions: pending queue', LandTransaction.objects.filter(status='PENDING')),
+            ('documents: admin list', viewset_queryset(DocumentViewSet, admin)),
+            ('documents: citizen list', viewset_queryset(DocumentViewSet, citizen)),
+        ]
+
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        results = {
+            'generated_at': timezone.now().isoformat(),
+            'vendor': connection.vendor,
+            'dataset': {key: options[key] for key in ('users', 'parcels', 'transactions', 'documents', 'seed')},
+            'scenarios': [],
+        }
+        for name, queryset in scenarios:
+            page = queryset[:page_size]
+            plan = page.explain()
+            page_ms = self.time_ms(lambda: list(page.all()), options['repeat'])
+            count_ms = self.time_ms(queryset.count, options['repeat'])
+            scans = full_scans(plan)
+            results['scenarios'].append({
+                'name': name,
+                'sql': str(page.query),
+                'plan': plan,
+                'first_page_ms': page_ms,
+                'count_ms': count_ms,
+                'full_scans': scans,
+            })
+            flag = self.style.ERROR(' FULL SCAN') if scans else ''
+            self.stdout.write(f'{name:<32} page {page_ms:8.2f} ms   count {count_ms:8.2f} ms{flag}')
+        return results
+
+    def time_ms(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return round(statistics.median(samples), 3)
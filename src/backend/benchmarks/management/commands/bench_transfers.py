@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from benchmarks.management.commands.bench_api import git_revision
+from benchmarks.transfers import TransferStress
+
+
+class Command(BaseCommand):
+    help = (
+        'Approve competing transfers of the same parcels from many threads at once, check that exactly '
+        'one wins per parcel and report throughput. Writes its users, parcels and ledger entries to the '
+        'database, so run it against a scratch database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parcels', type=int, default=20)
+        parser.add_argument('--contenders', type=int, default=4, help='Competing transfers per parcel per round')
+        parser.add_argument('--repeats', type=int, default=2, help='Times each transfer is approved')
+        parser.add_argument('--rounds', type=int, default=3)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write results as JSON to this path')
+        parser.add_argument('--check', action='store_true', help='Fail if any invariant was violated')
+
+    def handle(self, *args, **options):
+        stress = TransferStress(
+            parcels=options['parcels'], contenders=options['contenders'], repeats=options['repeats'],
+            rounds=options['rounds'], threads=options['threads'], seed=options['seed'],
+            log=self.stdout.write,
+        )
+        results = {'generated_at': timezone.now().isoformat(), 'revision': git_revision(), **stress.run()}
+
+        latency = results['latency_ms']
+        self.stdout.write(
+            f"{results['attempts']} approvals in {results['seconds']}s: "
+            f"{results['attempts_per_second']} attempts/s, {results['approvals_per_second']} transfers/s, "
+            f"p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms"
+        )
+        for outcome, count in sorted(results['outcomes'].items()):
+            self.stdout.write(f'  {outcome}: {count}')
+        self.stdout.write(f"  retried after lock timeouts: {results['retries']}")
+        for violation in results['violations']:
+            self.stderr.write(self.style.ERROR(violation))
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['check'] and results['violations']:
+            raise CommandError(f"{len(results['violations'])} invariant violations")
+        if not results['violations']:
+            self.stdout.write(self.style.SUCCESS('Every parcel moved exactly once per round'))
@@ -0,0 +1,208 @@
+"""
+Deterministic data generator for benchmarks.
+
+The same ``seed`` always produces the same users, parcels, transactions and
+documents, so numbers from different commits are comparable. Rows are written
+with bulk_create in batches and only integer ids are kept between phases, so
+millions of rows can be generated without holding model instances in memory.
+"""
+import math
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from documents.models import Document
+from documents.search import DOCUMENT_INDEX, document_row
+from land_registry import geometry, ownership, rollups, spatial
+from land_registry.models import LandParcel, LandTransaction
+from land_registry.search import PARCEL_INDEX, parcel_row
+
+User = get_user_model()
+
+BENCH_PASSWORD = 'BenchPass123!'
+# Share of users per role; the remainder are citizens
+ROLE_SHARES = [('ADMIN', 0.002), ('LAND_OFFICER', 0.02), ('NOTARY', 0.02)]
+TRANSACTION_STATUSES = [('COMPLETED', 0.6), ('PENDING', 0.25), ('REJECTED', 0.1), ('CANCELLED', 0.05)]
+# Mainland Tanzania, (min_lng, min_lat, max_lng, max_lat)
+REGION = (29.3, -11.7, 40.4, -1.0)
+HISTORY_DAYS = 5 * 365
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Let bulk_create keep explicit values for auto_now_add fields."""
+    previous = [(field, field.auto_now_add) for field in fields]
+    for field, _ in previous:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in previous:
+            field.auto_now_add = value
+
+
+def _weighted(rng, choices):
+    roll = rng.random()
+    for value, weight in choices:
+        if roll < weight:
+            return value
+        roll -= weight
+    return choices[-1][0]
+
+
+def _square(rng, lng, lat):
+    size = rng.uniform(0.0002, 0.002)
+    return {'type': 'Polygon', 'coordinates': [[
+        [lng, lat], [lng + size, lat], [lng + size, lat + size], [lng, lat + size], [lng, lat],
+    ]]}
+
+
+class DatasetSeeder:
+    def __init__(self, seed=0, batch_size=5000, log=None):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.start = timezone.now() - timedelta(days=HISTORY_DAYS)
+        self.users_by_role = {}
+        self.parcel_ids = array('q')
+        self.parcel_owners = array('q')
+        self.parcel_days = array('l')
+
+    def _date(self, min_day=0):
+        day = self.rng.uniform(min_day, HISTORY_DAYS)
+        return self.start + timedelta(days=day), int(day)
+
+    def seed_users(self, count):
+        password = make_password(BENCH_PASSWORD)
+        roles = []
+        for role, share in ROLE_SHARES:
+            roles.extend([role] * max(1, math.ceil(count * share)))
+        roles.extend(['CITIZEN'] * max(1, count - len(roles)))
+        for start in range(0, len(roles), self.batch_size):
+            batch = [
+                User(
+                    username=f'bench{self.seed}_{index}',
+                    password=password,
+                    email=f'bench{self.seed}_{index}@example.com',
+                    user_type=role,
+                    national_id=f'B{self.seed}-{index}',
+                    is_verified=self.rng.random() < 0.8,
+                )
+                for index, role in enumerate(roles[start:start + self.batch_size], start=start)
+            ]
+            for user in User.objects.bulk_create(batch):
+                self.users_by_role.setdefault(user.user_type, []).append(user.pk)
+        self.log(f'users: {len(roles)}')
+
+    def seed_parcels(self, count):
+        citizens = self.users_by_role['CITIZEN']
+        field = LandParcel._meta.get_field('registration_date')
+        with manual_dates(field):
+            for start in range(0, count, self.batch_size):
+                batch = []
+                for index in range(start, min(start + self.batch_size, count)):
+                    registered, day = self._date()
+                    parcel = LandParcel(
+                        parcel_id=f'B{self.seed}-P{index}',
+                        address=f'Plot {index}, Block {self.rng.randint(1, 999)}, Ward {self.rng.randint(1, 400)}',
+                        coordinates=_square(
+                            self.rng,
+                            self.rng.uniform(REGION[0], REGION[2]),
+                            self.rng.uniform(REGION[1], REGION[3]),
+                        ),
+                        current_owner_id=self.rng.choice(citizens),
+                        registration_date=registered,
+                        blockchain_hash=f'0x{self.rng.getrandbits(128):032x}',
+                        status=_weighted(self.rng, [('ACTIVE', 0.7), ('PENDING', 0.25), ('INACTIVE', 0.05)]),
+                    )
+                    parcel.update_bounding_box()
+                    batch.append(parcel)
+                    self.parcel_days.append(day)
+                # Measure the batch's boundaries in one pass; recorded areas match them
+                geometry.update_geometries(batch)
+                for parcel in batch:
+                    parcel.area = Decimal(f'{parcel.shape_area:.2f}')
+                created = LandParcel.objects.bulk_create(batch)
+                spatial.index_parcels(created, replace=False)
+                ownership.open_intervals(created)
+                PARCEL_INDEX.update(parcel_row(parcel) for parcel in created)
+                for parcel in created:
+                    self.parcel_ids.append(parcel.pk)
+                    self.parcel_owners.append(parcel.current_owner_id)
+        self.log(f'parcels: {count}')
+
+    def seed_transactions(self, count):
+        citizens = self.users_by_role['CITIZEN']
+        field = LandTransaction._meta.get_field('transaction_date')
+        with manual_dates(field):
+            for start in range(0, count, self.batch_size):
+                batch = []
+                for _ in range(start, min(start + self.batch_size, count)):
+                    slot = self.rng.randrange(len(self.parcel_ids))
+                    transaction_date, _ = self._date(self.parcel_days[slot])
+                    batch.append(LandTransaction(
+                        land_parcel_id=self.parcel_ids[slot],
+                        from_owner_id=self.parcel_owners[slot],
+                        to_owner_id=self.rng.choice(citizens),
+                        transaction_date=transaction_date,
+                        transaction_hash=f'0x{self.rng.getrandbits(128):032x}',
+                        price=Decimal(self.rng.randint(1000, 50000000)) / 100,
+                        status=_weighted(self.rng, TRANSACTION_STATUSES),
+                    ))
+                LandTransaction.objects.bulk_create(batch)
+        # bulk_create skips the signals that maintain the rollups
+        rollups.rebuild()
+        self.log(f'transactions: {count}')
+
+    def seed_documents(self, count):
+        officers = self.users_by_role['LAND_OFFICER']
+        types = [choice for choice, _ in Document.DOCUMENT_TYPES]
+        field = Document._meta.get_field('upload_date')
+        with manual_dates(field):
+            for start in range(0, count, self.batch_size):
+                batch = []
+                for index in range(start, min(start + self.batch_size, count)):
+                    slot = self.rng.randrange(len(self.parcel_ids))
+                    upload_date, _ = self._date(self.parcel_days[slot])
+                    verified = self.rng.random() < 0.6
+                    batch.append(Document(
+                        title=f'{self.rng.choice(types).replace("_", " ").title()} {index}',
+                        document_type=self.rng.choice(types),
+                        land_parcel_id=self.parcel_ids[slot],
+                        uploaded_by_id=self.parcel_owners[slot],
+                        upload_date=upload_date,
+                        ipfs_hash=f'Qm{self.rng.getrandbits(256):064x}'[:46],
+                        blockchain_reference=f'0x{self.rng.getrandbits(128):032x}',
+                        is_verified=verified,
+                        verification_date=upload_date + timedelta(days=1) if verified else None,
+                        verified_by_id=self.rng.choice(officers) if verified else None,
+                        metadata={'pages': self.rng.randint(1, 40)},
+                    ))
+                created = Document.objects.bulk_create(batch)
+                DOCUMENT_INDEX.update(document_row(document) for document in created)
+        self.log(f'documents: {count}')
+
+    def run(self, users, parcels, transactions, documents):
+        self.seed_users(users)
+        self.seed_parcels(parcels)
+        self.seed_transactions(transactions)
+        self.seed_documents(documents)
+        return self
+
+    def load_users(self):
+        """Pick up users seeded earlier with the same seed; False if there are none."""
+        rows = User.objects.filter(username__startswith=f'bench{self.seed}_').values_list('pk', 'user_type')
+        for pk, role in rows.order_by('pk').iterator():
+            self.users_by_role.setdefault(role, []).append(pk)
+        return bool(self.users_by_role)
+
+    def sample_users(self, role, count=1):
+        pool = self.users_by_role.get(role, [])
+        return [pool[self.rng.randrange(len(pool))] for _ in range(count)] if pool else []
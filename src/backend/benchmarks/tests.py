@@ -0,0 +1,82 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from land_registry.models import LandParcel
+
+
+class QueryPlanBenchmarkTests(TestCase):
+    def test_role_scoped_queries_use_indexes(self):
+        """Test that every scoped query plan avoids a full table scan and the dataset is rolled back"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'plans.json'
+            call_command(
+                'bench_query_plans', users=60, parcels=300, transactions=300, documents=300,
+                repeat=1, output=str(output), check=True, stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+
+        self.assertEqual(len(results['scenarios']), 7)
+        for scenario in results['scenarios']:
+            self.assertEqual(scenario['full_scans'], [], scenario['plan'])
+        self.assertFalse(LandParcel.objects.exists())
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class ApiBenchmarkTests(TransactionTestCase):
+    def test_reports_every_endpoint(self):
+        """Test that the load benchmark drives each API route and writes percentiles"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'api.json'
+            call_command(
+                'bench_api', users=30, parcels=50, transactions=50, documents=50, requests=6,
+                warmup=0, concurrency=2, clients=3, output=str(output), stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+
+        self.assertEqual(set(results['endpoints']), {'token', 'parcels', 'transactions', 'documents', 'me'})
+        for result in results['endpoints'].values():
+            self.assertEqual(result['requests'], 6)
+            self.assertEqual(result['errors'], 0)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+
+
+class TransferStressTests(TransactionTestCase):
+    def test_competing_approvals_move_each_parcel_once(self):
+        """Test that concurrent approvals of competing transfers leave one winner per parcel"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'transfers.json'
+            call_command(
+                'bench_transfers', parcels=4, contenders=3, rounds=2, threads=4, output=str(output),
+                check=True, stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+
+        self.assertEqual(results['violations'], [])
+        self.assertEqual(results['attempts'], 4 * 3 * 2 * 2)
+        self.assertEqual(results['outcomes']['approved'], 4 * 2)
+        self.assertFalse([outcome for outcome in results['outcomes'] if outcome.startswith('error')])
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class AsgiBenchmarkTests(TransactionTestCase):
+    def test_reports_every_mode(self):
+        """Test that the connection benchmark drives the WSGI, ASGI and async paths without errors"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'asgi.json'
+            call_command(
+                'bench_asgi', users=30, parcels=50, transactions=50, documents=50, connections=4,
+                requests=8, client_delay=0, workers=2, clients=3, output=str(output), stdout=StringIO(),
+            )
+            results = json.loads(output.read_text())
+
+        self.assertEqual(set(results['modes']), {'wsgi', 'asgi', 'asgi-async'})
+        for endpoints in results['modes'].values():
+            self.assertEqual(set(endpoints), {'parcels', 'me'})
+            for result in endpoints.values():
+                self.assertEqual(result['requests'], 8)
+                self.assertEqual(result['errors'], 0)
@@ -0,0 +1,181 @@
+"""
+Contention stress test for the transfer engine (land_registry.transfers).
+
+Each round opens several competing pending transfers out of every parcel's
+current owner and has a pool of threads, each with its own database
+connection, approve all of them at once, every transfer more than once.
+Afterwards it checks that exactly one transfer per parcel won, that the
+parcel, its ownership history and the ledger all agree with the winner and
+that the ledger is still one unbroken chain. Run it against PostgreSQL to see
+real row-lock contention; SQLite takes one writer at a time.
+"""
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections
+
+from land_registry import ledger, transfers
+from land_registry.models import LandParcel, LandTransaction, LedgerEntry, OwnershipInterval
+from .loadtest import percentile
+
+User = get_user_model()
+
+MAX_RETRIES = 8
+RETRY_DELAY = 0.005  # Seconds; doubled on each retry and jittered
+
+
+class TransferStress:
+    def __init__(self, parcels=20, contenders=4, repeats=2, rounds=3, threads=8, seed=0, log=None):
+        self.parcel_count = parcels
+        self.contenders = contenders
+        self.repeats = repeats
+        self.rounds = rounds
+        self.threads = threads
+        self.rng = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.tag = uuid.uuid4().hex[:8]
+
+    def _user(self, name, user_type='CITIZEN'):
+        username = f'xfer{self.tag}_{name}'
+        return User.objects.create_user(username=username, password=None, user_type=user_type,
+                                        national_id=username[-20:])
+
+    def setup(self):
+        self.officer = self._user('officer', 'LAND_OFFICER')
+        self.buyers = [self._user(f'buyer{index}') for index in range(self.contenders + 1)]
+        self.parcels = [
+            LandParcel.objects.create(
+                parcel_id=f'XFER{self.tag}-{index}',
+                address=f'Stress Plot {index}',
+                area=Decimal('1000.00'),
+                coordinates={'lat': 0.0, 'lng': 0.0},
+                current_owner=self._user(f'owner{index}'),
+                blockchain_hash='0xstress',
+            )
+            for index in range(self.parcel_count)
+        ]
+
+    def open_transfers(self):
+        """Competing pending transfers out of every parcel's current owner, by parcel id."""
+        pending = {}
+        for parcel in LandParcel.objects.filter(pk__in=[parcel.pk for parcel in self.parcels]):
+            buyers = [buyer for buyer in self.buyers if buyer.pk != parcel.current_owner_id]
+            pending[parcel.pk] = (parcel.version, [
+                LandTransaction.objects.create(
+                    land_parcel=parcel,
+                    from_owner_id=parcel.current_owner_id,
+                    to_owner=buyer,
+                    transaction_hash=f'0x{self.rng.getrandbits(128):032x}',
+                    price=Decimal(self.rng.randint(1000, 1000000)),
+                ).pk
+                for buyer in buyers[:self.contenders]
+            ])
+        return pending
+
+    def _approve(self, transaction_id):
+        started = time.perf_counter()
+        retries = 0
+        while True:
+            try:
+                transfers.approve(LandTransaction.objects.get(pk=transaction_id), self.officer)
+                outcome = 'approved'
+            except transfers.TransferConflict as exc:
+                outcome = exc.code
+            except OperationalError as exc:
+                # Lock timeouts roll the whole approval back; retry as a client would
+                if retries < MAX_RETRIES:
+                    retries += 1
+                    time.sleep(RETRY_DELAY * 2 ** retries * random.random())
+                    continue
+                outcome = f'error: {type(exc).__name__}: {exc}'
+            except Exception as exc:
+                outcome = f'error: {type(exc).__name__}: {exc}'
+            return (time.perf_counter() - started) * 1000, outcome, retries
+
+    def run_round(self, pending):
+        tasks = [pk for _, transaction_ids in pending.values() for pk in transaction_ids] * self.repeats
+        self.rng.shuffle(tasks)
+
+        def worker(offset):
+            results = [self._approve(pk) for pk in tasks[offset::self.threads]]
+            connections.close_all()
+            return results
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            results = [item for chunk in pool.map(worker, range(self.threads)) for item in chunk]
+        return results, time.perf_counter() - started
+
+    def check(self, pending):
+        """Invariant violations after a round, as messages."""
+        violations = []
+        parcels = LandParcel.objects.in_bulk(pending)
+        for parcel_id, (version, transaction_ids) in pending.items():
+            parcel = parcels[parcel_id]
+            completed = list(LandTransaction.objects.filter(pk__in=transaction_ids, status='COMPLETED'))
+            if len(completed) != 1:
+                violations.append(f'parcel {parcel_id}: {len(completed)} transfers completed')
+                continue
+            winner = completed[0]
+            if parcel.current_owner_id != winner.to_owner_id:
+                violations.append(f'parcel {parcel_id}: owner {parcel.current_owner_id}, winner sold to {winner.to_owner_id}')
+            if parcel.version != version + 1:
+                violations.append(f'parcel {parcel_id}: version {parcel.version}, expected {version + 1}')
+            open_owners = list(OwnershipInterval.objects.filter(parcel_id=parcel_id, valid_to__isnull=True)
+                               .values_list('owner_id', flat=True))
+            if open_owners != [winner.to_owner_id]:
+                violations.append(f'parcel {parcel_id}: open ownership intervals for {open_owners}')
+            if LedgerEntry.objects.filter(transaction_id__in=transaction_ids).values_list(
+                    'transaction_id', flat=True).distinct().count() != 1:
+                violations.append(f'parcel {parcel_id}: ledger does not hold exactly the winning transfer')
+        broken = ledger.verify_entry_chain()
+        if broken is not None:
+            violations.append(f'ledger chain breaks at sequence {broken}')
+        return violations
+
+    def run(self):
+        self.setup()
+        outcomes = {}
+        latencies = []
+        retries = 0
+        seconds = 0
+        violations = []
+        for number in range(1, self.rounds + 1):
+            pending = self.open_transfers()
+            results, elapsed = self.run_round(pending)
+            seconds += elapsed
+            for latency, outcome, retried in results:
+                latencies.append(latency)
+                retries += retried
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            round_violations = self.check(pending)
+            violations.extend(f'round {number}: {message}' for message in round_violations)
+            self.log(f'round {number}: {len(results)} approvals in {elapsed:.2f}s, '
+                     f'{len(round_violations)} violations')
+
+        latencies.sort()
+        attempts = len(latencies)
+        return {
+            'parcels': self.parcel_count,
+            'contenders': self.contenders,
+            'repeats': self.repeats,
+            'rounds': self.rounds,
+            'threads': self.threads,
+            'attempts': attempts,
+            'outcomes': outcomes,
+            'retries': retries,
+            'seconds': round(seconds, 3),
+            'attempts_per_second': round(attempts / seconds, 2) if seconds else None,
+            'approvals_per_second': round(outcomes.get('approved', 0) / seconds, 2) if seconds else None,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 3) if latencies else None,
+                'p95': round(percentile(latencies, 95), 3) if latencies else None,
+                'p99': round(percentile(latencies, 99), 3) if latencies else None,
+                'max': round(latencies[-1], 3) if latencies else None,
+            },
+            'violations': violations,
+        }
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import ChangeEvent
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(admin.ModelAdmin):
+    list_display = ('seq', 'entity', 'object_id', 'action', 'actor', 'created_at')
+    list_filter = ('entity', 'action')
+    readonly_fields = ('seq', 'entity', 'object_id', 'action', 'fields', 'actor',
+                       'owner_id', 'counterparty_id', 'created_at')
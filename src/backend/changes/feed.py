@@ -0,0 +1,136 @@
+"""
+Sequenced change log of parcels, transactions, documents and users.
+
+Every create, update, delete, verify and approve writes a ChangeEvent in the
+same database transaction as the change, so the feed never shows a change
+that rolled back. Events are numbered by ``seq``; clients keep the last seq
+they saw and ask for what came after it.
+
+The highest seq is kept in the cache once a write commits. A poll at or past
+that head is answered without touching the database, so idle clients polling
+often cost one cache read each. The head is a hint: it expires after
+CHANGES_HEAD_TIMEOUT, so a value briefly set back by concurrent commits
+corrects itself.
+
+Events become readable CHANGES_SETTLE_SECONDS after they are written. Seqs are
+handed out at insert time, so on databases with concurrent writers a
+transaction can commit after one holding a higher seq. The delay stops a
+reader from moving past the lower seq before it is visible.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from documents.models import Document
+from land_management.response_cache import STAFF_TYPES
+from land_registry.models import LandParcel, LandTransaction
+from .models import ChangeEvent
+
+User = get_user_model()
+
+HEAD_KEY = 'changes:head'
+
+
+def entity_of(instance):
+    return {
+        LandParcel: 'PARCEL',
+        LandTransaction: 'TRANSACTION',
+        Document: 'DOCUMENT',
+        User: 'USER',
+    }.get(type(instance))
+
+
+def audience(instance):
+    """(owner_id, counterparty_id) of the non-staff users who may see the change."""
+    if isinstance(instance, LandParcel):
+        return instance.current_owner_id, None
+    if isinstance(instance, LandTransaction):
+        return instance.from_owner_id, instance.to_owner_id
+    if isinstance(instance, Document):
+        return instance.uploaded_by_id, None
+    return instance.pk, None
+
+
+def mark(instance, action, actor=None):
+    """Record the next save of ``instance`` as ``action`` by ``actor`` rather than a plain update."""
+    instance._change_action = action
+    instance._change_actor = actor
+
+
+def _event(instance, action, fields=None, actor=None):
+    owner_id, counterparty_id = audience(instance)
+    return ChangeEvent(
+        entity=entity_of(instance),
+        object_id=instance.pk,
+        action=action,
+        fields=fields,
+        actor=actor,
+        owner_id=owner_id,
+        counterparty_id=counterparty_id,
+    )
+
+
+def record(instance, action, fields=None, actor=None, using='default'):
+    event = _event(instance, action, fields, actor)
+    event.save(using=using)
+    publish(event.seq, using=using)
+    return event
+
+
+def record_many(instances, action, actor=None, using='default'):
+    events = ChangeEvent.objects.using(using).bulk_create(
+        [_event(instance, action, actor=actor) for instance in instances], batch_size=1000
+    )
+    if events:
+        # bulk_create does not return ids on every backend
+        publish(max(event.seq or 0 for event in events) or None, using=using)
+    return events
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def publish(seq, using='default'):
+    def advance():
+        cache = get_cache()
+        if seq is None:
+            cache.delete(HEAD_KEY)
+        elif (cache.get(HEAD_KEY) or 0) < seq:
+            cache.set(HEAD_KEY, seq, settings.CHANGES_HEAD_TIMEOUT)
+    transaction.on_commit(advance, using=using)
+
+
+def head():
+    """Highest committed seq, from the cache when possible."""
+    cache = get_cache()
+    value = cache.get(HEAD_KEY)
+    if value is None:
+        value = ChangeEvent.objects.aggregate(head=Max('seq'))['head'] or 0
+        cache.add(HEAD_KEY, value, settings.CHANGES_HEAD_TIMEOUT)
+    return value
+
+
+def visible_to(user, since=0):
+    """Events after ``since`` that ``user`` may see."""
+    events = ChangeEvent.objects.filter(seq__gt=since)
+    if getattr(user, 'user_type', None) in STAFF_TYPES:
+        return events
+    # A UNION of two index searches instead of an OR that defeats both indexes
+    involved = events.filter(owner_id=user.pk).order_by().values('seq').union(
+        events.filter(counterparty_id=user.pk).order_by().values('seq')
+    )
+    return ChangeEvent.objects.filter(seq__in=involved)
+
+
+def read(user, since, limit):
+    """Up to ``limit`` settled events after ``since`` that ``user`` may see, oldest first."""
+    if since >= head():
+        return []
+    settled = timezone.now() - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+    return list(visible_to(user, since).filter(created_at__lte=settled).order_by('seq')[:limit])
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 08:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('PARCEL', 'Land Parcel'), ('TRANSACTION', 'Land Transaction'), ('DOCUMENT', 'Document'), ('USER', 'User')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('CREATED', 'Created'), ('UPDATED', 'Updated'), ('DELETED', 'Deleted'), ('VERIFIED', 'Verified'), ('APPROVED', 'Approved')], max_length=20)),
+                ('fields', models.JSONField(blank=True, null=True)),
+                ('owner_id', models.BigIntegerField(blank=True, null=True)),
+                ('counterparty_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['owner_id', 'seq'], name='change_owner_seq_idx'), models.Index(fields=['counterparty_id', 'seq'], name='change_counterparty_seq_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('changes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changeevent',
+            name='action',
+            field=models.CharField(choices=[('CREATED', 'Created'), ('UPDATED', 'Updated'), ('DELETED', 'Deleted'), ('VERIFIED', 'Verified'), ('APPROVED', 'Approved'), ('DISPUTED', 'Disputed')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import models
+from django.conf import settings
+
+class ChangeEvent(models.Model):
+    ENTITIES = [
+        ('PARCEL', 'Land Parcel'),
+        ('TRANSACTION', 'Land Transaction'),
+        ('DOCUMENT', 'Document'),
+        ('USER', 'User'),
+    ]
+    ACTIONS = [
+        ('CREATED', 'Created'),
+        ('UPDATED', 'Updated'),
+        ('DELETED', 'Deleted'),
+        ('VERIFIED', 'Verified'),
+        ('APPROVED', 'Approved'),
+        ('DISPUTED', 'Disputed'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)  # Position in the feed; clients resume from it
+    entity = models.CharField(max_length=20, choices=ENTITIES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=20, choices=ACTIONS)
+    fields = models.JSONField(null=True, blank=True)  # Fields written by an update, when known
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    # Non-staff users see events where they are the owner or counterparty
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    counterparty_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['owner_id', 'seq'], name='change_owner_seq_idx'),
+            models.Index(fields=['counterparty_id', 'seq'], name='change_counterparty_seq_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.entity} {self.object_id} {self.action}"
@@ -0,0 +1,7 @@
+from rest_framework import serializers
+from .models import ChangeEvent
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChangeEvent
+        fields = ['seq', 'entity', 'object_id', 'action', 'fields', 'actor', 'created_at']
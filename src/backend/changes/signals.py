@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+
+from documents.models import Document
+from land_registry.models import LandParcel, LandTransaction
+from . import feed
+
+User = get_user_model()
+
+
+def record_save(sender, instance, created, raw=False, update_fields=None, using='default', **kwargs):
+    if raw:
+        return
+    if created:
+        action, fields = 'CREATED', None
+    else:
+        action = getattr(instance, '_change_action', 'UPDATED')
+        fields = sorted(update_fields) if update_fields else None
+    actor = instance.__dict__.pop('_change_actor', None)
+    instance.__dict__.pop('_change_action', None)
+    feed.record(instance, action, fields=fields, actor=actor, using=using)
+
+
+def record_delete(sender, instance, using='default', **kwargs):
+    feed.record(instance, 'DELETED', using=using)
+
+
+for model in (LandParcel, LandTransaction, Document, User):
+    post_save.connect(record_save, sender=model, dispatch_uid=f'changes_save_{model._meta.label_lower}')
+    post_delete.connect(record_delete, sender=model, dispatch_uid=f'changes_delete_{model._meta.label_lower}')
@@ -0,0 +1,99 @@
+import json
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from land_registry.models import LandParcel
+from .models import ChangeEvent
+
+User = get_user_model()
+
+
+@override_settings(CHANGES_SETTLE_SECONDS=0, CHANGES_SSE_MAX_SECONDS=0.3, CHANGES_SSE_POLL_SECONDS=0.05)
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.owner = User.objects.create_user(username='owner', password='x', national_id='owner123')
+        self.stranger = User.objects.create_user(username='stranger', password='x', national_id='stranger123')
+        self.url = reverse('change-list')
+        self.client.force_authenticate(user=self.officer)
+
+    def _create_parcel(self, parcel_id, owner):
+        with self.captureOnCommitCallbacks(execute=True):
+            return LandParcel.objects.create(
+                parcel_id=parcel_id,
+                address='Feed Street',
+                area=Decimal('10.00'),
+                coordinates={'lat': 0.0, 'lng': 0.0},
+                current_owner=owner,
+                blockchain_hash='0xfeed'
+            )
+
+    def test_feed_lists_changes_in_sequence(self):
+        """Test that creates and verifies appear in order after the given seq"""
+        since = self.client.get(self.url).data['next_since']
+        parcel = self._create_parcel('FEED1', self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('landparcel-verify', kwargs={'pk': parcel.pk}))
+
+        response = self.client.get(self.url, {'since': since})
+        events = [(event['entity'], event['action']) for event in response.data['results']]
+        self.assertEqual(events, [('PARCEL', 'CREATED'), ('PARCEL', 'VERIFIED')])
+        self.assertEqual(response.data['results'][1]['actor'], self.officer.pk)
+        self.assertEqual(response.data['next_since'], response.data['results'][-1]['seq'])
+
+        response = self.client.get(self.url, {'since': since, 'limit': 1})
+        self.assertTrue(response.data['has_more'])
+        response = self.client.get(self.url, {'since': response.data['next_since'], 'limit': 1})
+        self.assertEqual(response.data['results'][0]['action'], 'VERIFIED')
+        self.assertFalse(response.data['has_more'])
+
+    def test_feed_is_scoped_to_involved_users(self):
+        """Test that citizens only see changes to records they are involved in"""
+        self._create_parcel('FEED1', self.owner)
+        self._create_parcel('FEED2', self.stranger)
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.get(self.url)
+        parcel_events = [event['object_id'] for event in response.data['results'] if event['entity'] == 'PARCEL']
+        self.assertEqual(parcel_events, [LandParcel.objects.get(parcel_id='FEED1').pk])
+
+    def test_caught_up_polls_skip_the_database(self):
+        """Test that a poll at the head is answered from the cache"""
+        self._create_parcel('FEED1', self.owner)
+        head = ChangeEvent.objects.latest('seq').seq
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'since': head})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(len(context.captured_queries), 0)
+
+    async def test_stream_sends_server_sent_events(self):
+        """Test that the SSE stream emits pending changes with their seq as the event id"""
+        parcel = await LandParcel.objects.acreate(
+            parcel_id='FEED1',
+            address='Feed Street',
+            area=Decimal('10.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.owner,
+            blockchain_hash='0xfeed'
+        )
+        token = str(AccessToken.for_user(self.owner))
+        response = await AsyncClient().get(reverse('change-stream'), {'token': token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        events = [json.loads(line[len('data: '):]) for line in body.splitlines() if line.startswith('data: ')]
+        self.assertIn(('PARCEL', parcel.pk, 'CREATED'), [(e['entity'], e['object_id'], e['action']) for e in events])
+        self.assertIn(f"id: {events[-1]['seq']}", body)
+
+        response = await AsyncClient().get(reverse('change-stream'), {'token': 'garbage'})
+        self.assertEqual(response.status_code, 401)
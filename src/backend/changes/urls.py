@@ -0,0 +1,11 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from . import views
+
+router = DefaultRouter()
+router.register(r'', views.ChangeFeedViewSet, basename='change')
+
+urlpatterns = [
+    path('stream/', views.change_stream, name='change-stream'),
+    path('', include(router.urls)),
+]
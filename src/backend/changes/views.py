@@ -0,0 +1,101 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import permissions, status, viewsets
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+from land_management.instrumentation import TimedViewMixin
+from users.authentication import CachedJWTAuthentication
+from .serializers import ChangeEventSerializer
+from . import feed
+
+def _parse_since(value):
+    since = int(value or 0)
+    if since < 0:
+        raise ValueError(value)
+    return since
+
+class ChangeFeedViewSet(TimedViewMixin, viewsets.ViewSet):
+    """
+    Changes after ?since=<seq>, oldest first, in batches of up to ?limit=.
+    Keep polling with ``next_since`` while ``has_more`` is true.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budgets = {'list': 2}
+
+    def list(self, request):
+        try:
+            since = _parse_since(request.query_params.get('since'))
+            limit = min(int(request.query_params.get('limit', settings.CHANGES_BATCH_SIZE)),
+                        settings.CHANGES_BATCH_SIZE)
+        except ValueError:
+            return Response({'error': 'since and limit must be non-negative integers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        events = feed.read(request.user, since, max(limit, 1) + 1)
+        has_more = len(events) > limit
+        events = events[:limit]
+        return Response({
+            'results': ChangeEventSerializer(events, many=True).data,
+            'next_since': events[-1].seq if events else since,
+            'has_more': has_more,
+        })
+
+
+def _authenticate(request):
+    """User of a stream request, from the Authorization header or ?token= (EventSource cannot set headers)."""
+    authentication = CachedJWTAuthentication()
+    token = request.GET.get('token')
+    if token:
+        return authentication.get_user(authentication.get_validated_token(token))
+    result = authentication.authenticate(request)
+    if result is None:
+        raise AuthenticationFailed('Authentication credentials were not provided.')
+    return result[0]
+
+
+def _sse(event):
+    data = json.dumps(ChangeEventSerializer(event).data)
+    return f'id: {event.seq}\nevent: change\ndata: {data}\n\n'
+
+
+async def _event_stream(user, since):
+    deadline = time.monotonic() + settings.CHANGES_SSE_MAX_SECONDS
+    last_write = time.monotonic()
+    yield f'retry: {settings.CHANGES_SSE_RETRY_MS}\n\n'
+    while time.monotonic() < deadline:
+        events = await sync_to_async(feed.read)(user, since, settings.CHANGES_BATCH_SIZE)
+        if events:
+            yield ''.join(_sse(event) for event in events)
+            since = events[-1].seq
+            last_write = time.monotonic()
+            if len(events) == settings.CHANGES_BATCH_SIZE:
+                continue
+        elif time.monotonic() - last_write >= settings.CHANGES_SSE_HEARTBEAT_SECONDS:
+            yield ': keepalive\n\n'
+            last_write = time.monotonic()
+        await asyncio.sleep(settings.CHANGES_SSE_POLL_SECONDS)
+
+
+async def change_stream(request):
+    """
+    Server-sent events of the change feed. Served by the ASGI application
+    (land_management.asgi) without holding a worker thread per client; the
+    stream closes after CHANGES_SSE_MAX_SECONDS and the browser reconnects
+    with Last-Event-ID.
+    """
+    try:
+        user = await sync_to_async(_authenticate)(request)
+        since = _parse_since(request.headers.get('Last-Event-ID') or request.GET.get('since'))
+    except AuthenticationFailed as exc:
+        return JsonResponse({'error': str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
+    except ValueError:
+        return JsonResponse({'error': 'since must be a non-negative integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(_event_stream(user, since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,152 @@
+"""
+Verification that stored document bytes match their content identifiers.
+
+A document's ``ipfs_hash`` is the CID of a blob in the blob store, which is
+the hash of the blob's manifest, and the manifest lists the SHA-256 of every
+chunk. Checking that the manifest hashes back to the CID and that every
+stored chunk hashes to its manifest entry therefore proves the stored bytes
+are exactly the ones the CID names, while hashing each byte once and holding
+one chunk in memory at a time. The document's recorded ``sha256`` and
+``size`` metadata are then compared against the verified manifest.
+
+``audit`` runs the blob checks for many documents across a process pool;
+hashlib is the whole cost, so the pool scales with cores up to the disk's
+read throughput. Documents sharing content are checked once per window.
+
+Documents whose ``ipfs_hash`` is not a blob store CID (hashes recorded before
+content was stored here) cannot be checked and fail with ``not_stored``; they
+have to be re-uploaded before they can be verified, singly or in bulk.
+"""
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+
+from .storage import BlobNotFound, get_blob_store, is_cid, manifest_cid
+
+AuditResult = namedtuple('AuditResult', ['document_id', 'cid', 'code', 'message', 'size'])
+
+
+class ContentMismatch(Exception):
+    """Stored content does not match the identifier or metadata recorded for it."""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+def verify_blob(cid, store=None):
+    """
+    Re-derive ``cid`` from the stored bytes, streaming one chunk at a time.
+    Returns the verified manifest; raises ContentMismatch if content is
+    missing or altered.
+    """
+    store = store or get_blob_store()
+    if not is_cid(cid):
+        raise ContentMismatch('Document content has not been uploaded', 'not_stored')
+    try:
+        manifest = store.stat(cid)
+    except BlobNotFound:
+        raise ContentMismatch('Document content is not stored', 'not_stored')
+    except ValueError:
+        raise ContentMismatch('Manifest is unreadable', 'cid_mismatch')
+    if manifest_cid(manifest) != cid:
+        raise ContentMismatch('Manifest does not hash to its CID', 'cid_mismatch')
+
+    size = 0
+    for index, (digest, length) in enumerate(manifest['chunks']):
+        try:
+            chunk = store.read_chunk(digest)
+        except BlobNotFound:
+            raise ContentMismatch(f'Chunk {index} is missing', 'chunk_missing')
+        if len(chunk) != length or hashlib.sha256(chunk).hexdigest() != digest:
+            raise ContentMismatch(f'Chunk {index} does not match its hash', 'chunk_mismatch')
+        size += length
+    if size != manifest['size']:
+        raise ContentMismatch('Chunks do not add up to the stored size', 'cid_mismatch')
+    return manifest
+
+
+def check_metadata(metadata, manifest):
+    """Raise ContentMismatch if the document's recorded hash or size disagrees with ``manifest``."""
+    metadata = metadata or {}
+    if 'sha256' in metadata and metadata['sha256'] != manifest['sha256']:
+        raise ContentMismatch('Recorded sha256 does not match the stored content', 'metadata_mismatch')
+    if 'size' in metadata and metadata['size'] != manifest['size']:
+        raise ContentMismatch('Recorded size does not match the stored content', 'metadata_mismatch')
+
+
+def verify_document(document, store=None):
+    """Verify ``document``'s stored content; returns its manifest or raises ContentMismatch."""
+    manifest = verify_blob(document.ipfs_hash, store)
+    check_metadata(document.metadata, manifest)
+    return manifest
+
+
+def check_blobs(cids):
+    """``{cid: (code, message, sha256, size)}`` for ``cids``; code is None when the blob verifies."""
+    store = get_blob_store()
+    results = {}
+    for cid in cids:
+        try:
+            manifest = verify_blob(cid, store)
+        except ContentMismatch as exc:
+            results[cid] = (exc.code, str(exc), None, None)
+        else:
+            results[cid] = (None, None, manifest['sha256'], manifest['size'])
+    return results
+
+
+def _start_worker():
+    # Already set up when forked; spawned workers load settings afresh
+    django.setup()
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def audit(rows, workers=None, batch_size=32, window=20000):
+    """
+    Yield an AuditResult for each ``(id, ipfs_hash, metadata)`` row, checking
+    blobs across ``workers`` processes (0 checks them in this process).
+    """
+    pool = None
+    if workers != 0:
+        # Workers only read the blob store; start them before rows are read
+        # so they are not forked holding an open database connection
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_start_worker)
+        pool.submit(int).result()
+    try:
+        pending = []
+        for row in rows:
+            pending.append(row)
+            if len(pending) >= window:
+                yield from _audit_window(pending, pool, batch_size)
+                pending = []
+        if pending:
+            yield from _audit_window(pending, pool, batch_size)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _audit_window(rows, pool, batch_size):
+    cids = list(dict.fromkeys(cid for _, cid, _ in rows))
+    batches = list(_batches(cids, batch_size))
+    blobs = {}
+    for result in (pool.map(check_blobs, batches) if pool else map(check_blobs, batches)):
+        blobs.update(result)
+
+    for document_id, cid, metadata in rows:
+        code, message, sha256, size = blobs[cid]
+        if code is None:
+            try:
+                check_metadata(metadata, {'sha256': sha256, 'size': size})
+            except ContentMismatch as exc:
+                code, message = exc.code, str(exc)
+        yield AuditResult(document_id, cid, code, message, size)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 07:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_keyset_indexes'),
+        ('land_registry', '0006_role_scoped_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['uploaded_by', 'upload_date', 'id'], name='document_uploader_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['is_verified', 'upload_date', 'id'], name='document_verified_date_idx'),
+        ),
+    ]
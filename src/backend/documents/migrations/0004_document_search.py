@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from documents.search import DOCUMENT_INDEX, document_row
+
+
+def create_document_search(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    DOCUMENT_INDEX.create(schema_editor.connection)
+    using = schema_editor.connection.alias
+    batch = []
+    for document in Document.objects.using(using).only('title', 'document_type', 'metadata').iterator(chunk_size=2000):
+        batch.append(document_row(document))
+        if len(batch) == 2000:
+            DOCUMENT_INDEX.update(batch, using=using)
+            batch = []
+    DOCUMENT_INDEX.update(batch, using=using)
+
+
+def drop_document_search(apps, schema_editor):
+    DOCUMENT_INDEX.drop(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_role_scoped_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_document_search, drop_document_search),
+    ]
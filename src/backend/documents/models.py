@@ -31,6 +31,11 @@ class Document(models.Model):
 
     class Meta:
         ordering = ['-upload_date']
+        indexes = [
+            models.Index(fields=['upload_date', 'id'], name='document_keyset_idx'),
+            models.Index(fields=['uploaded_by', 'upload_date', 'id'], name='document_uploader_date_idx'),
+            models.Index(fields=['is_verified', 'upload_date', 'id'], name='document_verified_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.document_type} ({self.land_parcel.parcel_id})"
@@ -0,0 +1,9 @@
+from land_management.search import SearchIndex, flatten_text
+
+DOCUMENT_INDEX = SearchIndex('documents_document_search', ['title', 'body'], fallback_fields=['title'])
+DOCUMENT_SEARCH_FIELDS = {'title', 'document_type', 'metadata'}
+
+
+def document_row(document):
+    body = ' '.join([document.get_document_type_display(), flatten_text(document.metadata)])
+    return document.pk, (document.title, body)
@@ -1,9 +1,11 @@
 from rest_framework import serializers
+from land_management.fieldsets import DynamicFieldsMixin
 from .models import Document
+from .storage import is_cid
 from land_registry.serializers import LandParcelSerializer
 from users.serializers import UserSerializer
 
-class DocumentSerializer(serializers.ModelSerializer):
+class DocumentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     land_parcel = LandParcelSerializer(read_only=True)
     land_parcel_id = serializers.IntegerField(write_only=True)
     uploaded_by = UserSerializer(read_only=True)
@@ -17,4 +19,11 @@ class DocumentSerializer(serializers.ModelSerializer):
                  'uploaded_by', 'uploaded_by_id', 'upload_date', 'ipfs_hash',
                  'blockchain_reference', 'is_verified', 'verification_date',
                  'verified_by', 'verified_by_id', 'metadata']
-        read_only_fields = ['upload_date', 'verification_date', 'blockchain_reference']
\ No newline at end of file
+        read_only_fields = ['upload_date', 'verification_date', 'blockchain_reference']
+        # Documents are created first and their content sent to upload, which fills this in
+        extra_kwargs = {'ipfs_hash': {'required': False, 'allow_blank': True}}
+
+    def validate_ipfs_hash(self, value):
+        if value and not is_cid(value):
+            raise serializers.ValidationError('Must be the CID of uploaded content (blob1- and 64 hex digits)')
+        return value
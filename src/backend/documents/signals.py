@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from land_management import response_cache
+from .models import Document
+from .search import DOCUMENT_INDEX, DOCUMENT_SEARCH_FIELDS, document_row
+
+
+@receiver(post_save, sender=Document)
+def index_document_text(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is not None and not DOCUMENT_SEARCH_FIELDS & set(update_fields):
+        return
+    DOCUMENT_INDEX.update([document_row(instance)], using=using)
+
+
+@receiver(post_delete, sender=Document)
+def unindex_document_text(sender, instance, using, **kwargs):
+    DOCUMENT_INDEX.delete([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def invalidate_cached_document(sender, instance, **kwargs):
+    response_cache.invalidate('document', instance.pk)
@@ -0,0 +1,181 @@
+"""
+Content-addressed blob storage for document files.
+
+A blob is split into fixed-size chunks stored under their SHA-256, so a chunk
+shared by several uploads (the same deed uploaded twice, or an amended survey
+plan) is written once. A manifest lists the chunks in order; the blob's CID is
+the hash of that manifest, so identical content always gets the same CID, as
+with IPFS. Reads and writes go one chunk at a time and never hold a whole file
+in memory.
+
+The backend is the class named by BLOB_STORE_BACKEND.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+CID_PREFIX = 'blob1-'
+CID_RE = re.compile(r'blob1-[0-9a-f]{64}')
+DIGEST_RE = re.compile(r'[0-9a-f]{64}')
+
+BlobInfo = namedtuple('BlobInfo', ['cid', 'size', 'sha256', 'chunks', 'new_chunks'])
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+def is_cid(value):
+    return isinstance(value, str) and CID_RE.fullmatch(value) is not None
+
+
+def is_digest(value):
+    return isinstance(value, str) and DIGEST_RE.fullmatch(value) is not None
+
+
+def encode_manifest(manifest):
+    return json.dumps(manifest, sort_keys=True, separators=(',', ':')).encode()
+
+
+def manifest_cid(manifest):
+    """The CID of ``manifest``: the hash of its canonical encoding."""
+    return CID_PREFIX + hashlib.sha256(encode_manifest(manifest)).hexdigest()
+
+
+def fixed_chunks(stream, chunk_size):
+    """Yield ``chunk_size`` pieces of a file-like object or an iterable of bytes."""
+    if hasattr(stream, 'read'):
+        pieces = iter(lambda: stream.read(chunk_size), b'')
+    else:
+        pieces = iter(stream)
+    buffer = bytearray()
+    for piece in pieces:
+        buffer.extend(piece)
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class BaseBlobStore:
+    def put(self, stream):
+        """Store the bytes of ``stream`` and return a BlobInfo."""
+        raise NotImplementedError
+
+    def stat(self, cid):
+        """Manifest of a stored blob: size, sha256, chunk_size and chunks; BlobNotFound if absent."""
+        raise NotImplementedError
+
+    def read(self, cid, start=0, end=None):
+        """Yield the bytes of ``cid`` from ``start`` up to and including ``end``."""
+        raise NotImplementedError
+
+    def read_chunk(self, digest):
+        """The stored bytes of the chunk named ``digest``; BlobNotFound if absent."""
+        raise NotImplementedError
+
+    def exists(self, cid):
+        try:
+            self.stat(cid)
+        except BlobNotFound:
+            return False
+        return True
+
+
+class LocalChunkStore(BaseBlobStore):
+    """Chunks and manifests as files under BLOB_STORE_ROOT."""
+
+    def __init__(self, root=None, chunk_size=None):
+        self.root = Path(root or settings.BLOB_STORE_ROOT)
+        self.chunk_size = chunk_size or settings.BLOB_CHUNK_SIZE
+
+    def _path(self, kind, digest):
+        # Digests come from manifests and document rows, so never trust them as path segments
+        if not is_digest(digest):
+            raise BlobNotFound(digest)
+        path = (self.root / kind / digest[:2] / digest).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise BlobNotFound(digest)
+        return path
+
+    def _write(self, path, data):
+        """Write atomically; an existing file already holds the same content."""
+        if path.exists():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        return True
+
+    def put(self, stream):
+        whole = hashlib.sha256()
+        chunks = []
+        size = new_chunks = 0
+        for chunk in fixed_chunks(stream, self.chunk_size):
+            digest = hashlib.sha256(chunk).hexdigest()
+            if self._write(self._path('chunks', digest), chunk):
+                new_chunks += 1
+            whole.update(chunk)
+            chunks.append([digest, len(chunk)])
+            size += len(chunk)
+
+        manifest = {'size': size, 'sha256': whole.hexdigest(), 'chunk_size': self.chunk_size, 'chunks': chunks}
+        cid = manifest_cid(manifest)
+        self._write(self._path('manifests', cid[len(CID_PREFIX):]), encode_manifest(manifest))
+        return BlobInfo(cid, size, manifest['sha256'], len(chunks), new_chunks)
+
+    def stat(self, cid):
+        if not is_cid(cid):
+            raise BlobNotFound(cid)
+        try:
+            manifest = json.loads(self._path('manifests', cid[len(CID_PREFIX):]).read_bytes())
+        except FileNotFoundError:
+            raise BlobNotFound(cid)
+        chunks = manifest.get('chunks') if isinstance(manifest, dict) else None
+        if not isinstance(chunks, list) or not all(
+            isinstance(chunk, list) and len(chunk) == 2 and is_digest(chunk[0]) for chunk in chunks
+        ):
+            raise ValueError(f'Malformed manifest for {cid}')
+        return manifest
+
+    def read(self, cid, start=0, end=None):
+        manifest = self.stat(cid)
+        end = manifest['size'] - 1 if end is None else min(end, manifest['size'] - 1)
+        chunk_size = manifest['chunk_size']
+        # Every chunk but the last is exactly chunk_size long
+        for index in range(start // chunk_size, len(manifest['chunks'])):
+            offset = index * chunk_size
+            if offset > end:
+                break
+            digest, length = manifest['chunks'][index]
+            skip = max(0, start - offset)
+            take = min(length, end - offset + 1) - skip
+            with open(self._path('chunks', digest), 'rb') as handle:
+                handle.seek(skip)
+                yield handle.read(take)
+
+    def read_chunk(self, digest):
+        if not is_digest(digest):
+            raise BlobNotFound(digest)
+        try:
+            return self._path('chunks', digest).read_bytes()
+        except FileNotFoundError:
+            raise BlobNotFound(digest)
+
+
+def get_blob_store():
+    return import_string(settings.BLOB_STORE_BACKEND)()
@@ -1,3 +1,471 @@
-from django.test import TestCase
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from land_registry.models import LandParcel
+from anchoring.models import AnchorJob
+from land_management.query_budget import QueryBudgetMixin
+from .models import Document
+from .storage import BlobNotFound, LocalChunkStore
+from .views import DocumentViewSet
 
-# Create your tests here.
+User = get_user_model()
+
+class DocumentQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.client.force_authenticate(user=self.officer)
+
+    def _create_documents(self, count):
+        start = Document.objects.count()
+        for index in range(start, start + count):
+            owner = User.objects.create_user(username=f'owner{index}', password='x', national_id=f'o{index}')
+            parcel = LandParcel.objects.create(
+                parcel_id=f'DOC{index}',
+                address='Document Lane',
+                area=Decimal('10.00'),
+                coordinates={'lat': 0.0, 'lng': 0.0},
+                current_owner=owner,
+                blockchain_hash='0xdoc'
+            )
+            Document.objects.create(
+                title=f'Deed {index}',
+                document_type='TITLE_DEED',
+                land_parcel=parcel,
+                uploaded_by=owner,
+                verified_by=self.officer,
+                ipfs_hash=f'Qm{index}',
+                blockchain_reference='0xref'
+            )
+
+    def test_document_list_query_count_is_constant(self):
+        """Test that listing documents does not issue a query per nested object"""
+        url = reverse('document-list') + '?expand=land_parcel.current_owner,uploaded_by,verified_by'
+        self._create_documents(1)
+        with self.assertWithinQueryBudget(DocumentViewSet, 'list') as small_page:
+            self.client.get(url)
+        self._create_documents(9)
+        with self.assertWithinQueryBudget(DocumentViewSet, 'list') as full_page:
+            self.client.get(url)
+        self.assertEqual(len(small_page.captured_queries), len(full_page.captured_queries))
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.owner = User.objects.create_user(
+            username='owner',
+            password='OwnerPass123!',
+            first_name='Original',
+            national_id='owner123'
+        )
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='CACHE1',
+            address='Cache Close',
+            area=Decimal('10.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.owner,
+            blockchain_hash='0xcache'
+        )
+        self.document = Document.objects.create(
+            title='Cached Deed',
+            document_type='TITLE_DEED',
+            land_parcel=self.land_parcel,
+            uploaded_by=self.owner,
+            ipfs_hash='Qmcache',
+            blockchain_reference='0xref'
+        )
+        self.parcel_url = reverse('landparcel-detail', kwargs={'pk': self.land_parcel.pk})
+        self.document_url = reverse('document-detail', kwargs={'pk': self.document.pk})
+        self.client.force_authenticate(user=self.officer)
+
+    def test_repeat_reads_skip_the_database(self):
+        """Test that a cached detail response issues no queries"""
+        self.client.get(self.parcel_url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.parcel_url)
+        self.assertEqual(response.data['parcel_id'], 'CACHE1')
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_saves_invalidate_the_object(self):
+        """Test that saving a parcel drops its cached responses"""
+        self.client.get(self.parcel_url)
+        self.land_parcel.address = 'New Address'
+        self.land_parcel.save()
+        response = self.client.get(self.parcel_url)
+        self.assertEqual(response.data['address'], 'New Address')
+
+    def test_owner_changes_cascade_to_embedding_objects(self):
+        """Test that editing an owner refreshes cached parcels and documents embedding them"""
+        params = {'expand': 'land_parcel.current_owner'}
+        self.client.get(self.parcel_url, {'expand': 'current_owner'})
+        self.client.get(self.document_url, params)
+        self.owner.first_name = 'Renamed'
+        self.owner.save()
+        response = self.client.get(self.parcel_url, {'expand': 'current_owner'})
+        self.assertEqual(response.data['current_owner']['first_name'], 'Renamed')
+        response = self.client.get(self.document_url, params)
+        self.assertEqual(response.data['land_parcel']['current_owner']['first_name'], 'Renamed')
+
+    def test_cached_entries_respect_role_scoping(self):
+        """Test that a cached parcel is not served to a citizen who cannot see it"""
+        self.client.get(self.parcel_url)
+        stranger = User.objects.create_user(username='stranger', password='x', national_id='stranger123')
+        self.client.force_authenticate(user=stranger)
+        response = self.client.get(self.parcel_url)
+        self.assertEqual(response.status_code, 404)
+
+
+class BlobStoreTests(APITestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings_override = override_settings(BLOB_STORE_ROOT=self.root.name, BLOB_CHUNK_SIZE=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.owner = User.objects.create_user(username='owner', password='OwnerPass123!', national_id='owner123')
+        land_parcel = LandParcel.objects.create(
+            parcel_id='BLOB1',
+            address='Blob Road',
+            area=Decimal('10.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.owner,
+            blockchain_hash='0xblob'
+        )
+        self.document = Document.objects.create(
+            title='Survey Plan',
+            document_type='SURVEY_PLAN',
+            land_parcel=land_parcel,
+            uploaded_by=self.owner,
+            ipfs_hash='',
+            blockchain_reference=''
+        )
+        self.content = bytes(range(256)) * 10
+        self.client.force_authenticate(user=self.owner)
+
+    def _upload(self, content):
+        url = reverse('document-upload', kwargs={'pk': self.document.pk})
+        upload = SimpleUploadedFile('plan.pdf', content, content_type='application/pdf')
+        return self.client.post(url, {'file': upload}, format='multipart')
+
+    def test_identical_chunks_are_stored_once(self):
+        """Test that re-uploading the same content writes no new chunks and keeps the CID"""
+        first = self._upload(self.content)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(first.data['chunks'], 3)
+        second = self._upload(self.content)
+        self.assertEqual(second.data['ipfs_hash'], first.data['ipfs_hash'])
+        self.assertEqual(second.data['new_chunks'], 0)
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.ipfs_hash, first.data['ipfs_hash'])
+
+    def test_create_then_upload_content(self):
+        """Test creating a document through the API and then uploading its content"""
+        response = self.client.post(reverse('document-list'), {
+            'title': 'Title Deed',
+            'document_type': 'TITLE_DEED',
+            'land_parcel_id': self.document.land_parcel_id,
+            'uploaded_by_id': self.owner.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['ipfs_hash'], '')
+
+        url = reverse('document-upload', kwargs={'pk': response.data['id']})
+        upload = SimpleUploadedFile('deed.pdf', self.content, content_type='application/pdf')
+        uploaded = self.client.post(url, {'file': upload}, format='multipart')
+        self.assertEqual(uploaded.status_code, 201)
+        self.assertEqual(Document.objects.get(pk=response.data['id']).ipfs_hash, uploaded.data['ipfs_hash'])
+
+        response = self.client.post(reverse('document-list'), {
+            'title': 'Legacy Deed',
+            'document_type': 'TITLE_DEED',
+            'land_parcel_id': self.document.land_parcel_id,
+            'uploaded_by_id': self.owner.pk,
+            'ipfs_hash': 'QmLegacyIpfsHash',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ipfs_hash', response.data)
+
+    def test_new_content_clears_verification(self):
+        """Test that uploading different bytes to a verified document unverifies it"""
+        self._upload(self.content)
+        officer = User.objects.create_user(username='officer', password='x', user_type='LAND_OFFICER',
+                                           national_id='officer123')
+        Document.objects.filter(pk=self.document.pk).update(is_verified=True, verified_by=officer)
+
+        self._upload(self.content)
+        self.document.refresh_from_db()
+        self.assertTrue(self.document.is_verified)
+
+        self._upload(b'forged deed' * 100)
+        self.document.refresh_from_db()
+        self.assertFalse(self.document.is_verified)
+        self.assertIsNone(self.document.verified_by_id)
+
+    def test_store_round_trips_any_range(self):
+        """Test that reads across chunk boundaries return the right bytes"""
+        store = LocalChunkStore()
+        blob = store.put(iter([self.content[:700], self.content[700:]]))
+        self.assertEqual(b''.join(store.read(blob.cid)), self.content)
+        self.assertEqual(b''.join(store.read(blob.cid, 1000, 2100)), self.content[1000:2101])
+
+    def test_download_supports_range_requests(self):
+        """Test downloading a whole document and a byte range of it"""
+        self._upload(self.content)
+        url = reverse('document-download', kwargs={'pk': self.document.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=1020-1030')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 1020-1030/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[1020:1031])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_crafted_identifiers_stay_inside_the_store(self):
+        """Test that CIDs and chunk digests naming paths outside the store are refused"""
+        store = LocalChunkStore()
+        # A well-formed CID whose manifest points its chunk at a file outside the store
+        crafted = store.put(iter([b'x']))
+        manifest_path = store._path('manifests', crafted.cid[len('blob1-'):])
+        manifest_path.write_text(json.dumps({
+            'size': 5, 'sha256': '0' * 64, 'chunk_size': 1024, 'chunks': [['../../../../../etc/hostname', 5]],
+        }))
+        url = reverse('document-download', kwargs={'pk': self.document.pk})
+        for ipfs_hash in (crafted.cid, 'blob1-../../../../etc/hostname', f'blob1-{"A" * 64}'):
+            with self.subTest(ipfs_hash=ipfs_hash):
+                Document.objects.filter(pk=self.document.pk).update(ipfs_hash=ipfs_hash)
+                self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertRaises(BlobNotFound):
+            store.read_chunk('../../../../etc/hostname')
+
+        response = self.client.patch(reverse('document-detail', kwargs={'pk': self.document.pk}),
+                                     {'ipfs_hash': 'blob1-../../../../etc/hostname'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ipfs_hash', response.data)
+
+
+class BulkVerifyTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.owner = User.objects.create_user(username='owner', password='OwnerPass123!', national_id='owner123')
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='BULK1',
+            address='Bulk Street',
+            area=Decimal('10.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.owner,
+            blockchain_hash='0xbulk'
+        )
+        self.url = reverse('document-bulk-verify')
+        self.client.force_authenticate(user=self.officer)
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(BLOB_STORE_ROOT=root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.store = LocalChunkStore()
+
+    def _create_documents(self, count, **kwargs):
+        pks = []
+        for index in range(count):
+            blob = self.store.put(iter([f'deed {index}'.encode()]))
+            pks.append(Document.objects.create(
+                title=f'Deed {index}',
+                document_type='TITLE_DEED',
+                land_parcel=self.land_parcel,
+                uploaded_by=self.owner,
+                ipfs_hash=blob.cid,
+                blockchain_reference='',
+                **{'metadata': {'size': blob.size, 'sha256': blob.sha256}, **kwargs}
+            ).pk)
+        return pks
+
+    def test_bulk_verify_reports_each_item(self):
+        """Test verifying a list of documents sets the verifier and date once per item"""
+        pending = self._create_documents(3)
+        done = self._create_documents(1, is_verified=True)
+        response = self.client.post(self.url, {'ids': pending + done + [999999]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['verified'], response.data['already_verified'], response.data['not_found']), (3, 1, 1)
+        )
+        self.assertEqual(response.data['results'][-1], {'id': 999999, 'status': 'not_found'})
+        for document in Document.objects.filter(pk__in=pending):
+            self.assertTrue(document.is_verified)
+            self.assertEqual(document.verified_by, self.officer)
+            self.assertIsNotNone(document.verification_date)
+        self.assertEqual(AnchorJob.objects.filter(target='DOCUMENT').count(), 3)
+
+    def test_bulk_verify_skips_content_that_does_not_verify(self):
+        """Test that bulk verification applies the content check and skips legacy hashes"""
+        intact, misrecorded, legacy = self._create_documents(3)
+        Document.objects.filter(pk=misrecorded).update(metadata={'sha256': '0' * 64})
+        Document.objects.filter(pk=legacy).update(ipfs_hash='QmLegacyIpfsHash')
+
+        response = self.client.post(self.url, {'ids': [intact, misrecorded, legacy]}, format='json')
+        self.assertEqual((response.data['verified'], response.data['skipped']), (1, 2))
+        codes = {row['id']: row.get('code') for row in response.data['results']}
+        self.assertEqual(codes, {intact: None, misrecorded: 'metadata_mismatch', legacy: 'not_stored'})
+        self.assertEqual(list(Document.objects.filter(is_verified=True).values_list('pk', flat=True)), [intact])
+
+    def test_bulk_verify_query_count_is_constant(self):
+        """Test that the number of queries does not grow with the number of documents"""
+        few, many = self._create_documents(2), self._create_documents(40)
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, {'ids': few}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.url, {'ids': many}, format='json')
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_bulk_verify_by_filter(self):
+        """Test verifying every document matching a filter"""
+        self._create_documents(4)
+        response = self.client.post(self.url, {'filter': {'land_parcel': self.land_parcel.pk}}, format='json')
+        self.assertEqual(response.data['verified'], 4)
+        self.assertFalse(Document.objects.filter(is_verified=False).exists())
+
+        response = self.client.post(self.url, {'filter': {'title': 'Deed 1'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_verify_requires_staff(self):
+        """Test that citizens cannot bulk verify documents"""
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.post(self.url, {'ids': self._create_documents(1)}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_search_covers_title_and_metadata(self):
+        """Test searching documents by title words and metadata values"""
+        pk = self._create_documents(1, metadata={'surveyor': 'Juma Mwakyusa', 'pages': 3})[0]
+        Document.objects.filter(pk=pk).update(title='Boundary survey')
+        Document.objects.get(pk=pk).save()
+        url = reverse('document-list')
+        for text in ['bound', 'mwaky', 'title deed']:
+            response = self.client.get(url, {'q': text})
+            self.assertEqual([row['id'] for row in response.data['results']], [pk], text)
+
+
+class IntegrityTests(APITestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings_override = override_settings(BLOB_STORE_ROOT=self.root.name, BLOB_CHUNK_SIZE=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.owner = User.objects.create_user(username='owner', password='OwnerPass123!', national_id='owner123')
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='HASH1',
+            address='Hash Lane',
+            area=Decimal('10.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.owner,
+            blockchain_hash='0xhash'
+        )
+        self.store = LocalChunkStore()
+        self.client.force_authenticate(user=self.officer)
+
+    def _document(self, content=None, ipfs_hash='', metadata=None):
+        if content is not None:
+            blob = self.store.put(iter([content]))
+            ipfs_hash = blob.cid
+            metadata = {'size': blob.size, 'sha256': blob.sha256, **(metadata or {})}
+        return Document.objects.create(
+            title='Deed',
+            document_type='TITLE_DEED',
+            land_parcel=self.land_parcel,
+            uploaded_by=self.owner,
+            ipfs_hash=ipfs_hash,
+            blockchain_reference='',
+            metadata=metadata
+        )
+
+    def _tamper(self, document, index=0):
+        digest = self.store.stat(document.ipfs_hash)['chunks'][index][0]
+        path = self.store._path('chunks', digest)
+        path.write_bytes(b'X' + path.read_bytes()[1:])
+
+    def test_verify_document_refuses_mismatched_content(self):
+        """Test that verification is refused unless the stored bytes match the document's CID"""
+        intact = self._document(bytes(range(256)) * 10)
+        tampered = self._document(b'original deed' * 200)
+        self._tamper(tampered, index=1)
+        missing = self._document(ipfs_hash='QmNeverUploaded')
+
+        for document, code in [(tampered, 'chunk_mismatch'), (missing, 'not_stored')]:
+            response = self.client.post(reverse('document-verify-document', kwargs={'pk': document.pk}))
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.data['code'], code)
+            document.refresh_from_db()
+            self.assertFalse(document.is_verified)
+
+        response = self.client.post(reverse('document-verify-document', kwargs={'pk': intact.pk}))
+        self.assertEqual(response.status_code, 202)
+        intact.refresh_from_db()
+        self.assertTrue(intact.is_verified)
+
+    def test_audit_reports_every_mismatch(self):
+        """Test that the parallel audit flags altered, missing and misrecorded content"""
+        intact = self._document(bytes(range(256)) * 10)
+        shared = self._document(bytes(range(256)) * 10)
+        tampered = self._document(b'survey plan' * 300)
+        self._tamper(tampered)
+        lost = self._document(b'lost chunk' * 300)
+        self.store._path('chunks', self.store.stat(lost.ipfs_hash)['chunks'][-1][0]).unlink()
+        misrecorded = self._document(b'misrecorded', metadata={'sha256': '0' * 64})
+        not_uploaded = self._document(ipfs_hash='QmNeverUploaded')
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'audit.json'
+            with self.assertRaises(CommandError):
+                call_command('audit_documents', workers=2, batch_size=2, output=str(output), check=True,
+                             stdout=StringIO())
+            mismatches = {row['document_id']: row['code'] for row in json.loads(output.read_text())}
+
+        self.assertEqual(mismatches, {
+            tampered.pk: 'chunk_mismatch',
+            lost.pk: 'chunk_missing',
+            misrecorded.pk: 'metadata_mismatch',
+            not_uploaded.pk: 'not_stored',
+        })
+        self.assertNotIn(intact.pk, mismatches)
+        self.assertNotIn(shared.pk, mismatches)
@@ -1,29 +1,196 @@
+import re
+
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from .models import Document
 from .serializers import DocumentSerializer
+from .search import DOCUMENT_INDEX
+from .storage import BlobNotFound, get_blob_store
+from . import integrity
+from land_management.bulk import BulkVerifyMixin
+from land_management.export import ExportMixin
+from land_management.fieldsets import ShapedQuerysetMixin
+from land_management.response_cache import CachedRetrieveMixin
+from land_management.instrumentation import TimedViewMixin
+from land_management.replicas import ReplicaReadsMixin
+from land_management.search import SearchMixin
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from anchoring import queue as anchor_queue
+from anchoring.views import accepted
+from changes import feed as change_feed
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
 
-class DocumentViewSet(viewsets.ModelViewSet):
+def parse_range(header, size):
+    """
+    (start, end) of a single ``Range: bytes=`` header, None to send the whole
+    file, or ValueError if the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        # Absent, malformed and multi-range requests get the full body
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+class DocumentViewSet(TimedViewMixin, ReplicaReadsMixin, ExportMixin, SearchMixin, BulkVerifyMixin, CachedRetrieveMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_namespace = 'document'
+    query_budgets = {'list': 3, 'retrieve': 2, 'verify_document': 6, 'upload': 5, 'download': 2}
+    bulk_filter_fields = ('document_type', 'land_parcel', 'uploaded_by', 'is_verified')
+    search_index = DOCUMENT_INDEX
+    export_fields = ('id', 'title', 'document_type', 'land_parcel_id', 'uploaded_by_id', 'upload_date',
+                     'ipfs_hash', 'blockchain_reference', 'is_verified', 'verification_date',
+                     'verified_by_id', 'metadata')
+    bulk_anchor_target = 'DOCUMENT'
+    bulk_cache_namespace = 'document'
 
     def get_queryset(self):
+        queryset = self.shape_queryset(Document.objects.all())
         if self.request.user.user_type == 'ADMIN' or self.request.user.user_type == 'LAND_OFFICER':
-            return Document.objects.all()
-        return Document.objects.filter(uploaded_by=self.request.user)
+            return queryset
+        return queryset.filter(uploaded_by=self.request.user)
+
+    def cache_owners(self, instance):
+        return [instance.uploaded_by_id]
+
+    def cache_dependencies(self, instance):
+        dependencies = [
+            ('parcel', instance.land_parcel_id),
+            ('user', instance.uploaded_by_id),
+            ('user', instance.verified_by_id),
+        ]
+        # The parcel owner is only embedded when the parcel was expanded (and loaded)
+        if Document._meta.get_field('land_parcel').is_cached(instance):
+            dependencies.append(('user', instance.land_parcel.current_owner_id))
+        return dependencies
+
+    def bulk_pending(self):
+        return Q(is_verified=False)
+
+    def bulk_changes(self, request):
+        return {'is_verified': True, 'verified_by': request.user, 'verification_date': timezone.now()}
+
+    def bulk_check(self, pks):
+        # The same content check as verify_document, one document at a time
+        refused = {}
+        store = get_blob_store()
+        for document in Document.objects.filter(pk__in=pks).only('pk', 'ipfs_hash', 'metadata'):
+            try:
+                integrity.verify_document(document, store)
+            except integrity.ContentMismatch as exc:
+                refused[document.pk] = (exc.code, str(exc))
+        return refused
 
     def perform_create(self, serializer):
         serializer.save(uploaded_by=self.request.user)
 
+    def perform_update(self, serializer):
+        changes = {}
+        if serializer.validated_data.get('ipfs_hash', serializer.instance.ipfs_hash) != serializer.instance.ipfs_hash:
+            changes = {'is_verified': False, 'verified_by': None, 'verification_date': None}
+        serializer.save(**changes)
+
     @action(detail=True, methods=['post'])
     def verify_document(self, request, pk=None):
         if request.user.user_type not in ['ADMIN', 'LAND_OFFICER']:
             return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
         
         document = self.get_object()
-        document.is_verified = True
-        document.verified_by = request.user
-        document.save()
-        return Response({'status': 'verified'})
\ No newline at end of file
+        # Hash the stored bytes before taking any locks
+        try:
+            integrity.verify_document(document)
+        except integrity.ContentMismatch as exc:
+            return Response({'error': str(exc), 'code': exc.code}, status=status.HTTP_409_CONFLICT)
+        with transaction.atomic():
+            document.is_verified = True
+            document.verified_by = request.user
+            document.verification_date = timezone.now()
+            change_feed.mark(document, 'VERIFIED', request.user)
+            document.save(update_fields=['is_verified', 'verified_by', 'verification_date'])
+            job = anchor_queue.enqueue('DOCUMENT', document, requested_by=request.user)
+        return accepted(request, job, status='verified')
+
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def upload(self, request, pk=None):
+        document = self.get_object()
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        blob = get_blob_store().put(upload.chunks())
+        changed = blob.cid != document.ipfs_hash
+        document.ipfs_hash = blob.cid
+        document.metadata = {
+            **(document.metadata or {}),
+            'filename': upload.name,
+            'content_type': upload.content_type or 'application/octet-stream',
+            'size': blob.size,
+            'sha256': blob.sha256,
+        }
+        update_fields = ['ipfs_hash', 'metadata']
+        if changed:
+            # Verification vouched for the old bytes, not these
+            document.is_verified = False
+            document.verified_by = None
+            document.verification_date = None
+            update_fields += ['is_verified', 'verified_by', 'verification_date']
+        document.save(update_fields=update_fields)
+        return Response({
+            'ipfs_hash': blob.cid,
+            'size': blob.size,
+            'sha256': blob.sha256,
+            'chunks': blob.chunks,
+            'new_chunks': blob.new_chunks,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        document = self.get_object()
+        store = get_blob_store()
+        try:
+            size = store.stat(document.ipfs_hash)['size']
+        except (BlobNotFound, ValueError):
+            return Response({'error': 'Document content is not stored'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = Response({'error': 'Requested range not satisfiable'},
+                                status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        metadata = document.metadata or {}
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            store.read(document.ipfs_hash, start, end),
+            status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            content_type=metadata.get('content_type', 'application/octet-stream'),
+        )
+        response['Content-Length'] = str(end - start + 1 if size else 0)
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = f'"{document.ipfs_hash}"'
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        if metadata.get('filename'):
+            response['Content-Disposition'] = content_disposition_header(True, metadata['filename'])
+        return response
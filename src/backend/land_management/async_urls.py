@@ -0,0 +1,24 @@
+"""Async read endpoints under /api/async/, mirroring the DRF routes of the same name."""
+from django.urls import path
+
+from documents.views import DocumentViewSet
+from land_registry.views import LandParcelViewSet, LandTransactionViewSet
+from users.views import UserViewSet
+from .async_views import AsyncReadView
+
+parcels = AsyncReadView(LandParcelViewSet)
+transactions = AsyncReadView(LandTransactionViewSet)
+documents = AsyncReadView(DocumentViewSet)
+users = AsyncReadView(UserViewSet)
+
+urlpatterns = [
+    path('land/parcels/', parcels.list_view(), name='async-parcel-list'),
+    path('land/parcels/<pk>/', parcels.detail_view(), name='async-parcel-detail'),
+    path('land/transactions/', transactions.list_view(), name='async-transaction-list'),
+    path('land/transactions/<pk>/', transactions.detail_view(), name='async-transaction-detail'),
+    path('documents/documents/', documents.list_view(), name='async-document-list'),
+    path('documents/documents/<pk>/', documents.detail_view(), name='async-document-detail'),
+    path('users/', users.list_view(), name='async-user-list'),
+    path('users/me/', users.me_view(), name='async-user-me'),
+    path('users/<pk>/', users.detail_view(), name='async-user-detail'),
+]
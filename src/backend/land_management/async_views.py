@@ -0,0 +1,127 @@
+"""
+Async list and detail endpoints mirroring the DRF viewsets' reads.
+
+DRF views are synchronous, so under ASGI every request to them holds a
+thread from the sync-to-async pool for its whole life. ``AsyncReadView``
+serves a viewset's ``list`` and ``retrieve`` as native async views instead:
+the viewset still supplies the authenticators, permission classes, role
+scoping (``get_queryset``), ``?q=`` filtering, pagination and serializer, and
+rows are read with the async ORM (``acount``, ``aget``, ``async for``).
+Querysets are shaped by ``ShapedQuerysetMixin`` so every relation the
+serializer renders is already joined and serialization never queries.
+
+Only reads are served here; writes stay on the DRF endpoints.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from . import replicas
+from .instrumentation import phase
+
+
+def render(data, status=200, headers=None):
+    with phase('render'):
+        content = JSONRenderer().render(data)
+    response = HttpResponse(content, status=status, content_type='application/json')
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+class AsyncReadView:
+    """Builds async views for the reads of ``viewset_class``."""
+
+    def __init__(self, viewset_class):
+        self.viewset_class = viewset_class
+
+    def _viewset(self, request, action, kwargs=None):
+        view = self.viewset_class(action=action, args=(), kwargs=kwargs or {}, format_kwarg=None, headers={})
+        view.request = Request(request, parsers=view.get_parsers(), authenticators=view.get_authenticators(),
+                               negotiator=view.get_content_negotiator())
+        return view
+
+    async def _authenticate(self, view):
+        """Runs the viewset's authenticators, natively where they support it, then its permission checks."""
+        request = view.request
+        with phase('auth'):
+            await self._run_authenticators(request)
+        view.check_permissions(request)
+
+    async def _run_authenticators(self, request):
+        for authenticator in request.authenticators:
+            if hasattr(authenticator, 'aauthenticate'):
+                result = await authenticator.aauthenticate(request._request)
+            else:
+                result = await sync_to_async(authenticator.authenticate)(request)
+            if result is not None:
+                request.user, request.auth = result
+                request._authenticator = authenticator
+                break
+        else:
+            request._authenticator = None
+            request._not_authenticated()
+
+    def _error(self, view, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            header = view.get_authenticate_header(view.request)
+            if header:
+                exc.auth_header = header
+            else:
+                exc.status_code = 403
+        response = exception_handler(exc, {'view': view, 'request': view.request})
+        if response is None:
+            raise exc
+        headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+        return render(response.data, response.status_code, headers)
+
+    def list_view(self):
+        async def view(request):
+            viewset = self._viewset(request, 'list')
+            try:
+                await self._authenticate(viewset)
+                await replicas.aroute_reads(viewset.request)
+                queryset = viewset.filter_queryset(viewset.get_queryset())
+                with phase('queryset'):
+                    page = await viewset.paginator.apaginate_queryset(queryset, viewset.request, view=viewset)
+                if page is None:
+                    rows = [row async for row in queryset]
+                    return render(viewset.get_serializer(rows, many=True).data)
+                data = viewset.get_serializer(page, many=True).data
+                return render(viewset.paginator.get_paginated_response(data).data)
+            except (exceptions.APIException, Http404) as exc:
+                return self._error(viewset, exc)
+        return require_GET(view)
+
+    def detail_view(self):
+        async def view(request, pk):
+            viewset = self._viewset(request, 'retrieve', {'pk': pk})
+            try:
+                await self._authenticate(viewset)
+                await replicas.aroute_reads(viewset.request)
+                queryset = viewset.filter_queryset(viewset.get_queryset())
+                try:
+                    with phase('queryset'):
+                        instance = await queryset.aget(pk=pk)
+                except (queryset.model.DoesNotExist, TypeError, ValueError):
+                    raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+                viewset.check_object_permissions(viewset.request, instance)
+                return render(viewset.get_serializer(instance).data)
+            except (exceptions.APIException, Http404) as exc:
+                return self._error(viewset, exc)
+        return require_GET(view)
+
+    def me_view(self):
+        """The authenticated user, rendered by the viewset's serializer; costs no queries on a warm principal cache."""
+        async def view(request):
+            viewset = self._viewset(request, 'me')
+            try:
+                await self._authenticate(viewset)
+                return render(viewset.get_serializer(viewset.request.user).data)
+            except exceptions.APIException as exc:
+                return self._error(viewset, exc)
+        return require_GET(view)
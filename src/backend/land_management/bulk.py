@@ -0,0 +1,152 @@
+"""
+Bulk verification for viewsets.
+
+``POST .../bulk_verify/`` takes either explicit ids or a filter::
+
+    {"ids": [1, 2, 3]}
+    {"filter": {"document_type": "TITLE_DEED", "is_verified": false}}
+
+Targets are resolved through the viewset's ``get_queryset`` so role scoping
+still applies. Each batch costs one SELECT classifying the ids and one UPDATE
+of those still pending, instead of a fetch and save per object. The response
+reports the outcome of every requested id.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from anchoring import queue as anchor_queue
+from changes import feed as change_feed
+from . import response_cache
+
+STAFF_TYPES = response_cache.STAFF_TYPES
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BulkVerifyMixin:
+    """
+    Viewset mixin adding a ``bulk_verify`` list action.
+
+    Subclasses set ``bulk_filter_fields`` (fields a filter may use) and
+    implement ``bulk_pending`` (a Q matching objects not yet verified) and
+    ``bulk_changes`` (the column values verification writes). Set
+    ``bulk_anchor_target`` to queue verified objects for anchoring and
+    ``bulk_cache_namespace`` to drop their cached responses. Override
+    ``bulk_check`` to refuse objects that fail a per-object check; they are
+    reported as skipped with the check's code and message. ``bulk_refuse``
+    then runs inside the batch's transaction, so anything it records about
+    the refusals commits or rolls back with the batch.
+    """
+    bulk_filter_fields = ()
+    bulk_anchor_target = None
+    bulk_cache_namespace = None
+
+    def bulk_pending(self):
+        raise NotImplementedError
+
+    def bulk_changes(self, request):
+        raise NotImplementedError
+
+    def bulk_check(self, pks):
+        """``{pk: (code, message)}`` for pending objects in ``pks`` that must not be verified."""
+        return {}
+
+    def bulk_refuse(self, refused):
+        """Record why the objects in ``refused`` were skipped; called in the batch's transaction."""
+
+    def _bulk_targets(self, request):
+        """Requested ids in order, or a Response describing why they are invalid."""
+        max_items = settings.BULK_VERIFY_MAX_ITEMS
+        ids = request.data.get('ids')
+        filters = request.data.get('filter')
+        if (ids is None) == (filters is None):
+            return Response({'error': 'Provide either ids or filter'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+                return Response({'error': 'ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+            ids = list(dict.fromkeys(ids))
+        else:
+            if not isinstance(filters, dict) or not filters:
+                return Response({'error': 'filter must be a non-empty object'}, status=status.HTTP_400_BAD_REQUEST)
+            unknown = sorted(set(filters) - set(self.bulk_filter_fields))
+            if unknown:
+                return Response({'error': f"Cannot filter on: {', '.join(unknown)}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                queryset = self.get_queryset().filter(**filters).order_by('pk')
+                ids = list(queryset.values_list('pk', flat=True)[:max_items + 1])
+            except (ValueError, TypeError, ValidationError):
+                return Response({'error': 'Invalid filter value'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(ids) > max_items:
+            return Response({'error': f'At most {max_items} items can be verified per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return ids
+
+    def _bulk_verify_batch(self, request, batch, changes):
+        model = self.get_queryset().model
+        pending_q = self.bulk_pending()
+        states = dict(
+            self.get_queryset().filter(pk__in=batch)
+            .annotate(bulk_pending=ExpressionWrapper(pending_q, output_field=BooleanField()))
+            .values_list('pk', 'bulk_pending')
+        )
+        pending = [pk for pk in batch if states.get(pk)]
+        # Checks run before the transaction, so no locks are held while they work
+        refused = self.bulk_check(pending) if pending else {}
+        pending = [pk for pk in pending if pk not in refused]
+        jobs = 0
+        with transaction.atomic():
+            if refused:
+                self.bulk_refuse(refused)
+            if pending:
+                model.objects.filter(pk__in=pending).filter(pending_q).update(**changes)
+                verified = list(model.objects.filter(pk__in=pending))
+                if self.bulk_anchor_target:
+                    jobs = len(anchor_queue.enqueue_many(self.bulk_anchor_target, verified, requested_by=request.user))
+                change_feed.record_many(verified, 'VERIFIED', actor=request.user)
+                # update() skips save signals, so drop cached responses here
+                if self.bulk_cache_namespace:
+                    response_cache.invalidate(self.bulk_cache_namespace, *pending)
+
+        results = []
+        for pk in batch:
+            if pk not in states:
+                results.append({'id': pk, 'status': 'not_found'})
+            elif pk in refused:
+                code, message = refused[pk]
+                results.append({'id': pk, 'status': 'skipped', 'code': code, 'error': message})
+            else:
+                results.append({'id': pk, 'status': 'verified' if states[pk] else 'already_verified'})
+        return results, jobs
+
+    @action(detail=False, methods=['post'])
+    def bulk_verify(self, request):
+        if request.user.user_type not in STAFF_TYPES:
+            return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        ids = self._bulk_targets(request)
+        if isinstance(ids, Response):
+            return ids
+
+        changes = self.bulk_changes(request)
+        results = []
+        jobs = 0
+        for batch in _batches(ids, settings.BULK_VERIFY_BATCH_SIZE):
+            batch_results, batch_jobs = self._bulk_verify_batch(request, batch, changes)
+            results.extend(batch_results)
+            jobs += batch_jobs
+
+        summary = {'requested': len(ids), 'verified': 0, 'already_verified': 0, 'skipped': 0, 'not_found': 0}
+        for result in results:
+            summary[result['status']] += 1
+        return Response({**summary, 'anchor_jobs': jobs, 'results': results})
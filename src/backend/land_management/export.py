@@ -0,0 +1,143 @@
+"""
+Streaming exports of whole tables as NDJSON or CSV.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)``, which uses a
+server-side cursor on PostgreSQL, and encoded a chunk at a time, so memory
+stays flat however many rows are exported and the first bytes go out as soon
+as the first chunk is read. Output can be gzip-compressed as it streams.
+
+Viewsets gain an ``export`` action via ``ExportMixin``::
+
+    GET /api/land/parcels/export/?format=csv
+    GET /api/documents/documents/export/?format=ndjson   (Accept-Encoding: gzip)
+
+The ``export_registry`` management command writes the same streams to a file.
+"""
+import csv
+import datetime
+import json
+import zlib
+from decimal import Decimal
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default, separators=(',', ':'))
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fields, chunk_size=None):
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    return queryset.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encode_ndjson(fields, rows, chunk_size):
+    for batch in _batched(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(fields, row)), default=_json_default, separators=(',', ':')) + '\n'
+            for row in batch
+        ).encode()
+
+
+def encode_csv(fields, rows, chunk_size):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields).encode()
+    for batch in _batched(rows, chunk_size):
+        yield ''.join(writer.writerow([_csv_value(value) for value in row]) for row in batch).encode()
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 writes a gzip header
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(queryset, fields, export_format, compress=False, chunk_size=None):
+    """Bytes of ``queryset`` encoded as ``export_format``, optionally gzipped."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    encode = encode_csv if export_format == 'csv' else encode_ndjson
+    chunks = encode(list(fields), export_rows(queryset, fields, chunk_size), chunk_size)
+    return gzip_stream(chunks) if compress else chunks
+
+
+class NDJSONRenderer(JSONRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(JSONRenderer):
+    # Only errors are rendered; export rows are streamed directly
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+def accepts_gzip(request):
+    for coding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip() == 'gzip' and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            return True
+    return False
+
+
+class ExportMixin:
+    """
+    Viewset mixin adding a streaming ``export`` list action over ``get_queryset``,
+    so exports follow the same role scoping as the list endpoint. Subclasses set
+    ``export_fields``.
+    """
+    export_fields = ()
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        export_format = request.accepted_renderer.format
+        compress = accepts_gzip(request)
+        response = StreamingHttpResponse(
+            stream_export(self.get_queryset(), self.export_fields, export_format, compress=compress),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response['Content-Disposition'] = content_disposition_header(True, f'{self.basename}-export.{export_format}')
+        response['Vary'] = 'Accept-Encoding'
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+        return response
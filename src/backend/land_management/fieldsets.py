@@ -0,0 +1,108 @@
+"""
+Sparse fieldsets and on-demand expansion of nested serializers.
+
+Nested serializers collapse to the related object's primary key unless the
+client expands them::
+
+    /api/land/transactions/?expand=land_parcel.current_owner,to_owner
+    /api/land/transactions/?fields=id,status,land_parcel.parcel_id
+
+``fields`` limits the readable fields returned (dotted names reach into an
+expansion and imply it); write-only fields are never dropped so the same
+serializer still accepts input. ``ShapedQuerysetMixin`` then loads only the
+joins and columns the chosen shape reads.
+"""
+from rest_framework import permissions, serializers
+
+from .instrumentation import phase
+
+
+def _split(value):
+    if not value:
+        return set()
+    if isinstance(value, str):
+        value = value.split(',')
+    return {item.strip() for item in value if item.strip()}
+
+
+def _children(paths, name):
+    prefix = f'{name}.'
+    return {path[len(prefix):] for path in paths if path.startswith(prefix)}
+
+
+class DynamicFieldsMixin:
+    """ModelSerializer mixin adding ``fields`` / ``expand`` shaping."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if fields is None and expand is None and request is not None:
+            fields = request.query_params.get('fields')
+            expand = request.query_params.get('expand')
+        self.requested_fields = _split(fields)
+        self.requested_expand = _split(expand)
+        self._shape_fields()
+
+    def _shape_fields(self):
+        requested = self.requested_fields
+        top_level = {path.split('.', 1)[0] for path in requested}
+        expand = {path.split('.', 1)[0] for path in self.requested_expand}
+        expand |= {path.split('.', 1)[0] for path in requested if '.' in path}
+
+        for name, field in list(self.fields.items()):
+            if requested and name not in top_level and not field.write_only:
+                self.fields.pop(name)
+                continue
+            if not isinstance(field, serializers.BaseSerializer):
+                continue
+            if name in expand:
+                self.fields[name] = field.__class__(
+                    *field._args,
+                    **field._kwargs,
+                    fields=_children(requested, name),
+                    expand=_children(self.requested_expand, name),
+                )
+            else:
+                source = {} if field.source == name else {'source': field.source}
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, **source)
+
+    def to_representation(self, instance):
+        with phase('serialize'):
+            return super().to_representation(instance)
+
+    def get_query_shape(self, prefix=''):
+        """
+        ``(select_related, only)`` lookups needed to render this shape.
+        """
+        model_fields = {field.name for field in self.Meta.model._meta.concrete_fields}
+        related = []
+        only = [f'{prefix}id']
+        for field in self.fields.values():
+            if field.write_only or field.source == '*':
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                path = f'{prefix}{field.source}'
+                related.append(path)
+                only.append(path)
+                child_related, child_only = field.get_query_shape(prefix=f'{path}__')
+                related.extend(child_related)
+                only.extend(child_only)
+            elif field.source in model_fields:
+                only.append(f'{prefix}{field.source}')
+        return related, only
+
+
+class ShapedQuerysetMixin:
+    """Viewset mixin applying the serializer's query shape to a queryset."""
+
+    def shape_queryset(self, queryset):
+        related, only = self.get_serializer().get_query_shape()
+        if related:
+            # select_related() with no arguments would follow every foreign key
+            queryset = queryset.select_related(*related)
+        # Write actions touch fields outside the response shape, so keep rows whole
+        if self.request.method in permissions.SAFE_METHODS:
+            queryset = queryset.only(*only)
+        return queryset
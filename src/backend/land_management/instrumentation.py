@@ -0,0 +1,279 @@
+"""
+Per-request phase timings, Server-Timing headers and Prometheus metrics.
+
+``InstrumentationMiddleware`` times each request and the phases inside it:
+
+auth
+    Authentication (``perform_authentication`` on ``TimedViewMixin`` views).
+queryset
+    Evaluating the queryset for a page or object (``paginate_queryset``,
+    ``get_object``).
+serialize
+    Top-level ``to_representation`` of the shaped serializers.
+render
+    Rendering the response body.
+db
+    Time spent executing SQL, on every database, with the query count.
+
+Phases can overlap: SQL issued while evaluating a queryset counts towards
+both ``queryset`` and ``db``. The timings go out in a ``Server-Timing``
+header (SERVER_TIMING_HEADER) and are observed into per-route histograms
+that ``metrics`` serves in the Prometheus text format.
+
+Histograms are kept in memory per process, so each worker process must be
+scraped on its own. The cost per request is a handful of clock reads, a
+wrapper call per query and one lock acquisition.
+"""
+import bisect
+import threading
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+
+PHASES = ('auth', 'queryset', 'serialize', 'render')
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+        self.open = set()
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name):
+    """Time the block as ``name`` for the current request; nested blocks of the same phase count once."""
+    timings = _current.get()
+    if timings is None or name in timings.open:
+        yield
+        return
+    timings.open.add(name)
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, perf_counter() - started)
+        timings.open.discard(name)
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, label_values, value):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total) in sorted(self.series.items()):
+            labels = _format_labels(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total!r}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, label_values):
+        self.series[label_values] = self.series.get(label_values, 0) + 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{{_format_labels(zip(self.labels, label_values))}}} {value}')
+        return lines
+
+
+def _format_labels(pairs):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in pairs)
+
+
+class Registry:
+    """The process's request metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        buckets = settings.METRICS_BUCKETS
+        with self.lock:
+            self.requests = Counter('http_requests_total', 'Requests served.', ('route', 'method', 'status'))
+            self.duration = Histogram('http_request_duration_seconds', 'Time to the response, by route.',
+                                      ('route', 'method'), buckets)
+            self.phases = Histogram('http_request_phase_seconds', 'Time spent in each request phase, by route.',
+                                    ('route', 'method', 'phase'), buckets)
+            self.queries = Histogram('http_request_queries', 'SQL queries per request, by route.',
+                                     ('route', 'method'), QUERY_COUNT_BUCKETS)
+
+    def record(self, route, method, status, seconds, timings):
+        with self.lock:
+            self.requests.inc((route, method, status))
+            self.duration.observe((route, method), seconds)
+            for name, value in timings.phases.items():
+                self.phases.observe((route, method, name), value)
+            self.queries.observe((route, method), timings.queries)
+
+    def expose(self):
+        with self.lock:
+            lines = [line for metric in (self.requests, self.duration, self.phases, self.queries)
+                     for line in metric.expose()]
+        return '\n'.join(lines) + '\n'
+
+
+registry = None
+
+
+def get_registry():
+    global registry
+    if registry is None:
+        registry = Registry()
+    return registry
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+def server_timing(timings, total):
+    entries = []
+    for name in PHASES:
+        if name in timings.phases:
+            entries.append(f'{name};dur={timings.phases[name] * 1000:.2f}')
+    queries = 'query' if timings.queries == 1 else 'queries'
+    entries.append(f'db;dur={timings.phases.get("db", 0.0) * 1000:.2f};desc="{timings.queries} {queries}"')
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class InstrumentationMiddleware:
+    """Times every request; list it first so the total covers the other middleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _watch(self, timings):
+        def timed(execute, sql, params, many, context):
+            started = perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                timings.add('db', perf_counter() - started)
+                timings.queries += 1
+
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timed))
+        return stack
+
+    def _finish(self, request, response, timings, started):
+        total = perf_counter() - started
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = server_timing(timings, total)
+        route = route_of(request)
+        if route != 'metrics':
+            get_registry().record(route, request.method, response.status_code, total, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called just before the response renders; close the phase once it has
+        timings = _current.get()
+        if timings is not None:
+            started = perf_counter()
+            response.add_post_render_callback(lambda rendered: timings.add('render', perf_counter() - started))
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = perf_counter()
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            with self._watch(timings):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            # Connections are per thread; install the wrappers where this request's queries run
+            stack = await sync_to_async(self._watch)(timings)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, started)
+
+
+class TimedViewMixin:
+    """APIView mixin timing the auth and queryset phases."""
+
+    def perform_authentication(self, request):
+        with phase('auth'):
+            super().perform_authentication(request)
+
+    def paginate_queryset(self, queryset):
+        with phase('queryset'):
+            return super().paginate_queryset(queryset)
+
+    def get_object(self):
+        with phase('queryset'):
+            return super().get_object()
+
+
+def metrics(request):
+    """
+    The process's request metrics in the Prometheus text format. Without a
+    METRICS_TOKEN the endpoint only exists while DEBUG is on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponseNotFound()
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(get_registry().expose(), content_type=CONTENT_TYPE)
@@ -0,0 +1,168 @@
+"""
+Pagination for the API.
+
+By default lists are paginated by page number, as before. Clients that pass
+``?cursor=`` (empty for the first page) get keyset pagination instead: the
+cursor holds the ordering values of the last row served, and the next page is
+fetched with a ``WHERE (ordering, id) < (last values)`` condition on the
+model's default ordering plus ``id`` as a tie-breaker. That condition is served
+by the (ordering field, id) index on each model, so a deep page costs the same
+as the first one. Keyset pages skip the ``COUNT(*)`` unless ``?count=true`` is
+passed as well.
+"""
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _cursor_value(value):
+    # Full precision: rows a few microseconds apart must not collapse together
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPageNumberPagination(PageNumberPagination):
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        page = self._cursor_page(queryset, request)
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.total = queryset.count()
+        return self._cursor_rows(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views, reading through the async ORM."""
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if self.use_cursor:
+            page = self._cursor_page(queryset, request)
+            if request.query_params.get(self.count_query_param) == 'true':
+                self.total = await queryset.acount()
+            return self._cursor_rows([row async for row in page])
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom:bottom + page_size]]
+        self.page = Page(rows, number, paginator)
+        self.request = request
+        return rows
+
+    def _cursor_page(self, queryset, request):
+        """The unevaluated queryset of the requested cursor page plus one row."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.model = queryset.model
+        self.annotations = queryset.query.annotations
+        self.total = None
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position))
+        return queryset.order_by(*self.ordering)[:self.page_size + 1]
+
+    def _cursor_rows(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page_rows = rows[:self.page_size]
+        return self.page_rows
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    def seek_filter(self, position):
+        """Rows strictly after ``position`` in lexicographic ordering order."""
+        condition = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+    def position_of(self, row):
+        return [getattr(row, field.lstrip('-')) for field in self.ordering]
+
+    def encode_cursor(self, position):
+        raw = json.dumps(position, default=_cursor_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Values come from the client: coerce each to its column's type before it reaches a query
+        values = []
+        for field, value in zip(self.ordering, position):
+            try:
+                value = self._ordering_field(field).to_python(value)
+            except (ValidationError, ValueError, TypeError, FieldDoesNotExist):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def _ordering_field(self, field):
+        name = field.lstrip('-')
+        if name in self.annotations:
+            return self.annotations[name].output_field
+        model = self.model
+        *relations, name = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(self.position_of(self.page_rows[-1]))
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        body = OrderedDict()
+        if self.total is not None:
+            body['count'] = self.total
+        body['next'] = self.get_next_link()
+        body['results'] = data
+        return Response(body)
@@ -0,0 +1,126 @@
+"""
+SQL query budgets for API endpoints.
+
+Viewsets declare ``query_budgets`` mapping an action name to the maximum number
+of queries one request may issue, e.g. ``{'list': 3, 'retrieve': 2}``. The
+budget covers authentication, pagination and serialization, so it only holds
+while related rows are loaded up front instead of once per nested object.
+
+Budgets are checked in tests with ``QueryBudgetMixin.assertWithinQueryBudget``
+and, when DEBUG is on, on every request by ``QueryBudgetMiddleware``.
+"""
+import logging
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+
+def counted(queries):
+    """Queries that count against a budget; transaction control statements do not."""
+    return [query for query in queries if not query['sql'].lstrip().upper().startswith(TRANSACTION_CONTROL)]
+
+
+def get_query_budget(viewset, action):
+    return getattr(viewset, 'query_budgets', {}).get(action)
+
+
+def _format_failure(label, budget, queries):
+    lines = [f"{label} issued {len(queries)} queries, budget is {budget}:"]
+    lines.extend(f"  {index}. {query['sql']}" for index, query in enumerate(queries, start=1))
+    return '\n'.join(lines)
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting that a block stays within a declared query budget."""
+
+    @contextmanager
+    def assertWithinQueryBudget(self, viewset, action):
+        budget = get_query_budget(viewset, action)
+        if budget is None:
+            self.fail(f"{viewset.__name__} declares no query budget for '{action}'")
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        queries = counted(context.captured_queries)
+        if len(queries) > budget:
+            self.fail(_format_failure(f"{viewset.__name__}.{action}", budget, queries))
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts queries per request and enforces the view's declared budget.
+
+    QUERY_BUDGET_MODE is 'raise' (fail the request) or 'warn' (log only). The
+    observed count is always returned in the X-Query-Count header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _watch(self, queries):
+        """Count queries into ``queries`` on every database; reads may be routed to a replica."""
+        def count(execute, sql, params, many, context):
+            queries.append({'sql': sql})
+            return execute(sql, params, many, context)
+
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(count))
+        return stack
+
+    def _check(self, request, response, queries):
+        queries = counted(queries)
+        response['X-Query-Count'] = str(len(queries))
+        budget = request._query_budget
+        if budget is not None and len(queries) > budget:
+            message = _format_failure(f"{request.method} {request.path}", budget, queries)
+            if getattr(settings, 'QUERY_BUDGET_MODE', 'raise') == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request._query_budget = None
+        queries = []
+        with self._watch(queries):
+            response = self.get_response(request)
+        return self._check(request, response, queries)
+
+    async def __acall__(self, request):
+        # Connections are per thread; the async ORM and sync views of this
+        # request all run on its thread-sensitive executor, so watch there
+        request._query_budget = None
+        queries = []
+        stack = await sync_to_async(self._watch)(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self._check(request, response, queries)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        viewset = getattr(view_func, 'cls', None)
+        actions = getattr(view_func, 'actions', None)
+        if viewset is None or not actions:
+            return None
+        action = actions.get(request.method.lower())
+        request._query_budget = get_query_budget(viewset, action)
+        return None
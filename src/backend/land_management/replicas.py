@@ -0,0 +1,157 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Reads go to the primary ('default') unless a viewset using
+``ReplicaReadsMixin`` serves a safe (GET/HEAD/OPTIONS) request, in which case
+every read in that request goes to one of DATABASE_REPLICAS. Writes, and
+reads made while handling a write, always go to the primary.
+
+Replicas lag, so a client that just wrote would otherwise read its own
+change back as missing. ``ReadYourWritesMiddleware`` pins a user to the
+primary for REPLICA_PIN_SECONDS after any successful unsafe request they
+make, such as ``approve`` or ``verify_document``. The pin lives in the shared
+cache, so it holds across processes.
+
+To try it locally, copy db.sqlite3 to db_replica.sqlite3 and set
+``DATABASE_REPLICAS = ['replica']``.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+PIN_KEY = 'replicas:pin:{}'
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def pin_key(user_id):
+    return PIN_KEY.format(user_id)
+
+
+def pin(user_id):
+    """Send ``user_id``'s reads to the primary for REPLICA_PIN_SECONDS."""
+    get_cache().set(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+async def apin(user_id):
+    await get_cache().aset(pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return bool(get_cache().get(pin_key(user_id)))
+
+
+async def ais_pinned(user_id):
+    return bool(await get_cache().aget(pin_key(user_id)))
+
+
+def _wrote(request, response):
+    user = getattr(request, 'user', None)
+    return (request.method not in SAFE_METHODS and response.status_code < 400
+            and user is not None and user.is_authenticated)
+
+
+def read_from_replica():
+    """Route the rest of this request's reads to a replica. Returns the alias, or None if there are none."""
+    replicas = settings.DATABASE_REPLICAS
+    alias = random.choice(replicas) if replicas else None
+    _read_alias.set(alias)
+    return alias
+
+
+def read_from_primary():
+    _read_alias.set(None)
+
+
+def _may_use_replica(request):
+    return bool(settings.DATABASE_REPLICAS) and request.method in SAFE_METHODS
+
+
+def route_reads(request):
+    """Send the rest of an authenticated request's reads to a replica unless it must see the primary."""
+    if not _may_use_replica(request):
+        return
+    if request.user.is_authenticated and is_pinned(request.user.pk):
+        return
+    read_from_replica()
+
+
+async def aroute_reads(request):
+    if not _may_use_replica(request):
+        return
+    if request.user.is_authenticated and await ais_pinned(request.user.pk):
+        return
+    read_from_replica()
+
+
+class ReplicaRouter:
+    """Sends reads to the replica chosen for the current request, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        return None
+
+
+class ReplicaReadsMixin:
+    """
+    Viewset mixin serving safe requests from a replica once the user is
+    authenticated, unless the user wrote within REPLICA_PIN_SECONDS.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        route_reads(request)
+
+
+class ReadYourWritesMiddleware:
+    """Pins users to the primary after their writes and resets routing between requests."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        read_from_primary()
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_primary()
+        if _wrote(request, response):
+            pin(request.user.pk)
+        return response
+
+    async def __acall__(self, request):
+        read_from_primary()
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_primary()
+        if _wrote(request, response):
+            await apin(request.user.pk)
+        return response
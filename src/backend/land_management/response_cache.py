@@ -0,0 +1,141 @@
+"""
+Read-through cache for serialized detail responses.
+
+Every cacheable object has a version counter in the cache, bumped from model
+save/delete signals. A cached response is stored under its object and request
+shape and stamped with the versions of every object it embeds, e.g. a parcel
+response depends on the parcel and on its owner. A read fetches the entry and
+those versions in two cache round trips; if any version moved since the entry
+was written it is recomputed. Changing an owner therefore drops every cached
+parcel and document that embeds them without enumerating those rows.
+
+The backend is the cache alias named by RESPONSE_CACHE_ALIAS (local memory
+by default).
+"""
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+STAFF_TYPES = ('ADMIN', 'LAND_OFFICER')
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def version_key(namespace, pk):
+    return f'rc:ver:{namespace}:{pk}'
+
+
+def _initial_version():
+    # Random rather than 1, so versions read before a cache flush never recur after it
+    return secrets.randbits(48)
+
+
+def _bump(keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def invalidate(namespace, *pks):
+    """
+    Bump object versions now and again once the surrounding transaction
+    commits, so a response recached from pre-commit data is dropped too.
+    """
+    keys = [version_key(namespace, pk) for pk in pks]
+    if not keys:
+        return
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def current_versions(keys):
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+async def acurrent_versions(keys):
+    cache = get_cache()
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, _initial_version(), None)
+            versions[key] = await cache.aget(key)
+    return versions
+
+
+def shape_key(request):
+    params = sorted((key, tuple(values)) for key, values in request.query_params.lists())
+    return hashlib.sha256(repr(params).encode()).hexdigest()[:16]
+
+
+def can_view(request, owners):
+    user = request.user
+    return getattr(user, 'user_type', None) in STAFF_TYPES or user.pk in owners
+
+
+def fetch(namespace, pk, request):
+    """Cached response data for ``request``, or None on a miss or stale entry."""
+    cache = get_cache()
+    entry = cache.get(f'rc:{namespace}:{pk}:{shape_key(request)}')
+    if entry is None or not can_view(request, entry['owners']):
+        return None
+    versions = cache.get_many(list(entry['versions']))
+    if versions != entry['versions']:
+        return None
+    return entry['data']
+
+
+def dependency_versions(dependencies):
+    """Current versions of (namespace, pk) pairs; read them before loading the rows."""
+    return current_versions([version_key(namespace, pk) for namespace, pk in dependencies if pk is not None])
+
+
+def store(namespace, pk, request, data, owners, versions):
+    """Cache ``data`` stamped with the dependency ``versions`` read before it was built."""
+    entry = {'data': data, 'owners': list(owners), 'versions': versions}
+    get_cache().set(f'rc:{namespace}:{pk}:{shape_key(request)}', entry, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+class CachedRetrieveMixin:
+    """
+    Viewset mixin serving ``retrieve`` through the response cache.
+
+    Subclasses set ``cache_namespace`` and implement ``cache_owners`` (users
+    other than staff allowed to read the object, mirroring get_queryset) and
+    ``cache_dependencies`` (objects embedded in the response).
+    """
+    cache_namespace = None
+
+    def cache_owners(self, instance):
+        raise NotImplementedError
+
+    def cache_dependencies(self, instance):
+        raise NotImplementedError
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        data = fetch(self.cache_namespace, pk, request)
+        if data is not None:
+            return Response(data)
+
+        # Read the version before the row so a concurrent write leaves this entry stale
+        versions = dependency_versions([(self.cache_namespace, pk)])
+        instance = self.get_object()
+        versions.update(dependency_versions(self.cache_dependencies(instance)))
+        data = self.get_serializer(instance).data
+        store(self.cache_namespace, pk, request, data, self.cache_owners(instance), versions)
+        return Response(data)
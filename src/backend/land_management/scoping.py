@@ -0,0 +1,25 @@
+"""
+The querysets API viewsets serve a given user, built outside a request.
+
+Exports and benchmarks call ``viewset_queryset`` so they run exactly the
+role scoping, ``?fields=``/``?expand=`` shaping and ``?q=`` filtering of the
+endpoint they stand in for, rather than a copy of it.
+"""
+from django.http import HttpRequest, QueryDict
+from rest_framework.request import Request
+
+
+def viewset_queryset(viewset_class, user, action='list', params=None):
+    """The queryset ``viewset_class`` would run for ``user`` on ``action`` with query ``params``."""
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    http_request.GET.update(params or {})
+    request = Request(http_request)
+    request.user = user
+    view = viewset_class()
+    view.action = action
+    view.format_kwarg = None
+    view.kwargs = {}
+    view.request = request
+    return view.get_queryset()
@@ -0,0 +1,159 @@
+"""
+Full-text search indexes kept beside model tables.
+
+Each SearchIndex is a side table keyed by the model's primary key: an FTS5
+virtual table on SQLite and a weighted ``tsvector`` column with a GIN index on
+PostgreSQL. Rows are written from save/delete signals (``update``/``delete``)
+and queried with ``filter``, which restricts a queryset to matching rows and
+annotates ``search_rank`` so results can be ordered best match first. Every
+search term is a prefix, so ``?q=msasani pen`` finds "Msasani Peninsula".
+
+Other database vendors fall back to ``icontains`` over ``fallback_fields``.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+WEIGHTS = 'ABCD'
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or '')]
+
+
+def flatten_text(value):
+    """Text of the string and number leaves of a JSON value."""
+    if isinstance(value, dict):
+        return ' '.join(flatten_text(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return ' '.join(flatten_text(item) for item in value)
+    if isinstance(value, bool) or value is None:
+        return ''
+    return str(value)
+
+
+class SearchIndex:
+    """
+    ``columns`` are ordered by weight: on PostgreSQL a match in the first
+    column ranks above one in the second, and so on.
+    """
+
+    def __init__(self, table, columns, fallback_fields=()):
+        self.table = table
+        self.columns = list(columns)
+        self.fallback_fields = list(fallback_fields)
+
+    def supported(self, connection):
+        return connection.vendor in ('sqlite', 'postgresql')
+
+    def create(self, connection):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                    f"{', '.join(self.columns)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute(f'CREATE TABLE IF NOT EXISTS {self.table} (id bigint PRIMARY KEY, document tsvector NOT NULL)')
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_gin ON {self.table} USING GIN (document)')
+
+    def drop(self, connection):
+        if self.supported(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def update(self, rows, using='default'):
+        """Index ``rows`` of (pk, column values), replacing any earlier entry."""
+        connection = connections[using]
+        if not self.supported(connection):
+            return
+        rows = [(pk, tuple(value or '' for value in values)) for pk, values in rows]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                placeholders = ', '.join(['%s'] * (len(self.columns) + 1))
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (rowid, {', '.join(self.columns)}) VALUES ({placeholders})",
+                    [(pk, *values) for pk, values in rows],
+                )
+            else:
+                document = ' || '.join(
+                    f"setweight(to_tsvector('simple', %s), '{WEIGHTS[min(index, 3)]}')"
+                    for index in range(len(self.columns))
+                )
+                cursor.executemany(
+                    f'INSERT INTO {self.table} (id, document) VALUES (%s, {document}) '
+                    f'ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document',
+                    [(pk, *values) for pk, values in rows],
+                )
+
+    def delete(self, pks, using='default'):
+        connection = connections[using]
+        if not self.supported(connection):
+            return
+        key = 'rowid' if connection.vendor == 'sqlite' else 'id'
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE {key} = %s', [(pk,) for pk in pks])
+
+    def match_expression(self, vendor, tokens):
+        if vendor == 'sqlite':
+            return ' '.join(f'"{token}"*' for token in tokens)
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    def filter(self, queryset, text):
+        """
+        Rows of ``queryset`` matching every term of ``text``, annotated with
+        ``search_rank``. Returns the queryset and the ordering that puts the
+        best matches first.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return queryset.none(), []
+        connection = connections[queryset.db]
+        if not self.supported(connection):
+            condition = Q()
+            for token in tokens:
+                any_field = Q()
+                for field in self.fallback_fields:
+                    any_field |= Q(**{f'{field}__icontains': token})
+                condition &= any_field
+            return queryset.filter(condition), []
+
+        meta = queryset.model._meta
+        outer = f'{connection.ops.quote_name(meta.db_table)}.{connection.ops.quote_name(meta.pk.column)}'
+        expression = self.match_expression(connection.vendor, tokens)
+        # The match is an uncorrelated subquery, so it runs once against the index
+        if connection.vendor == 'sqlite':
+            matches = RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [expression])
+            # bm25() is lower for better matches
+            rank = RawSQL(
+                f'SELECT bm25({self.table}) FROM {self.table} WHERE {self.table} MATCH %s AND rowid = {outer}',
+                [expression], output_field=FloatField(),
+            )
+            ordering = ['search_rank']
+        else:
+            from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+            matches = RawSQL(f"SELECT id FROM {self.table} WHERE document @@ to_tsquery('simple', %s)", [expression])
+            document = RawSQL(f'SELECT document FROM {self.table} WHERE id = {outer}', [],
+                              output_field=SearchVectorField())
+            rank = SearchRank(document, SearchQuery(expression, config='simple', search_type='raw'))
+            ordering = ['-search_rank']
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank), ordering
+
+
+class SearchMixin:
+    """List viewset mixin applying ``?q=`` through ``search_index``, best match first."""
+    search_index = None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        text = self.request.query_params.get('q', '')
+        if self.action != 'list' or not text.strip():
+            return queryset
+        queryset, ordering = self.search_index.filter(queryset, text)
+        return queryset.order_by(*ordering) if ordering else queryset
@@ -45,9 +45,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'land_registry.apps.LandRegistryConfig',
     'documents.apps.DocumentsConfig',
+    'anchoring.apps.AnchoringConfig',
+    'benchmarks.apps.BenchmarksConfig',
+    'changes.apps.ChangesConfig',
 ]
 
 MIDDLEWARE = [
+    'land_management.instrumentation.InstrumentationMiddleware',  # First, so its total covers the rest
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware - must come before CommonMiddleware
@@ -56,8 +60,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'land_management.replicas.ReadYourWritesMiddleware',
 ]
 
+# Enforce per-endpoint SQL query budgets while developing
+if DEBUG:
+    MIDDLEWARE.append('land_management.query_budget.QueryBudgetMiddleware')
+QUERY_BUDGET_MODE = 'raise'  # 'raise' fails over-budget requests, 'warn' only logs them
+
+# Request instrumentation, see land_management.instrumentation
+SERVER_TIMING_HEADER = True  # Per-phase timings in a Server-Timing header on every response
+METRICS_TOKEN = None  # /metrics requires 'Authorization: Bearer <token>'; unset, it is served only while DEBUG is on
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # Seconds
+
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, restrict in production
 CORS_ALLOW_CREDENTIALS = True
@@ -108,9 +123,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Local stand-in for a read replica; point at a real replica in production
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+    },
 }
 
+# Read replica routing, see land_management.replicas
+DATABASE_ROUTERS = ['land_management.replicas.ReplicaRouter']
+DATABASE_REPLICAS = []  # Aliases list and detail reads are spread over, e.g. ['replica']
+REPLICA_PIN_SECONDS = 5  # Reads stay on the primary this long after a user's write; cover the replica lag
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -159,13 +184,13 @@ AUTH_USER_MODEL = 'users.User'
 # Rest Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'land_management.pagination.KeysetPageNumberPagination',
     'PAGE_SIZE': 10,
 }
 
@@ -174,9 +199,66 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.authentication.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.authentication.TokenRefreshSerializer',
 }
+AUTH_PRINCIPAL_CACHE_SIZE = 10000  # Users kept in each process's principal cache
+AUTH_PRINCIPAL_CACHE_TTL = 30  # Seconds a cached user is trusted before it is reloaded from the database
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React frontend
 ]
+
+# Ledger settings
+LEDGER_BLOCK_SIZE = 256  # Approved transfers per Merkle-batched ledger block
+
+# Spatial index settings
+SPATIAL_GRID_CELL_SIZE = 0.01  # Grid cell edge in degrees (~1.1 km at the equator)
+SPATIAL_NEAREST_MAX_RINGS = 64  # Rings of cells searched before nearest() gives up
+SPATIAL_MAX_CELLS_PER_PARCEL = 4096  # Larger parcels go in one bucket every spatial query scans
+PARCEL_AREA_TOLERANCE = 0.05  # Largest relative difference allowed between a parcel's area and its boundary's
+PARCEL_MAX_VERTICES = 2000  # Most vertices a parcel boundary may have across all its rings
+PARCEL_OVERLAP_MIN_AREA = 1.0  # Square metres two boundaries must share before the parcels are disputed
+
+# Price rollup settings
+PRICE_ROLLUP_AREA_BUCKETS = [0, 500, 1000, 2000, 5000, 10000, 50000]  # Bucket lower bounds in square metres; backfill after changing
+
+# Blockchain anchoring queue
+ANCHOR_BACKEND = 'anchoring.backends.FakeAnchorBackend'  # Swap for a real chain client in production
+ANCHOR_BATCH_SIZE = 100
+ANCHOR_MAX_ATTEMPTS = 8
+ANCHOR_RETRY_BASE_SECONDS = 5
+ANCHOR_RETRY_MAX_SECONDS = 3600
+ANCHOR_LOCK_SECONDS = 300  # A claimed batch is retried if its worker has not finished by then
+
+# Document blob store
+BLOB_STORE_BACKEND = 'documents.storage.LocalChunkStore'
+BLOB_STORE_ROOT = BASE_DIR / 'blobstore'
+BLOB_CHUNK_SIZE = 256 * 1024  # Fixed chunk size; identical chunks are stored once
+
+# Bulk verification
+BULK_VERIFY_BATCH_SIZE = 1000  # Ids classified and updated per UPDATE statement
+BULK_VERIFY_MAX_ITEMS = 10000
+
+# Streaming exports
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched per cursor round trip and encoded per output chunk
+
+# Change feed
+CHANGES_BATCH_SIZE = 500  # Events per poll response or SSE write
+CHANGES_HEAD_TIMEOUT = 5  # Seconds the cached head seq is trusted
+CHANGES_SETTLE_SECONDS = 1  # Events become readable this long after they are written
+CHANGES_SSE_POLL_SECONDS = 1
+CHANGES_SSE_HEARTBEAT_SECONDS = 15
+CHANGES_SSE_MAX_SECONDS = 300  # Streams close after this; clients resume with Last-Event-ID
+CHANGES_SSE_RETRY_MS = 3000
+
+# Caching
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'land-management',
+    }
+}
+RESPONSE_CACHE_ALIAS = 'default'  # Point at a shared backend (e.g. Redis) when running several processes
+RESPONSE_CACHE_TIMEOUT = 300
@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from land_management.instrumentation import metrics
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -28,4 +29,8 @@ urlpatterns = [
     path('api/users/', include('users.urls')),
     path('api/land/', include('land_registry.urls')),
     path('api/documents/', include('documents.urls')),
+    path('api/anchoring/', include('anchoring.urls')),
+    path('api/changes/', include('changes.urls')),
+    path('api/async/', include('land_management.async_urls')),
+    path('metrics', metrics, name='metrics'),
 ]
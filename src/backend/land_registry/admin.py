@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LandParcel, LandTransaction
+from .models import LandParcel, LandTransaction, LedgerBlock, LedgerEntry, OwnershipInterval, ParcelOverlap, PriceRollup
 
 @admin.register(LandParcel)
 class LandParcelAdmin(admin.ModelAdmin):
@@ -14,3 +14,34 @@ class LandTransactionAdmin(admin.ModelAdmin):
     list_filter = ('status',)
     search_fields = ('land_parcel__parcel_id', 'from_owner__username', 'to_owner__username')
     readonly_fields = ('transaction_date', 'transaction_hash')
+
+@admin.register(LedgerBlock)
+class LedgerBlockAdmin(admin.ModelAdmin):
+    list_display = ('height', 'block_hash', 'entry_count', 'sealed_at')
+    readonly_fields = ('height', 'merkle_root', 'prev_block_hash', 'block_hash',
+                       'first_sequence', 'last_sequence', 'entry_count', 'sealed_at')
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('sequence', 'transaction', 'entry_hash', 'block', 'recorded_at')
+    search_fields = ('entry_hash', 'transaction__land_parcel__parcel_id')
+    readonly_fields = ('sequence', 'transaction', 'payload', 'prev_hash', 'entry_hash',
+                       'block', 'leaf_index', 'recorded_at')
+
+@admin.register(OwnershipInterval)
+class OwnershipIntervalAdmin(admin.ModelAdmin):
+    list_display = ('parcel', 'owner', 'valid_from', 'valid_to', 'transaction')
+    search_fields = ('parcel__parcel_id', 'owner__username')
+    readonly_fields = ('parcel', 'owner', 'valid_from', 'valid_to', 'transaction')
+
+@admin.register(PriceRollup)
+class PriceRollupAdmin(admin.ModelAdmin):
+    list_display = ('month', 'status', 'area_from', 'count', 'total')
+    list_filter = ('status',)
+    readonly_fields = ('month', 'status', 'area_from', 'count', 'total', 'sketch')
+
+@admin.register(ParcelOverlap)
+class ParcelOverlapAdmin(admin.ModelAdmin):
+    list_display = ('parcel_a', 'parcel_b', 'overlap_area', 'detected_at')
+    search_fields = ('parcel_a__parcel_id', 'parcel_b__parcel_id')
+    readonly_fields = ('parcel_a', 'parcel_b', 'overlap_area', 'detected_at')
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LandRegistryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'land_registry'
+
+    def ready(self):
+        from . import signals  # noqa: F401
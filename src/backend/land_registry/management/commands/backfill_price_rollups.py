@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from land_registry import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the transaction price rollups from LandTransaction. Run after loading history with '
+        'bulk_create or update(), or after changing PRICE_ROLLUP_AREA_BUCKETS; approvals made while it '
+        'runs may be lost, so run it while writes are paused'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Transactions read per round trip')
+
+    def handle(self, *args, **options):
+        transactions, count = rollups.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {transactions} transactions into {count} rollups'))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from land_registry import overlaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare every parcel boundary with its neighbours, record overlapping pairs and mark the parcels '
+        'involved DISPUTED. Run while boundaries are not being edited'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cell-size', type=float,
+                            help='Grid cell edge in degrees; defaults to twice the median parcel extent')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Candidate pairs intersected per round trip')
+        parser.add_argument('--check', action='store_true', help='Fail if any parcels overlap')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = overlaps.sweep(cell_size=options['cell_size'], chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'Compared {result.parcels} parcels in {elapsed:.1f}s: {result.candidates} candidate pairs, '
+            f'{result.overlaps} overlapping, {result.disputed} newly disputed'
+        )
+        if options['check'] and result.overlaps:
+            raise CommandError(f'{result.overlaps} pairs of parcels overlap')
+        if not result.overlaps:
+            self.stdout.write(self.style.SUCCESS('No parcel boundaries overlap'))
@@ -0,0 +1,59 @@
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.views import DocumentViewSet
+from land_management.export import EXPORT_FORMATS, stream_export
+from land_management.scoping import viewset_queryset
+from land_registry.views import LandParcelViewSet, LandTransactionViewSet
+
+User = get_user_model()
+
+VIEWSETS = {
+    'parcels': LandParcelViewSet,
+    'transactions': LandTransactionViewSet,
+    'documents': DocumentViewSet,
+}
+
+
+class Command(BaseCommand):
+    help = 'Stream parcels, transactions or documents to NDJSON or CSV with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(VIEWSETS))
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--output', help='File to write; defaults to stdout')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--as-user', help='Export only what this username can see through the API')
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        viewset = VIEWSETS[options['table']]
+        if options['as_user']:
+            try:
+                user = User.objects.get(username=options['as_user'])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user '{options['as_user']}'")
+            queryset = viewset_queryset(viewset, user, action='export')
+        else:
+            queryset = viewset.queryset.model.objects.all()
+
+        chunks = stream_export(
+            queryset, viewset.export_fields, options['format'],
+            compress=options['gzip'], chunk_size=options['chunk_size'],
+        )
+        started = time.monotonic()
+        written = 0
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+        self.stderr.write(f"Exported {options['table']}: {written} bytes in {time.monotonic() - started:.1f}s")
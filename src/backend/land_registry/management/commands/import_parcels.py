@@ -0,0 +1,270 @@
+import csv
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from land_registry.models import LandParcel
+from changes import feed as change_feed
+from land_registry import geometry, overlaps, ownership, spatial
+from land_registry.search import PARCEL_INDEX, parcel_row
+
+User = get_user_model()
+
+READ_CHUNK_SIZE = 1 << 16
+FORMATS_BY_SUFFIX = {'.csv': 'csv', '.geojsonl': 'geojsonl', '.ndjson': 'geojsonl', '.jsonl': 'geojsonl'}
+
+
+# Set on a row the reader could not parse; build_parcel rejects it with this message
+ROW_ERROR = '_error'
+
+
+def read_csv(handle):
+    for row in csv.DictReader(handle):
+        try:
+            if row.get('coordinates'):
+                row['coordinates'] = json.loads(row['coordinates'])
+            elif row.get('lat') and row.get('lng'):
+                row['coordinates'] = {'lat': float(row['lat']), 'lng': float(row['lng'])}
+        except ValueError as exc:
+            row[ROW_ERROR] = f'coordinates are unreadable: {exc}'
+        yield row
+
+
+def read_geojson_lines(handle):
+    for line in handle:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield {'properties': {ROW_ERROR: f'line is not valid JSON: {exc}'}}
+
+
+def read_geojson_features(handle):
+    """
+    Yield features of a GeoJSON FeatureCollection one at a time.
+
+    Only the current feature and one read buffer are held in memory, so the
+    input can be far larger than RAM.
+    """
+    decoder = json.JSONDecoder()
+    buffer = handle.read(READ_CHUNK_SIZE)
+    eof = not buffer
+
+    def fill(position):
+        nonlocal buffer, eof
+        chunk = handle.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        return 0
+
+    position = 0
+    while True:
+        marker = buffer.find('"features"')
+        bracket = buffer.find('[', marker) if marker != -1 else -1
+        if bracket != -1:
+            position = bracket + 1
+            break
+        if eof:
+            raise ValueError('No "features" array found')
+        # Keep the key (or a tail that may hold half of it) across reads
+        fill(marker if marker != -1 else max(len(buffer) - 16, 0))
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                raise ValueError('Unterminated "features" array')
+            position = fill(position)
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            position = fill(position)
+            continue
+        position = end
+        yield feature
+
+
+def feature_to_row(feature):
+    if not isinstance(feature, dict):
+        return {ROW_ERROR: 'feature is not an object'}
+    row = dict(feature.get('properties') or {})
+    row['coordinates'] = feature.get('geometry')
+    return row
+
+
+class OwnerCache:
+    """Bounded LRU map of national_id -> user id, filled a batch at a time."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def resolve(self, national_ids):
+        missing = [nid for nid in set(national_ids) if nid not in self.entries]
+        if missing:
+            found = dict(User.objects.filter(national_id__in=missing).values_list('national_id', 'id'))
+            for nid in missing:
+                self.entries[nid] = found.get(nid)
+        for nid in national_ids:
+            self.entries.move_to_end(nid)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return {nid: self.entries.get(nid) for nid in national_ids}
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream land parcels from a CSV or GeoJSON file into the registry. Each batch is checked for '
+        'overlaps with registered parcels and with itself, and overlapping parcels are marked DISPUTED'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV, GeoJSON FeatureCollection or newline-delimited GeoJSON file')
+        parser.add_argument('--format', choices=['csv', 'geojson', 'geojsonl'],
+                            help='Input format; guessed from the file extension by default')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--checkpoint', help='Checkpoint file; defaults to <path>.checkpoint')
+        parser.add_argument('--no-resume', action='store_true', help='Ignore an existing checkpoint')
+        parser.add_argument('--owner-cache-size', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        input_format = options['format'] or FORMATS_BY_SUFFIX.get(path.suffix.lower(), 'geojson')
+        checkpoint = Path(options['checkpoint'] or f'{path}.checkpoint')
+        batch_size = options['batch_size']
+
+        skip = 0
+        if checkpoint.exists() and not options['no_resume']:
+            skip = json.loads(checkpoint.read_text())['rows_done']
+            self.stdout.write(f'Resuming after row {skip}')
+
+        self.owners = OwnerCache(options['owner_cache_size'])
+        self.created = 0
+        self.rejected = 0
+        self.disputed = 0
+        rows_done = 0
+        started = time.monotonic()
+
+        with path.open(newline='', encoding='utf-8') as handle:
+            if input_format == 'csv':
+                rows = read_csv(handle)
+            elif input_format == 'geojsonl':
+                rows = (feature_to_row(feature) for feature in read_geojson_lines(handle))
+            else:
+                rows = (feature_to_row(feature) for feature in read_geojson_features(handle))
+
+            batch = []
+            for row in rows:
+                rows_done += 1
+                if rows_done <= skip:
+                    continue
+                batch.append((rows_done, row))
+                if len(batch) >= batch_size:
+                    self.import_batch(batch)
+                    checkpoint.write_text(json.dumps({'rows_done': rows_done}))
+                    self.report(rows_done - skip, started)
+                    batch = []
+            if batch:
+                self.import_batch(batch)
+                checkpoint.write_text(json.dumps({'rows_done': rows_done}))
+
+        elapsed = time.monotonic() - started
+        rate = (rows_done - skip) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.created} parcels, rejected {self.rejected}, disputed {self.disputed}, '
+            f'{rows_done - skip} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec)'
+        ))
+        checkpoint.unlink(missing_ok=True)
+
+    def report(self, rows, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'{rows} rows, {rows / elapsed:,.0f} rows/sec')
+
+    def import_batch(self, batch):
+        owners = self.owners.resolve([str(row.get('owner_national_id', '')) for _, row in batch])
+        parcel_ids = [str(row.get('parcel_id', '')) for _, row in batch]
+        existing = set(LandParcel.objects.filter(parcel_id__in=parcel_ids).values_list('parcel_id', flat=True))
+
+        parcels = []
+        for line, row in batch:
+            parcel, error = self.build_parcel(row, owners, existing)
+            if error:
+                self.rejected += 1
+                self.stderr.write(f'Row {line}: {error}')
+                continue
+            existing.add(parcel.parcel_id)
+            parcels.append(parcel)
+        geometry.update_geometries(parcels)
+
+        with transaction.atomic():
+            created = LandParcel.objects.bulk_create(parcels)
+            spatial.index_parcels(created, replace=False)
+            ownership.open_intervals(created)
+            PARCEL_INDEX.update(parcel_row(parcel) for parcel in created)
+            change_feed.record_many(created, 'CREATED')
+            # The same overlap check registration applies, once for the whole batch
+            found = overlaps.find_many([parcel for parcel in created if parcel.status != 'INACTIVE'])
+            self.disputed += overlaps.record(found) if found else 0
+        self.created += len(created)
+
+    def build_parcel(self, row, owners, existing):
+        if row.get(ROW_ERROR):
+            return None, row[ROW_ERROR]
+        parcel_id = str(row.get('parcel_id') or '').strip()
+        if not parcel_id or len(parcel_id) > 50:
+            return None, 'parcel_id is missing or longer than 50 characters'
+        if parcel_id in existing:
+            return None, f'parcel {parcel_id} already exists'
+        owner_id = owners.get(str(row.get('owner_national_id', '')))
+        if owner_id is None:
+            return None, f"no user with national_id {row.get('owner_national_id')!r}"
+        if not row.get('address'):
+            return None, 'address is missing'
+        if not row.get('coordinates'):
+            return None, 'coordinates are missing'
+
+        parcel = LandParcel(
+            parcel_id=parcel_id,
+            address=row['address'],
+            area=row.get('area'),
+            coordinates=row['coordinates'],
+            current_owner_id=owner_id,
+            blockchain_hash=row.get('blockchain_hash') or '',
+            status=row.get('status') or 'PENDING',
+        )
+        try:
+            polygons = geometry.polygon_rings(row['coordinates'])
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+            return None, 'polygon coordinates are malformed'
+        shape_area = None
+        if polygons:
+            # The same boundary checks registration through the API applies
+            try:
+                shape_area = geometry.check_polygons(polygons)
+            except ValueError as exc:
+                return None, str(exc)
+        parcel.update_bounding_box()
+        try:
+            parcel.clean_fields(exclude=['current_owner', 'blockchain_hash', 'registration_date'])
+        except ValidationError as error:
+            return None, error.message_dict
+        # The packed geometry is encoded for the whole batch in import_batch
+        tolerance = settings.PARCEL_AREA_TOLERANCE
+        if shape_area and abs(float(parcel.area) - shape_area) > tolerance * shape_area:
+            return None, f'area {parcel.area} differs from the boundary\'s {shape_area:.2f} m²'
+        return parcel, None
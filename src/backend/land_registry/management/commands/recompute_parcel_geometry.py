@@ -0,0 +1,74 @@
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from land_registry import geometry
+from land_registry.models import LandParcel
+
+GEOMETRY_FIELDS = ['geometry', 'shape_area', 'centroid_lng', 'centroid_lat']
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-encode every parcel boundary, re-measure its area and centroid, and report parcels whose '
+        'recorded area differs from the boundary by more than PARCEL_AREA_TOLERANCE'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Parcels measured per pass')
+        parser.add_argument('--output', help='Write every area mismatch as JSON to this path')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        tolerance = settings.PARCEL_AREA_TOLERANCE
+        parcels = LandParcel.objects.only('pk', 'parcel_id', 'area', 'coordinates').order_by('pk')
+
+        started = time.perf_counter()
+        measured = polygons = 0
+        mismatches = []
+        last_pk = 0
+        while True:
+            # Keyset pages so the updates below do not disturb the read
+            batch = list(parcels.filter(pk__gt=last_pk)[:chunk_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            geometry.update_geometries(batch)
+            LandParcel.objects.bulk_update(batch, GEOMETRY_FIELDS)
+            measured += len(batch)
+
+            recorded = np.array([float(parcel.area) for parcel in batch])
+            shapes = np.array([np.nan if parcel.shape_area is None else parcel.shape_area for parcel in batch])
+            polygons += int(np.count_nonzero(~np.isnan(shapes)))
+            with np.errstate(invalid='ignore'):
+                off = np.abs(recorded - shapes) > tolerance * shapes
+            for index in np.flatnonzero(off):
+                parcel = batch[index]
+                mismatches.append({
+                    'id': parcel.pk,
+                    'parcel_id': parcel.parcel_id,
+                    'area': recorded[index],
+                    'shape_area': round(shapes[index], 2),
+                })
+                self.stdout.write(
+                    f'parcel {parcel.parcel_id}: area {parcel.area} m², boundary {shapes[index]:.2f} m²'
+                )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'Measured {measured} parcels ({polygons} with polygon boundaries) in {elapsed:.1f}s '
+            f'({measured / elapsed if elapsed else 0:.0f} parcels/s)'
+        )
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(mismatches, indent=2))
+            self.stdout.write(f"Mismatches written to {options['output']}")
+        if mismatches:
+            self.stdout.write(self.style.WARNING(
+                f'{len(mismatches)} parcels differ from their boundary by more than {tolerance:.0%}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Every parcel area matches its boundary'))
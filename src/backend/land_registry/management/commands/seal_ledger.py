@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from land_registry import ledger
+
+
+class Command(BaseCommand):
+    help = 'Seal pending ledger entries into a block and verify the block chain'
+
+    def handle(self, *args, **options):
+        block = ledger.seal_block()
+        if block is None:
+            self.stdout.write('No pending ledger entries')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Sealed block {block.height} with {block.entry_count} entries (root {block.merkle_root})'
+            ))
+
+        bad_height = ledger.verify_block_chain()
+        if bad_height is not None:
+            self.stderr.write(self.style.ERROR(f'Block chain broken at height {bad_height}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Block chain verified'))
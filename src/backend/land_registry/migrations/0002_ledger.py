@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-18 07:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('height', models.PositiveBigIntegerField(unique=True)),
+                ('merkle_root', models.CharField(max_length=64)),
+                ('prev_block_hash', models.CharField(max_length=64)),
+                ('block_hash', models.CharField(max_length=64, unique=True)),
+                ('first_sequence', models.PositiveBigIntegerField()),
+                ('last_sequence', models.PositiveBigIntegerField()),
+                ('entry_count', models.PositiveIntegerField()),
+                ('sealed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['height'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField(unique=True)),
+                ('payload', models.JSONField()),
+                ('prev_hash', models.CharField(max_length=64)),
+                ('entry_hash', models.CharField(max_length=64, unique=True)),
+                ('leaf_index', models.PositiveIntegerField(blank=True, null=True)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('block', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='entries', to='land_registry.ledgerblock')),
+                ('transaction', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entry', to='land_registry.landtransaction')),
+            ],
+            options={
+                'ordering': ['sequence'],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2 on 2026-10-18 07:21
+
+import math
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from land_registry.geometry import bounding_box
+
+
+def index_existing_parcels(apps, schema_editor):
+    LandParcel = apps.get_model('land_registry', 'LandParcel')
+    ParcelGridCell = apps.get_model('land_registry', 'ParcelGridCell')
+    size = settings.SPATIAL_GRID_CELL_SIZE
+    for parcel in LandParcel.objects.iterator(chunk_size=1000):
+        bbox = bounding_box(parcel.coordinates)
+        if bbox is None:
+            continue
+        parcel.min_lng, parcel.min_lat, parcel.max_lng, parcel.max_lat = bbox
+        parcel.save(update_fields=['min_lng', 'min_lat', 'max_lng', 'max_lat'])
+        ParcelGridCell.objects.bulk_create(
+            ParcelGridCell(parcel=parcel, cell_x=cell_x, cell_y=cell_y)
+            for cell_x in range(math.floor(bbox[0] / size), math.floor(bbox[2] / size) + 1)
+            for cell_y in range(math.floor(bbox[1] / size), math.floor(bbox[3] / size) + 1)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0002_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='landparcel',
+            name='max_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='landparcel',
+            name='max_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='landparcel',
+            name='min_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='landparcel',
+            name='min_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ParcelGridCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell_x', models.IntegerField()),
+                ('cell_y', models.IntegerField()),
+                ('parcel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grid_cells', to='land_registry.landparcel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cell_x', 'cell_y'], name='parcel_grid_cell_idx')],
+                'constraints': [models.UniqueConstraint(fields=('parcel', 'cell_x', 'cell_y'), name='unique_parcel_grid_cell')],
+            },
+        ),
+        migrations.RunPython(index_existing_parcels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 07:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0003_parcel_spatial_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='landparcel',
+            index=models.Index(fields=['registration_date', 'id'], name='parcel_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landtransaction',
+            index=models.Index(fields=['transaction_date', 'id'], name='transaction_keyset_idx'),
+        ),
+    ]
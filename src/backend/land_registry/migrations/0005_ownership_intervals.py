@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 07:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ownership(apps, schema_editor):
+    """Rebuild history from registration and completed transactions."""
+    LandParcel = apps.get_model('land_registry', 'LandParcel')
+    LandTransaction = apps.get_model('land_registry', 'LandTransaction')
+    OwnershipInterval = apps.get_model('land_registry', 'OwnershipInterval')
+    for parcel in LandParcel.objects.iterator(chunk_size=1000):
+        transfers = list(
+            LandTransaction.objects.filter(land_parcel=parcel, status='COMPLETED').order_by('transaction_date', 'id')
+        )
+        owner_id = transfers[0].from_owner_id if transfers else parcel.current_owner_id
+        valid_from = parcel.registration_date
+        transfer = None
+        intervals = []
+        for next_transfer in transfers:
+            intervals.append(OwnershipInterval(parcel=parcel, owner_id=owner_id, valid_from=valid_from,
+                                               valid_to=next_transfer.transaction_date, transaction=transfer))
+            owner_id, valid_from, transfer = next_transfer.to_owner_id, next_transfer.transaction_date, next_transfer
+        intervals.append(OwnershipInterval(parcel=parcel, owner_id=parcel.current_owner_id,
+                                           valid_from=valid_from, transaction=transfer))
+        OwnershipInterval.objects.bulk_create(intervals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0004_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnershipInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valid_from', models.DateTimeField()),
+                ('valid_to', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ownership_intervals', to=settings.AUTH_USER_MODEL)),
+                ('parcel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ownership_intervals', to='land_registry.landparcel')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ownership_intervals', to='land_registry.landtransaction')),
+            ],
+            options={
+                'ordering': ['valid_from'],
+                'indexes': [models.Index(fields=['parcel', 'valid_from', 'valid_to'], name='ownership_parcel_time_idx'), models.Index(fields=['owner', 'valid_from', 'valid_to'], name='ownership_owner_time_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ownership, migrations.RunPython.noop),
+    ]
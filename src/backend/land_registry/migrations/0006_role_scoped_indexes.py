@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 07:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0005_ownership_intervals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='landparcel',
+            index=models.Index(fields=['current_owner', 'registration_date', 'id'], name='parcel_owner_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landparcel',
+            index=models.Index(fields=['status', 'registration_date', 'id'], name='parcel_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landtransaction',
+            index=models.Index(fields=['from_owner', 'transaction_date', 'id'], name='transaction_from_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landtransaction',
+            index=models.Index(fields=['to_owner', 'transaction_date', 'id'], name='transaction_to_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='landtransaction',
+            index=models.Index(fields=['status', 'transaction_date', 'id'], name='transaction_status_date_idx'),
+        ),
+    ]
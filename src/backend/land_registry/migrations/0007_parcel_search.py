@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from land_registry.search import PARCEL_INDEX
+
+
+def create_parcel_search(apps, schema_editor):
+    LandParcel = apps.get_model('land_registry', 'LandParcel')
+    PARCEL_INDEX.create(schema_editor.connection)
+    using = schema_editor.connection.alias
+    batch = []
+    for parcel in LandParcel.objects.using(using).only('parcel_id', 'address').iterator(chunk_size=2000):
+        batch.append((parcel.pk, (parcel.parcel_id, parcel.address)))
+        if len(batch) == 2000:
+            PARCEL_INDEX.update(batch, using=using)
+            batch = []
+    PARCEL_INDEX.update(batch, using=using)
+
+
+def drop_parcel_search(apps, schema_editor):
+    PARCEL_INDEX.drop(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0006_role_scoped_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_parcel_search, drop_parcel_search),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0007_parcel_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('area_from', models.PositiveIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('sketch', models.JSONField(default=dict)),
+            ],
+            options={
+                'ordering': ['month', 'status', 'area_from'],
+                'constraints': [models.UniqueConstraint(fields=('month', 'status', 'area_from'), name='unique_price_rollup')],
+            },
+        ),
+    ]
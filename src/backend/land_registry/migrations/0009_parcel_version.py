@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0008_price_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='landparcel',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+from land_registry.geometry import update_geometries
+
+GEOMETRY_FIELDS = ['geometry', 'shape_area', 'centroid_lng', 'centroid_lat']
+
+
+def measure_existing_parcels(apps, schema_editor):
+    LandParcel = apps.get_model('land_registry', 'LandParcel')
+    batch = []
+    for parcel in LandParcel.objects.only('pk', 'coordinates').iterator(chunk_size=2000):
+        batch.append(parcel)
+        if len(batch) == 2000:
+            update_geometries(batch)
+            LandParcel.objects.bulk_update(batch, GEOMETRY_FIELDS)
+            batch = []
+    if batch:
+        update_geometries(batch)
+        LandParcel.objects.bulk_update(batch, GEOMETRY_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0009_parcel_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='landparcel',
+            name='centroid_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='landparcel',
+            name='centroid_lng',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='landparcel',
+            name='geometry',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='landparcel',
+            name='shape_area',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(measure_existing_parcels, migrations.RunPython.noop),
+    ]
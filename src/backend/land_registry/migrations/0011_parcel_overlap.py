@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 09:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0010_parcel_geometry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParcelOverlap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overlap_area', models.FloatField()),
+                ('detected_at', models.DateTimeField(auto_now=True)),
+                ('parcel_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='land_registry.landparcel')),
+                ('parcel_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='land_registry.landparcel')),
+            ],
+            options={
+                'ordering': ['parcel_a', 'parcel_b'],
+                'indexes': [models.Index(fields=['parcel_b'], name='parcel_overlap_b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('parcel_a', 'parcel_b'), name='unique_parcel_overlap')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+def create_head(apps, schema_editor):
+    """Point the head at the current end of the chain."""
+    LedgerEntry = apps.get_model('land_registry', 'LedgerEntry')
+    LedgerHead = apps.get_model('land_registry', 'LedgerHead')
+    alias = schema_editor.connection.alias
+    tail = LedgerEntry.objects.using(alias).order_by('-sequence').first()
+    LedgerHead.objects.using(alias).create(
+        pk=1,
+        sequence=tail.sequence if tail else 0,
+        entry_hash=tail.entry_hash if tail else '0' * 64,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('land_registry', '0011_parcel_overlap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField(default=0)),
+                ('entry_hash', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.RunPython(create_head, migrations.RunPython.noop),
+    ]
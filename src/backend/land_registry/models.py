@@ -1,5 +1,7 @@
+from decimal import Decimal
 from django.db import models
 from django.conf import settings
+from .geometry import bounding_box, update_geometries
 
 class LandParcel(models.Model):
     parcel_id = models.CharField(max_length=50, unique=True)
@@ -15,13 +17,88 @@ class LandParcel(models.Model):
         ('DISPUTED', 'Under Dispute'),
         ('INACTIVE', 'Inactive')
     ], default='PENDING')
+    # Bounding box derived from coordinates, kept in sync on save
+    min_lng = models.FloatField(null=True, blank=True, editable=False)
+    min_lat = models.FloatField(null=True, blank=True, editable=False)
+    max_lng = models.FloatField(null=True, blank=True, editable=False)
+    max_lat = models.FloatField(null=True, blank=True, editable=False)
+    # Boundary polygon in the compact encoding of land_registry.geometry, with
+    # its measured area (m²) and centroid; derived from coordinates on save
+    geometry = models.BinaryField(null=True, editable=False)
+    shape_area = models.FloatField(null=True, blank=True, editable=False)
+    centroid_lng = models.FloatField(null=True, blank=True, editable=False)
+    centroid_lat = models.FloatField(null=True, blank=True, editable=False)
+    # Bumped on every change of owner; approvals can require the version they read
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-registration_date']
+        indexes = [
+            models.Index(fields=['registration_date', 'id'], name='parcel_keyset_idx'),
+            # Role-scoped listings: filter column first, then the default ordering
+            models.Index(fields=['current_owner', 'registration_date', 'id'], name='parcel_owner_date_idx'),
+            models.Index(fields=['status', 'registration_date', 'id'], name='parcel_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"Land Parcel {self.parcel_id} - {self.address}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Area the price rollups last bucketed this parcel's transactions under
+        instance._rollup_area = instance.__dict__.get('area')
+        return instance
+
+    def update_bounding_box(self):
+        bbox = bounding_box(self.coordinates)
+        self.min_lng, self.min_lat, self.max_lng, self.max_lat = bbox or (None, None, None, None)
+
+    def update_geometry(self):
+        update_geometries([self])
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'coordinates' in update_fields:
+            self.update_bounding_box()
+            self.update_geometry()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {
+                    'min_lng', 'min_lat', 'max_lng', 'max_lat',
+                    'geometry', 'shape_area', 'centroid_lng', 'centroid_lat',
+                }
+        super().save(*args, **kwargs)
+
+class ParcelGridCell(models.Model):
+    """Grid cells overlapped by a parcel's bounding box; the spatial index."""
+    parcel = models.ForeignKey(LandParcel, on_delete=models.CASCADE, related_name='grid_cells')
+    cell_x = models.IntegerField()
+    cell_y = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['cell_x', 'cell_y'], name='parcel_grid_cell_idx')]
+        constraints = [
+            models.UniqueConstraint(fields=['parcel', 'cell_x', 'cell_y'], name='unique_parcel_grid_cell'),
+        ]
+
+class ParcelOverlap(models.Model):
+    """Two registered parcels whose boundaries overlap; see land_registry.overlaps."""
+    # parcel_a has the lower id, so each pair is stored once
+    parcel_a = models.ForeignKey(LandParcel, on_delete=models.CASCADE, related_name='+')
+    parcel_b = models.ForeignKey(LandParcel, on_delete=models.CASCADE, related_name='+')
+    overlap_area = models.FloatField()  # Shared area in square metres
+    detected_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['parcel_a', 'parcel_b']
+        indexes = [models.Index(fields=['parcel_b'], name='parcel_overlap_b_idx')]
+        constraints = [
+            models.UniqueConstraint(fields=['parcel_a', 'parcel_b'], name='unique_parcel_overlap'),
+        ]
+
+    def __str__(self):
+        return f"Parcels {self.parcel_a_id} and {self.parcel_b_id} overlap by {self.overlap_area:.1f} m2"
+
 class LandTransaction(models.Model):
     land_parcel = models.ForeignKey(LandParcel, on_delete=models.PROTECT, related_name='transactions')
     from_owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='land_sold')
@@ -39,6 +116,107 @@ class LandTransaction(models.Model):
 
     class Meta:
         ordering = ['-transaction_date']
+        indexes = [
+            models.Index(fields=['transaction_date', 'id'], name='transaction_keyset_idx'),
+            models.Index(fields=['from_owner', 'transaction_date', 'id'], name='transaction_from_date_idx'),
+            models.Index(fields=['to_owner', 'transaction_date', 'id'], name='transaction_to_date_idx'),
+            models.Index(fields=['status', 'transaction_date', 'id'], name='transaction_status_date_idx'),
+        ]
 
     def __str__(self):
         return f"Transaction {self.id} - {self.land_parcel.parcel_id}"
+
+    # Changing any of these moves the transaction between price rollups
+    ROLLUP_FIELDS = ('status', 'price', 'transaction_date', 'land_parcel')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rollup_state = instance.rollup_state()
+        return instance
+
+    def rollup_state(self):
+        """(status, price, transaction_date, land_parcel_id) as counted by land_registry.rollups."""
+        # Deferred fields leave the state unknown rather than loading them
+        if any(self._meta.get_field(name).attname not in self.__dict__ for name in self.ROLLUP_FIELDS):
+            return None
+        return (self.status, Decimal(str(self.price)), self.transaction_date, self.land_parcel_id)
+
+class LedgerBlock(models.Model):
+    height = models.PositiveBigIntegerField(unique=True)
+    merkle_root = models.CharField(max_length=64)
+    prev_block_hash = models.CharField(max_length=64)
+    block_hash = models.CharField(max_length=64, unique=True)
+    first_sequence = models.PositiveBigIntegerField()
+    last_sequence = models.PositiveBigIntegerField()
+    entry_count = models.PositiveIntegerField()
+    sealed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['height']
+
+    def __str__(self):
+        return f"Block {self.height} - {self.block_hash[:16]}"
+
+class LedgerEntry(models.Model):
+    sequence = models.PositiveBigIntegerField(unique=True)
+    transaction = models.OneToOneField(LandTransaction, on_delete=models.PROTECT, related_name='ledger_entry')
+    payload = models.JSONField()  # Canonical transfer record that was hashed
+    prev_hash = models.CharField(max_length=64)
+    entry_hash = models.CharField(max_length=64, unique=True)
+    block = models.ForeignKey(LedgerBlock, on_delete=models.PROTECT, null=True, blank=True, related_name='entries')
+    leaf_index = models.PositiveIntegerField(null=True, blank=True)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['sequence']
+
+    def __str__(self):
+        return f"Ledger entry {self.sequence} - {self.entry_hash[:16]}"
+
+class LedgerHead(models.Model):
+    """The single row every append locks; mirrors the last entry of the chain."""
+    SINGLETON = 1
+
+    sequence = models.PositiveBigIntegerField(default=0)
+    entry_hash = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"Ledger head {self.sequence} - {self.entry_hash[:16]}"
+
+class OwnershipInterval(models.Model):
+    """A period during which a user held title to a parcel; valid_to is null while current."""
+    parcel = models.ForeignKey(LandParcel, on_delete=models.CASCADE, related_name='ownership_intervals')
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='ownership_intervals')
+    valid_from = models.DateTimeField()
+    valid_to = models.DateTimeField(null=True, blank=True)
+    transaction = models.ForeignKey(LandTransaction, on_delete=models.PROTECT, null=True, blank=True,
+                                    related_name='ownership_intervals')
+
+    class Meta:
+        ordering = ['valid_from']
+        indexes = [
+            models.Index(fields=['parcel', 'valid_from', 'valid_to'], name='ownership_parcel_time_idx'),
+            models.Index(fields=['owner', 'valid_from', 'valid_to'], name='ownership_owner_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.parcel_id} owned by {self.owner_id} from {self.valid_from}"
+
+class PriceRollup(models.Model):
+    """Transaction prices pre-aggregated by month, status and parcel area bucket; see land_registry.rollups."""
+    month = models.DateField()  # First day of the month
+    status = models.CharField(max_length=20)
+    area_from = models.PositiveIntegerField()  # Lower bound of the parcel area bucket, square metres
+    count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    sketch = models.JSONField(default=dict)  # Quantile sketch of the prices
+
+    class Meta:
+        ordering = ['month', 'status', 'area_from']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'status', 'area_from'], name='unique_price_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.status} from {self.area_from} m2: {self.count}"
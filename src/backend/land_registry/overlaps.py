@@ -0,0 +1,266 @@
+"""
+Detection of parcels whose boundaries overlap.
+
+A parcel is compared with the parcels the grid index finds around its
+bounding box, and each candidate's boundary is intersected exactly with
+geometry.overlap_area. Pairs sharing at least PARCEL_OVERLAP_MIN_AREA square
+metres are recorded as ParcelOverlap rows and both parcels are marked
+DISPUTED. Inactive parcels and parcels without a polygon boundary are never
+compared. Nothing here clears DISPUTED; a recorded pair is dropped once the
+boundaries no longer overlap, and resolving the dispute is left to staff.
+
+``sweep`` checks the whole registry at once with an in-memory grid join:
+every bounding box is dropped into the cells it covers, entries are sorted
+by cell, and only parcels sharing a cell are compared. Each pair is kept in
+the one cell holding the lower-left corner of the two boxes' intersection,
+so it is tested once. With cells about the size of a parcel the work is the
+sort plus the pairs that really are close, rather than every pair.
+"""
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from changes import feed as change_feed
+from land_management import response_cache
+from . import spatial
+from .geometry import METERS_PER_DEGREE, overlap_area
+from .models import LandParcel, ParcelOverlap
+
+SweepResult = namedtuple('SweepResult', ['parcels', 'candidates', 'overlaps', 'disputed'])
+
+
+def comparable(queryset=None):
+    """Parcels that take part in overlap checks."""
+    queryset = LandParcel.objects.all() if queryset is None else queryset
+    return queryset.exclude(status='INACTIVE').exclude(geometry__isnull=True)
+
+
+def box_overlap_area(boxes, other_boxes):
+    """Approximate square metres shared by bounding boxes; an upper bound on what their boundaries share."""
+    width = np.minimum(boxes[:, 2], other_boxes[:, 2]) - np.maximum(boxes[:, 0], other_boxes[:, 0])
+    height = np.minimum(boxes[:, 3], other_boxes[:, 3]) - np.maximum(boxes[:, 1], other_boxes[:, 1])
+    # Widest east-west degree within the box, at the latitude nearest the equator
+    equatorward = np.where(boxes[:, 1] * boxes[:, 3] <= 0, 0, np.minimum(np.abs(boxes[:, 1]), np.abs(boxes[:, 3])))
+    scale = METERS_PER_DEGREE ** 2 * np.cos(np.radians(equatorward))
+    return np.clip(width, 0, None) * np.clip(height, 0, None) * scale
+
+
+def find(parcel):
+    """``(parcel id, shared area)`` for every parcel overlapping ``parcel``, by id."""
+    bbox = spatial.parcel_bbox(parcel)
+    if parcel.geometry is None or bbox is None:
+        return []
+    neighbours = spatial.filter_within(comparable(), bbox).exclude(pk=parcel.pk).order_by('pk')
+    rows = list(neighbours.values_list('pk', 'geometry', 'min_lng', 'min_lat', 'max_lng', 'max_lat'))
+    if not rows:
+        return []
+    min_area = settings.PARCEL_OVERLAP_MIN_AREA
+    boxes = np.array([row[2:] for row in rows], dtype=np.float64)
+    # Neighbours whose boxes only touch cannot share enough area to matter
+    close = box_overlap_area(np.array([bbox] * len(rows), dtype=np.float64), boxes) >= min_area
+    found = []
+    for (pk, blob, *_), near in zip(rows, close):
+        area = overlap_area(parcel.geometry, blob) if near else 0
+        if area >= min_area:
+            found.append((pk, area))
+    return found
+
+
+def _pair(pk, other_pk):
+    return (pk, other_pk) if pk < other_pk else (other_pk, pk)
+
+
+def find_many(parcels):
+    """
+    ``{(parcel id, parcel id): shared area}`` for every overlap involving one
+    of ``parcels``, in two queries whatever their number. Nothing is written.
+    """
+    parcels = [parcel for parcel in parcels if parcel.geometry is not None and spatial.parcel_bbox(parcel)]
+    if not parcels:
+        return {}
+    pks = [parcel.pk for parcel in parcels]
+    neighbours = spatial.filter_sharing_cells(comparable(), pks)
+    for parcel in parcels:
+        bbox = spatial.parcel_bbox(parcel)
+        if spatial.is_oversized(bbox):
+            # Oversized parcels share no cell with the parcels they cover
+            neighbours |= spatial.filter_within(comparable(), bbox)
+    rows = list(neighbours.exclude(pk__in=pks).values_list('pk', 'min_lng', 'min_lat', 'max_lng', 'max_lat'))
+
+    # The selected parcels come first, so every pair involving one has it as ``first``
+    all_pks = np.array(pks + [row[0] for row in rows], dtype=np.int64)
+    boxes = np.array([spatial.parcel_bbox(parcel) for parcel in parcels] + [row[1:] for row in rows],
+                     dtype=np.float64)
+    first, second = candidate_pairs(boxes, default_cell_size(boxes))
+    keep = (first < len(parcels)) & (box_overlap_area(boxes[first], boxes[second]) >= settings.PARCEL_OVERLAP_MIN_AREA)
+    first, second = first[keep], second[keep]
+    if not len(first):
+        return {}
+
+    blobs = {parcel.pk: parcel.geometry for parcel in parcels}
+    needed = set(all_pks[second].tolist()) - set(blobs)
+    blobs.update(LandParcel.objects.filter(pk__in=needed).values_list('pk', 'geometry'))
+    found = {}
+    for pk, other_pk in zip(all_pks[first].tolist(), all_pks[second].tolist()):
+        area = overlap_area(blobs[pk], blobs[other_pk])
+        if area >= settings.PARCEL_OVERLAP_MIN_AREA:
+            found[_pair(pk, other_pk)] = area
+    return found
+
+
+def record(overlaps, actor=None):
+    """Store ``{(parcel id, parcel id): area}`` pairs and mark every parcel in them DISPUTED."""
+    ParcelOverlap.objects.bulk_create(
+        [ParcelOverlap(parcel_a_id=a, parcel_b_id=b, overlap_area=area) for (a, b), area in overlaps.items()],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['parcel_a', 'parcel_b'],
+        update_fields=['overlap_area', 'detected_at'],
+    )
+    return dispute({pk for pair in overlaps for pk in pair}, actor)
+
+
+def dispute(pks, actor=None):
+    """Mark the parcels in ``pks`` DISPUTED; returns how many were not already."""
+    pks = sorted(pks)
+    disputed = 0
+    for start in range(0, len(pks), 500):
+        changed = list(
+            LandParcel.objects.filter(pk__in=pks[start:start + 500]).exclude(status='DISPUTED')
+            .only('pk', 'current_owner')
+        )
+        if not changed:
+            continue
+        changed_pks = [parcel.pk for parcel in changed]
+        LandParcel.objects.filter(pk__in=changed_pks).update(status='DISPUTED')
+        for parcel in changed:
+            parcel.status = 'DISPUTED'
+        change_feed.record_many(changed, 'DISPUTED', actor=actor)
+        # update() skips save signals, so drop cached responses here
+        response_cache.invalidate('parcel', *changed_pks)
+        disputed += len(changed)
+    return disputed
+
+
+def check(parcel, actor=None):
+    """
+    Compare a saved ``parcel`` with its neighbours, record what overlaps it and
+    drop pairs it no longer overlaps. Returns what ``find`` returned.
+    """
+    found = find(parcel)
+    others = [pk for pk, _ in found]
+    with transaction.atomic():
+        ParcelOverlap.objects.filter(
+            Q(parcel_a=parcel.pk) & ~Q(parcel_b__in=others) | Q(parcel_b=parcel.pk) & ~Q(parcel_a__in=others)
+        ).delete()
+        if found:
+            record({_pair(parcel.pk, pk): area for pk, area in found}, actor)
+            parcel.status = 'DISPUTED'
+    return found
+
+
+def default_cell_size(boxes):
+    """Twice the median bounding box extent, so a cell holds a handful of parcels."""
+    extent = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+    return max(float(np.median(extent)) * 2, 1e-6)
+
+
+def candidate_pairs(boxes, cell_size):
+    """
+    Index pairs ``(i, j)`` with ``i < j`` of the rows of ``boxes`` (min_lng,
+    min_lat, max_lng, max_lat) whose boxes intersect, each pair once.
+    """
+    count = len(boxes)
+    if count < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    low = np.floor(boxes[:, :2] / cell_size).astype(np.int64)
+    high = np.floor(boxes[:, 2:] / cell_size).astype(np.int64)
+    width = high[:, 0] - low[:, 0] + 1
+    cells_per_box = width * (high[:, 1] - low[:, 1] + 1)
+
+    # Boxes covering too many cells stay out of the grid and are compared with every box directly
+    firsts, seconds = [], []
+    oversized = cells_per_box > settings.SPATIAL_MAX_CELLS_PER_PARCEL
+    for index in np.flatnonzero(oversized):
+        others = np.flatnonzero(
+            (boxes[:, 0] <= boxes[index, 2]) & (boxes[index, 0] <= boxes[:, 2])
+            & (boxes[:, 1] <= boxes[index, 3]) & (boxes[index, 1] <= boxes[:, 3])
+            & (~oversized | (np.arange(count) > index))
+        )
+        others = others[others != index]
+        firsts.append(np.minimum(others, index))
+        seconds.append(np.maximum(others, index))
+    cells_per_box[oversized] = 0
+
+    # One entry per (box, covered cell), sorted by cell
+    box = np.repeat(np.arange(count), cells_per_box)
+    step = np.arange(len(box)) - np.repeat(np.cumsum(cells_per_box) - cells_per_box, cells_per_box)
+    cell_x = low[box, 0] + step % width[box]
+    cell_y = low[box, 1] + step // width[box]
+    order = np.lexsort((box, cell_y, cell_x))
+    box, cell_x, cell_y = box[order], cell_x[order], cell_y[order]
+
+    # Entries `shift` apart in the same cell; stop once no cell holds that many
+    shift = 1
+    while shift < len(box):
+        same = np.flatnonzero((cell_x[:-shift] == cell_x[shift:]) & (cell_y[:-shift] == cell_y[shift:]))
+        if not len(same):
+            break
+        first, second = box[same], box[same + shift]
+        a, b = boxes[first], boxes[second]
+        intersects = (a[:, 0] <= b[:, 2]) & (b[:, 0] <= a[:, 2]) & (a[:, 1] <= b[:, 3]) & (b[:, 1] <= a[:, 3])
+        # Keep the pair only in the cell holding its intersection's lower-left corner
+        corner_x = np.floor(np.maximum(a[:, 0], b[:, 0]) / cell_size).astype(np.int64)
+        corner_y = np.floor(np.maximum(a[:, 1], b[:, 1]) / cell_size).astype(np.int64)
+        keep = intersects & (corner_x == cell_x[same]) & (corner_y == cell_y[same])
+        firsts.append(first[keep])
+        seconds.append(second[keep])
+        shift += 1
+    if not firsts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def sweep(cell_size=None, chunk_size=1000, actor=None):
+    """
+    Check every comparable parcel against every other, record the overlapping
+    pairs, drop recorded pairs that no longer overlap and mark the parcels
+    involved DISPUTED. Run while boundaries are not being edited.
+    """
+    rows = comparable().order_by('pk').values_list('pk', 'min_lng', 'min_lat', 'max_lng', 'max_lat')
+    pks, boxes = [], []
+    for pk, *bbox in rows.iterator(chunk_size=2000):
+        pks.append(pk)
+        boxes.append(bbox)
+    pks = np.array(pks, dtype=np.int64)
+    boxes = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+    if cell_size is None and len(boxes):
+        cell_size = default_cell_size(boxes)
+    min_area = settings.PARCEL_OVERLAP_MIN_AREA
+    first, second = candidate_pairs(boxes, cell_size)
+    if len(first):
+        close = box_overlap_area(boxes[first], boxes[second]) >= min_area
+        first, second = first[close], second[close]
+
+    found = {}
+    for start in range(0, len(first), chunk_size):
+        a = pks[first[start:start + chunk_size]].tolist()
+        b = pks[second[start:start + chunk_size]].tolist()
+        blobs = dict(LandParcel.objects.filter(pk__in=set(a) | set(b)).values_list('pk', 'geometry'))
+        for pk, other_pk in zip(a, b):
+            area = overlap_area(blobs[pk], blobs[other_pk])
+            if area >= min_area:
+                found[_pair(pk, other_pk)] = area
+
+    with transaction.atomic():
+        stale = [
+            pk for pk, a, b in ParcelOverlap.objects.values_list('pk', 'parcel_a', 'parcel_b').iterator()
+            if (a, b) not in found
+        ]
+        for start in range(0, len(stale), 500):
+            ParcelOverlap.objects.filter(pk__in=stale[start:start + 500]).delete()
+        disputed = record(found, actor)
+    return SweepResult(len(pks), len(first), len(found), disputed)
@@ -0,0 +1,67 @@
+"""
+Ownership history for land parcels.
+
+Each change of title closes the parcel's open OwnershipInterval and opens a new
+one, so "who owned X at T", "chain of title for X" and "what did U own at T"
+are each a single range query on the (parcel|owner, valid_from, valid_to)
+indexes instead of a replay of LandTransaction rows.
+"""
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OwnershipInterval
+
+
+def open_interval(parcel, at=None):
+    return OwnershipInterval.objects.create(
+        parcel=parcel,
+        owner_id=parcel.current_owner_id,
+        valid_from=at or parcel.registration_date,
+    )
+
+
+def open_intervals(parcels):
+    """Initial intervals for parcels created in bulk."""
+    OwnershipInterval.objects.bulk_create(
+        [OwnershipInterval(parcel=parcel, owner_id=parcel.current_owner_id, valid_from=parcel.registration_date)
+         for parcel in parcels],
+        batch_size=1000,
+    )
+
+
+def record_transfer(parcel, new_owner_id, transaction=None, at=None):
+    """
+    Close the parcel's open interval and open one for ``new_owner_id``.
+
+    Callers run this inside the same atomic block that changes
+    ``LandParcel.current_owner`` so history and current state never diverge.
+    """
+    at = at or timezone.now()
+    OwnershipInterval.objects.filter(parcel=parcel, valid_to__isnull=True).update(valid_to=at)
+    return OwnershipInterval.objects.create(
+        parcel=parcel,
+        owner_id=new_owner_id,
+        valid_from=at,
+        transaction=transaction,
+    )
+
+
+def active_at(at):
+    return Q(valid_from__lte=at) & (Q(valid_to__gt=at) | Q(valid_to__isnull=True))
+
+
+def interval_at(parcel, at):
+    return OwnershipInterval.objects.filter(active_at(at), parcel=parcel).select_related('owner').first()
+
+
+def chain_of_title(parcel):
+    return OwnershipInterval.objects.filter(parcel=parcel).select_related('owner').order_by('valid_from')
+
+
+def parcels_owned_at(queryset, owner_id, at):
+    # One filter() call so every condition applies to the same interval row
+    prefix = 'ownership_intervals__'
+    return queryset.filter(
+        Q(**{f'{prefix}owner_id': owner_id, f'{prefix}valid_from__lte': at})
+        & (Q(**{f'{prefix}valid_to__gt': at}) | Q(**{f'{prefix}valid_to__isnull': True}))
+    )
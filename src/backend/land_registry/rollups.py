@@ -0,0 +1,267 @@
+"""
+Market analytics over LandTransaction prices, maintained incrementally.
+
+Every transaction is counted in one PriceRollup row keyed by the month of its
+transaction_date, its status and the area bucket of its parcel. A row keeps
+the count, the price total and a quantile sketch of the prices, so an
+analytics query reads a handful of rollup rows however many transactions
+there are.
+
+Rows are adjusted as transactions are created, change status or price, or are
+deleted, and when a parcel's area moves it to another bucket, in the same
+database transaction as the change. Queryset ``update()`` and ``bulk_create``
+skip this; run ``backfill_price_rollups`` after loading history that way.
+
+The sketch is a DDSketch: prices fall into logarithmic bins of relative width
+RELATIVE_ACCURACY and only the bin counts are stored. Any quantile read from
+it is within that relative error of a true price, sketches of different rows
+merge by adding counts, and removing a price subtracts from its bin.
+"""
+import bisect
+import math
+from collections import Counter, defaultdict
+from datetime import date
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LandParcel, LandTransaction, PriceRollup
+
+# Changing this invalidates stored sketches; run backfill_price_rollups after
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+MIN_PRICE = 0.01  # Prices below this are counted in the zero bin
+
+GROUP_FIELDS = ('month', 'status', 'area')
+
+
+class PriceSketch:
+    """Mergeable quantile sketch of prices, stored as JSON on PriceRollup."""
+
+    def __init__(self, bins=None, zero=0):
+        self.bins = Counter({int(index): count for index, count in (bins or {}).items()})
+        self.zero = zero
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data.get('bins'), data.get('zero', 0))
+
+    def to_json(self):
+        return {'zero': self.zero, 'bins': {str(index): count for index, count in sorted(self.bins.items()) if count}}
+
+    @property
+    def count(self):
+        return self.zero + sum(self.bins.values())
+
+    def add(self, value, count=1):
+        value = float(value)
+        if value < MIN_PRICE:
+            self.zero += count
+            return
+        index = math.ceil(math.log(value) / LOG_GAMMA)
+        self.bins[index] += count
+        if not self.bins[index]:
+            del self.bins[index]
+
+    def merge(self, other):
+        self.zero += other.zero
+        for index, count in other.bins.items():
+            self.bins[index] += count
+        return self
+
+    def quantile(self, q):
+        """Estimate of the q-quantile, or None for an empty sketch."""
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * GAMMA ** index / (GAMMA + 1)
+        return 2 * GAMMA ** max(self.bins) / (GAMMA + 1)
+
+
+def month_of(moment):
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def area_bucket(area):
+    bounds = settings.PRICE_ROLLUP_AREA_BUCKETS
+    return bounds[max(bisect.bisect_right(bounds, float(area)) - 1, 0)]
+
+
+def area_bucket_end(area_from):
+    bounds = settings.PRICE_ROLLUP_AREA_BUCKETS
+    index = bounds.index(area_from) + 1 if area_from in bounds else len(bounds)
+    return bounds[index] if index < len(bounds) else None
+
+
+def _key(status, transaction_date, area):
+    return (month_of(transaction_date), status, area_bucket(area))
+
+
+def _locked(keys, using):
+    query = reduce(or_, [Q(month=month, status=status, area_from=area_from) for month, status, area_from in keys])
+    rollups = PriceRollup.objects.using(using).select_for_update().filter(query)
+    return {(rollup.month, rollup.status, rollup.area_from): rollup for rollup in rollups}
+
+
+def apply(changes, using='default'):
+    """Apply ``(key, price, sign)`` changes, adding (+1) or removing (-1) a price from each key's rollup."""
+    grouped = defaultdict(list)
+    for key, price, sign in changes:
+        grouped[key].append((price, sign))
+    if not grouped:
+        return
+    with db_transaction.atomic(using=using):
+        rollups = _locked(grouped, using)
+        missing = [key for key in grouped if key not in rollups]
+        if missing:
+            PriceRollup.objects.using(using).bulk_create(
+                [PriceRollup(month=month, status=status, area_from=area_from) for month, status, area_from in missing],
+                ignore_conflicts=True,
+            )
+            rollups.update(_locked(missing, using))
+        for key, items in grouped.items():
+            rollup = rollups[key]
+            sketch = PriceSketch.from_json(rollup.sketch)
+            for price, sign in items:
+                rollup.count += sign
+                rollup.total += sign * price
+                sketch.add(price, sign)
+            rollup.sketch = sketch.to_json()
+        PriceRollup.objects.using(using).bulk_update(list(rollups.values()), ['count', 'total', 'sketch'])
+
+
+def _parcel_area(parcel_id, sale, using):
+    if parcel_id == sale.land_parcel_id:
+        return sale.land_parcel.area
+    return LandParcel.objects.using(using).values_list('area', flat=True).get(pk=parcel_id)
+
+
+def remember_state(sale, using='default'):
+    """Load the stored state of a transaction saved without having been loaded from the database."""
+    if sale._state.adding or getattr(sale, '_rollup_state', None) is not None:
+        return
+    row = LandTransaction.objects.using(using).filter(pk=sale.pk).values_list(
+        'status', 'price', 'transaction_date', 'land_parcel_id'
+    ).first()
+    sale._rollup_state = row
+
+
+def transaction_saved(sale, created, update_fields=None, using='default'):
+    if update_fields is not None and not set(LandTransaction.ROLLUP_FIELDS) & set(update_fields):
+        return
+    previous = None if created else getattr(sale, '_rollup_state', None)
+    current = sale.rollup_state()
+    if previous == current:
+        return
+    changes = []
+    if previous is not None:
+        status, price, transaction_date, parcel_id = previous
+        changes.append((_key(status, transaction_date, _parcel_area(parcel_id, sale, using)), price, -1))
+    if current is not None:
+        status, price, transaction_date, parcel_id = current
+        changes.append((_key(status, transaction_date, _parcel_area(parcel_id, sale, using)), price, 1))
+    apply(changes, using=using)
+    sale._rollup_state = current
+
+
+def transaction_deleted(sale, using='default'):
+    state = getattr(sale, '_rollup_state', None) or sale.rollup_state()
+    if state is None:
+        return
+    status, price, transaction_date, parcel_id = state
+    apply([(_key(status, transaction_date, _parcel_area(parcel_id, sale, using)), price, -1)], using=using)
+
+
+def parcel_saved(parcel, created, update_fields=None, using='default'):
+    """Move a parcel's transactions to the rollups of its new area bucket."""
+    if update_fields is not None and 'area' not in update_fields:
+        return
+    previous = getattr(parcel, '_rollup_area', None)
+    parcel._rollup_area = parcel.area
+    if created or previous is None or area_bucket(previous) == area_bucket(parcel.area):
+        return
+    changes = []
+    rows = LandTransaction.objects.using(using).filter(land_parcel=parcel).values_list(
+        'status', 'price', 'transaction_date'
+    )
+    for status, price, transaction_date in rows:
+        changes.append((_key(status, transaction_date, previous), price, -1))
+        changes.append((_key(status, transaction_date, parcel.area), price, 1))
+    apply(changes, using=using)
+
+
+def rebuild(chunk_size=2000, using='default'):
+    """Recompute every rollup from LandTransaction; returns (transactions, rollups)."""
+    rollups = {}
+    sketches = defaultdict(PriceSketch)
+    rows = LandTransaction.objects.using(using).order_by().values_list(
+        'status', 'price', 'transaction_date', 'land_parcel__area'
+    ).iterator(chunk_size=chunk_size)
+    counted = 0
+    for status, price, transaction_date, area in rows:
+        key = _key(status, transaction_date, area)
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = rollups[key] = PriceRollup(month=key[0], status=status, area_from=key[2], total=Decimal(0))
+        rollup.count += 1
+        rollup.total += price
+        sketches[key].add(price)
+        counted += 1
+    for key, rollup in rollups.items():
+        rollup.sketch = sketches[key].to_json()
+    with db_transaction.atomic(using=using):
+        PriceRollup.objects.using(using).all().delete()
+        PriceRollup.objects.using(using).bulk_create(rollups.values(), batch_size=1000)
+    return counted, len(rollups)
+
+
+def summarize(rollups, group_by=(), quantiles=(0.5, 0.9)):
+    """
+    Merge rollup rows into one summary per distinct value of the ``group_by``
+    fields (any of GROUP_FIELDS), ordered by group.
+    """
+    groups = {}
+    for rollup in rollups:
+        group = tuple(rollup.area_from if field == 'area' else getattr(rollup, field) for field in group_by)
+        count, total, sketch = groups.get(group, (0, Decimal(0), PriceSketch()))
+        groups[group] = (count + rollup.count, total + rollup.total, sketch.merge(PriceSketch.from_json(rollup.sketch)))
+
+    results = []
+    cents = Decimal('0.01')
+    for group in sorted(groups):
+        count, total, sketch = groups[group]
+        if count <= 0:
+            continue
+        summary = {}
+        for field, value in zip(group_by, group):
+            if field == 'month':
+                summary['month'] = value.strftime('%Y-%m')
+            elif field == 'area':
+                summary['area_from'] = value
+                summary['area_to'] = area_bucket_end(value)
+            else:
+                summary[field] = value
+        summary.update({'count': count, 'volume': total, 'mean': (total / count).quantize(cents)})
+        for q in quantiles:
+            name = 'median' if q == 0.5 else f'p{round(q * 100)}'
+            summary[name] = Decimal(sketch.quantile(q)).quantize(cents)
+        results.append(summary)
+    return results
+
+
+def parse_month(value):
+    year, month = value.split('-')
+    return date(int(year), int(month), 1)
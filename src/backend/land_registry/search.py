@@ -0,0 +1,10 @@
+from land_management.search import SearchIndex
+
+PARCEL_INDEX = SearchIndex(
+    'land_registry_parcel_search', ['parcel_id', 'address'], fallback_fields=['parcel_id', 'address']
+)
+PARCEL_SEARCH_FIELDS = {'parcel_id', 'address'}
+
+
+def parcel_row(parcel):
+    return parcel.pk, (parcel.parcel_id, parcel.address)
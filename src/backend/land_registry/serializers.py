@@ -1,19 +1,63 @@
-from rest_framework import serializers
-from .models import LandParcel, LandTransaction
+import base64
+
+from django.conf import settings
+from rest_framework import permissions, serializers
+from land_management.fieldsets import DynamicFieldsMixin
+from .models import LandParcel, LandTransaction, OwnershipInterval
+from . import geometry
 from users.serializers import UserSerializer
 
-class LandParcelSerializer(serializers.ModelSerializer):
+class PackedGeometryField(serializers.Field):
+    """A boundary in the compact encoding of land_registry.geometry, base64 encoded."""
+
+    def to_representation(self, value):
+        return base64.b64encode(bytes(value)).decode()
+
+class LandParcelSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     current_owner = UserSerializer(read_only=True)
     current_owner_id = serializers.IntegerField(write_only=True)
+    geometry = PackedGeometryField(read_only=True)
 
     class Meta:
         model = LandParcel
-        fields = ['id', 'parcel_id', 'address', 'area', 'coordinates', 
+        fields = ['id', 'parcel_id', 'address', 'area', 'shape_area', 'coordinates', 'geometry',
                  'current_owner', 'current_owner_id', 'registration_date', 
-                 'blockchain_hash', 'status']
-        read_only_fields = ['registration_date', 'blockchain_hash']
+                 'blockchain_hash', 'status', 'version']
+        read_only_fields = ['registration_date', 'blockchain_hash', 'version', 'shape_area']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ?geometry=packed reads send the compact boundary in place of the coordinates JSON
+        request = self.context.get('request')
+        if (request is not None and request.method in permissions.SAFE_METHODS
+                and request.query_params.get('geometry') == 'packed'):
+            self.fields.pop('coordinates', None)
+        else:
+            self.fields.pop('geometry', None)
 
-class LandTransactionSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        if 'coordinates' not in attrs and 'area' not in attrs:
+            return attrs
+        coordinates = attrs.get('coordinates', getattr(self.instance, 'coordinates', None))
+        area = attrs.get('area', getattr(self.instance, 'area', None))
+        try:
+            polygons = geometry.polygon_rings(coordinates)
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+            raise serializers.ValidationError({'coordinates': 'Polygon coordinates are malformed'})
+        if not polygons:
+            return attrs
+        try:
+            measured = geometry.check_polygons(polygons)
+        except ValueError as exc:
+            raise serializers.ValidationError({'coordinates': str(exc)})
+        tolerance = settings.PARCEL_AREA_TOLERANCE
+        if area is not None and abs(float(area) - measured) > tolerance * measured:
+            raise serializers.ValidationError({
+                'area': f'Area {area} m² differs from the boundary\'s {measured:.2f} m² by more than {tolerance:.0%}'
+            })
+        return attrs
+
+class LandTransactionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     from_owner = UserSerializer(read_only=True)
     to_owner = UserSerializer(read_only=True)
     from_owner_id = serializers.IntegerField(write_only=True)
@@ -26,4 +70,12 @@ class LandTransactionSerializer(serializers.ModelSerializer):
         fields = ['id', 'land_parcel', 'land_parcel_id', 'from_owner', 
                  'from_owner_id', 'to_owner', 'to_owner_id', 'transaction_date', 
                  'transaction_hash', 'price', 'status', 'documents']
-        read_only_fields = ['transaction_date', 'transaction_hash']
\ No newline at end of file
+        read_only_fields = ['transaction_date', 'transaction_hash']
+
+class OwnershipIntervalSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    owner = UserSerializer(read_only=True)
+
+    class Meta:
+        model = OwnershipInterval
+        fields = ['id', 'parcel', 'owner', 'valid_from', 'valid_to', 'transaction']
+        read_only_fields = fields
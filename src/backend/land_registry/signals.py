@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from land_management import response_cache
+from .models import LandParcel, LandTransaction
+from . import ownership, rollups, spatial
+from .search import PARCEL_INDEX, PARCEL_SEARCH_FIELDS, parcel_row
+
+
+@receiver(post_save, sender=LandParcel)
+def index_parcel_location(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'coordinates' not in update_fields:
+        return
+    spatial.index_parcels([instance], replace=not created)
+
+
+@receiver(post_save, sender=LandParcel)
+def open_initial_ownership(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ownership.open_interval(instance)
+
+
+@receiver(post_save, sender=LandParcel)
+def index_parcel_text(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is not None and not PARCEL_SEARCH_FIELDS & set(update_fields):
+        return
+    PARCEL_INDEX.update([parcel_row(instance)], using=using)
+
+
+@receiver(post_delete, sender=LandParcel)
+def unindex_parcel_text(sender, instance, using, **kwargs):
+    PARCEL_INDEX.delete([instance.pk], using=using)
+
+
+@receiver(post_save, sender=LandParcel)
+@receiver(post_delete, sender=LandParcel)
+def invalidate_cached_parcel(sender, instance, **kwargs):
+    response_cache.invalidate('parcel', instance.pk)
+
+
+@receiver(post_save, sender=LandParcel)
+def rebucket_parcel_prices(sender, instance, created, using, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        rollups.parcel_saved(instance, created, update_fields, using=using)
+
+
+@receiver(pre_save, sender=LandTransaction)
+def remember_transaction_price(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        rollups.remember_state(instance, using=using)
+
+
+@receiver(post_save, sender=LandTransaction)
+def roll_up_transaction_price(sender, instance, created, using, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        rollups.transaction_saved(instance, created, update_fields, using=using)
+
+
+@receiver(post_delete, sender=LandTransaction)
+def remove_transaction_price(sender, instance, using, **kwargs):
+    rollups.transaction_deleted(instance, using=using)
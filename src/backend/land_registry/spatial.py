@@ -0,0 +1,142 @@
+"""
+Grid spatial index over LandParcel bounding boxes.
+
+The plane is cut into square cells of SPATIAL_GRID_CELL_SIZE degrees and every
+parcel is registered in each cell its bounding box overlaps. A viewport query
+only touches the index rows of the cells it covers, and a nearest-neighbour
+query grows a ring of cells around the point until the k-th candidate is
+provably closer than anything outside the ring.
+
+A parcel whose box would cover more than SPATIAL_MAX_CELLS_PER_PARCEL cells is
+registered once in the OVERSIZED_CELL bucket instead, which every query scans.
+"""
+import math
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+from .geometry import METERS_PER_DEGREE, bbox_distance
+from .models import ParcelGridCell
+
+
+OVERSIZED_CELL = -2 ** 31  # cell_x and cell_y of the bucket holding oversized parcels
+
+
+def cell_size():
+    return settings.SPATIAL_GRID_CELL_SIZE
+
+
+def cell_of(value):
+    return math.floor(value / cell_size())
+
+
+def cells_for_bbox(bbox):
+    min_lng, min_lat, max_lng, max_lat = bbox
+    for cell_x in range(cell_of(min_lng), cell_of(max_lng) + 1):
+        for cell_y in range(cell_of(min_lat), cell_of(max_lat) + 1):
+            yield cell_x, cell_y
+
+
+def is_oversized(bbox):
+    """True if a box covers more than SPATIAL_MAX_CELLS_PER_PARCEL cells."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    count = (cell_of(max_lng) - cell_of(min_lng) + 1) * (cell_of(max_lat) - cell_of(min_lat) + 1)
+    return count > settings.SPATIAL_MAX_CELLS_PER_PARCEL
+
+
+def parcel_cells(bbox):
+    """Grid cells to register a box under, or the oversized bucket if it covers too many."""
+    if is_oversized(bbox):
+        return [(OVERSIZED_CELL, OVERSIZED_CELL)]
+    return list(cells_for_bbox(bbox))
+
+
+def _near_cells(min_x, min_y, max_x, max_y, prefix=''):
+    return Q(**{f'{prefix}cell_x__range': (min_x, max_x), f'{prefix}cell_y__range': (min_y, max_y)}) | Q(**{
+        f'{prefix}cell_x': OVERSIZED_CELL, f'{prefix}cell_y': OVERSIZED_CELL,
+    })
+
+
+def parcel_bbox(parcel):
+    if parcel.min_lng is None:
+        return None
+    return (parcel.min_lng, parcel.min_lat, parcel.max_lng, parcel.max_lat)
+
+
+def index_parcels(parcels, replace=True):
+    """(Re)build the grid cells for ``parcels``."""
+    parcels = list(parcels)
+    if replace:
+        ParcelGridCell.objects.filter(parcel__in=[parcel.pk for parcel in parcels]).delete()
+    cells = []
+    for parcel in parcels:
+        bbox = parcel_bbox(parcel)
+        if bbox is None:
+            continue
+        cells.extend(
+            ParcelGridCell(parcel_id=parcel.pk, cell_x=cell_x, cell_y=cell_y)
+            for cell_x, cell_y in parcel_cells(bbox)
+        )
+    ParcelGridCell.objects.bulk_create(cells, batch_size=1000)
+
+
+def index_parcel(parcel):
+    index_parcels([parcel])
+
+
+def filter_sharing_cells(queryset, pks):
+    """
+    Parcels in ``queryset`` registered in a cell with any of the parcels in
+    ``pks``, plus the oversized bucket; a superset of the parcels whose boxes
+    intersect theirs, unless one of theirs is oversized.
+    """
+    shared = ParcelGridCell.objects.filter(cell_x=OuterRef('cell_x'), cell_y=OuterRef('cell_y'), parcel_id__in=pks)
+    candidates = ParcelGridCell.objects.filter(
+        Q(Exists(shared)) | Q(cell_x=OVERSIZED_CELL, cell_y=OVERSIZED_CELL)
+    ).values('parcel_id')
+    return queryset.filter(pk__in=candidates)
+
+
+def filter_within(queryset, bbox):
+    """Parcels in ``queryset`` whose bounding box intersects ``bbox``."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    candidates = ParcelGridCell.objects.filter(
+        _near_cells(cell_of(min_lng), cell_of(min_lat), cell_of(max_lng), cell_of(max_lat))
+    ).values('parcel_id')
+    return queryset.filter(
+        pk__in=candidates,
+        min_lng__lte=max_lng,
+        max_lng__gte=min_lng,
+        min_lat__lte=max_lat,
+        max_lat__gte=min_lat,
+    )
+
+
+def nearest(queryset, lng, lat, k):
+    """
+    The ``k`` parcels in ``queryset`` closest to a point, as (parcel id,
+    distance in metres) pairs ordered by distance.
+    """
+    size = cell_size()
+    center_x, center_y = cell_of(lng), cell_of(lat)
+    # Anything outside ring r is at least this far away per ring, in scaled degrees
+    ring_bound = size * max(math.cos(math.radians(lat)), 1e-6)
+    seen = {}
+    for ring in range(settings.SPATIAL_NEAREST_MAX_RINGS + 1):
+        rows = (
+            queryset.filter(_near_cells(
+                center_x - ring, center_y - ring, center_x + ring, center_y + ring, prefix='grid_cells__',
+            ))
+            .exclude(pk__in=list(seen))
+            .order_by()
+            .values_list('pk', 'min_lng', 'min_lat', 'max_lng', 'max_lat')
+            .distinct()
+        )
+        for pk, *bbox in rows:
+            seen[pk] = bbox_distance(lng, lat, bbox)
+        if len(seen) >= k:
+            kth = sorted(seen.values())[k - 1]
+            if kth <= ring * ring_bound:
+                break
+    ranked = sorted(seen.items(), key=lambda item: item[1])[:k]
+    return [(pk, distance * METERS_PER_DEGREE) for pk, distance in ranked]
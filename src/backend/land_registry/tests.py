@@ -1,9 +1,37 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import json
+import math
+import random
+import tempfile
+import tracemalloc
+from io import StringIO
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.test import TestCase, TransactionTestCase
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 from django.urls import reverse
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import LandParcel, LandTransaction
+from django.test import override_settings
+from .models import LandParcel, LandTransaction, LedgerEntry, LedgerHead, ParcelOverlap, PriceRollup
+from . import geometry, ledger, overlaps, rollups, spatial
+from .views import LandParcelViewSet, LandTransactionViewSet
+from land_management import instrumentation, replicas
+from anchoring.models import AnchorJob
+from changes.models import ChangeEvent
+from land_management.query_budget import QueryBudgetMixin
 from decimal import Decimal
 
 User = get_user_model()
@@ -67,7 +95,7 @@ class LandRegistryTests(APITestCase):
         """Test verifying a land parcel"""
         verify_url = reverse('landparcel-verify', kwargs={'pk': self.land_parcel.pk})
         response = self.client.post(verify_url)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         self.land_parcel.refresh_from_db()
         self.assertEqual(self.land_parcel.status, 'ACTIVE')
 
@@ -106,10 +134,1346 @@ class LandRegistryTests(APITestCase):
         # Admin should see all parcels
         response = self.client.get(self.land_parcel_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
         # Citizen should only see their own parcels
         self.client.force_authenticate(user=self.citizen)
         response = self.client.get(self.land_parcel_list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class LedgerTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.seller = User.objects.create_user(
+            username='seller',
+            password='SellerPass123!',
+            user_type='CITIZEN',
+            national_id='seller123'
+        )
+        self.buyer = User.objects.create_user(
+            username='buyer',
+            password='BuyerPass123!',
+            user_type='CITIZEN',
+            national_id='buyer123'
+        )
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='LEDGER1',
+            address='Ledger Street',
+            area=Decimal('100.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.seller,
+            blockchain_hash='0xledger'
+        )
+        self.client.force_authenticate(user=self.officer)
+
+    def _create_transaction(self, index=0):
+        return LandTransaction.objects.create(
+            land_parcel=self.land_parcel,
+            from_owner=self.seller,
+            to_owner=self.buyer,
+            price=Decimal('1000.00') + index,
+            transaction_hash=f'0xtx{index}'
+        )
+
+    def test_merkle_proofs_verify_for_every_leaf(self):
+        """Test that every leaf of odd and even sized trees has a valid proof"""
+        for size in (1, 2, 5, 8, 13):
+            leaves = [ledger.hash_entry(ledger.GENESIS_HASH, {'n': i}) for i in range(size)]
+            tree = ledger.MerkleTree(leaves)
+            for index, leaf in enumerate(leaves):
+                path = tree.proof(index)
+                self.assertLessEqual(len(path), size.bit_length())
+                self.assertTrue(ledger.verify_proof(leaf, path, tree.root))
+            self.assertFalse(ledger.verify_proof(leaves[0][::-1], tree.proof(0), tree.root))
+
+    @override_settings(LEDGER_BLOCK_SIZE=4)
+    def test_entries_are_chained_and_sealed_into_blocks(self):
+        """Test that appends chain hashes and seal full blocks"""
+        for index in range(6):
+            ledger.append_transfer(self._create_transaction(index))
+
+        entries = list(LedgerEntry.objects.order_by('sequence'))
+        self.assertEqual(entries[0].prev_hash, ledger.GENESIS_HASH)
+        for prev, entry in zip(entries, entries[1:]):
+            self.assertEqual(entry.prev_hash, prev.entry_hash)
+        self.assertEqual(sum(1 for entry in entries if entry.block_id), 4)
+
+        block = ledger.seal_block()
+        self.assertEqual(block.entry_count, 2)
+        self.assertIsNone(ledger.verify_block_chain())
+        self.assertIsNone(ledger.verify_entry_chain())
+
+    def test_head_follows_the_last_entry(self):
+        """Test that the head row tracks the chain and is rebuilt from the tail if it goes missing"""
+        first = ledger.append_transfer(self._create_transaction(0))
+        head = LedgerHead.objects.get()
+        self.assertEqual((head.sequence, head.entry_hash), (1, first.entry_hash))
+
+        LedgerHead.objects.all().delete()
+        second = ledger.append_transfer(self._create_transaction(1))
+        self.assertEqual((second.sequence, second.prev_hash), (2, first.entry_hash))
+        head = LedgerHead.objects.get()
+        self.assertEqual((head.sequence, head.entry_hash), (2, second.entry_hash))
+
+    def test_approve_appends_transfer_and_serves_proof(self):
+        """Test that approval records the transfer and the proof endpoint verifies"""
+        transaction = self._create_transaction()
+        approve_url = reverse('landtransaction-approve', kwargs={'pk': transaction.pk})
+        proof_url = reverse('landtransaction-proof', kwargs={'pk': transaction.pk})
+
+        response = self.client.post(approve_url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        response = self.client.get(proof_url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        ledger.seal_block()
+        response = self.client.get(proof_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(ledger.verify_proof(
+            response.data['entry_hash'], response.data['path'], response.data['block']['merkle_root']
+        ))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs row locks that queue concurrent writers')
+class LedgerConcurrencyTests(TransactionTestCase):
+    def test_concurrent_appends_extend_one_chain(self):
+        """Test that appends racing from an empty ledger each get their own sequence"""
+        seller = User.objects.create_user(username='seller', password=None, national_id='seller123')
+        buyer = User.objects.create_user(username='buyer', password=None, national_id='buyer123')
+        parcel = LandParcel.objects.create(parcel_id='RACE1', address='Race Road', area=Decimal('10.00'),
+                                           coordinates={'lat': 0.0, 'lng': 0.0}, current_owner=seller,
+                                           blockchain_hash='0xrace')
+        transactions = [
+            LandTransaction.objects.create(land_parcel=parcel, from_owner=seller, to_owner=buyer,
+                                           price=Decimal(index + 1), transaction_hash=f'0xrace{index}')
+            for index in range(24)
+        ]
+
+        def append(transaction):
+            try:
+                return ledger.append_transfer(transaction).sequence
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            sequences = list(pool.map(append, transactions))
+        self.assertEqual(sorted(sequences), list(range(1, 25)))
+        self.assertIsNone(ledger.verify_entry_chain())
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='AdminPass123!',
+            user_type='ADMIN',
+            national_id='admin123'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def _create_transactions(self, count):
+        start = LandParcel.objects.count()
+        for index in range(start, start + count):
+            seller = User.objects.create_user(username=f'seller{index}', password='x', national_id=f's{index}')
+            buyer = User.objects.create_user(username=f'buyer{index}', password='x', national_id=f'b{index}')
+            parcel = LandParcel.objects.create(
+                parcel_id=f'BUDGET{index}',
+                address='Budget Road',
+                area=Decimal('10.00'),
+                coordinates={'lat': 0.0, 'lng': 0.0},
+                current_owner=seller,
+                blockchain_hash='0xbudget'
+            )
+            LandTransaction.objects.create(
+                land_parcel=parcel,
+                from_owner=seller,
+                to_owner=buyer,
+                price=Decimal('10.00'),
+                transaction_hash=f'0xbudget{index}'
+            )
+
+    def test_transaction_list_query_count_is_constant(self):
+        """Test that listing transactions does not issue a query per row"""
+        url = reverse('landtransaction-list') + '?expand=land_parcel.current_owner,from_owner,to_owner'
+        self._create_transactions(2)
+        with self.assertWithinQueryBudget(LandTransactionViewSet, 'list') as small_page:
+            self.client.get(url)
+        self._create_transactions(8)
+        with self.assertWithinQueryBudget(LandTransactionViewSet, 'list') as full_page:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(len(small_page.captured_queries), len(full_page.captured_queries))
+
+    def test_parcel_list_within_budget(self):
+        """Test that listing parcels stays within its query budget"""
+        self._create_transactions(10)
+        with self.assertWithinQueryBudget(LandParcelViewSet, 'list'):
+            self.client.get(reverse('landparcel-list'), {'expand': 'current_owner'})
+
+
+class SpatialIndexTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.parcels = {}
+        for x in range(5):
+            for y in range(5):
+                parcel_id = f'GRID{x}{y}'
+                self.parcels[parcel_id] = LandParcel.objects.create(
+                    parcel_id=parcel_id,
+                    address='Grid Road',
+                    area=Decimal('100.00'),
+                    coordinates={'type': 'Polygon', 'coordinates': [[
+                        [39.0 + x * 0.02, -6.0 + y * 0.02],
+                        [39.005 + x * 0.02, -6.0 + y * 0.02],
+                        [39.005 + x * 0.02, -5.995 + y * 0.02],
+                        [39.0 + x * 0.02, -6.0 + y * 0.02],
+                    ]]},
+                    current_owner=self.officer,
+                    blockchain_hash='0xgrid'
+                )
+        self.client.force_authenticate(user=self.officer)
+
+    def test_within_returns_parcels_in_viewport(self):
+        """Test that a bounding box query returns only intersecting parcels"""
+        url = reverse('landparcel-within')
+        response = self.client.get(url, {'bbox': '38.999,-6.001,39.021,-5.979'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        found = {parcel['parcel_id'] for parcel in response.data['results']}
+        self.assertEqual(found, {'GRID00', 'GRID01', 'GRID10', 'GRID11'})
+
+        response = self.client.get(url, {'bbox': 'not,a,box'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_nearest_matches_brute_force(self):
+        """Test that nearest returns the k closest parcels in order"""
+        response = self.client.get(reverse('landparcel-nearest'), {'lat': -5.96, 'lng': 39.041, 'k': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['parcel_id'], 'GRID22')
+        self.assertEqual(response.data[0]['distance'], 0)
+        distances = [parcel['distance'] for parcel in response.data]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual(len(distances), 3)
+
+    def test_oversized_parcels_use_one_bucket(self):
+        """Test that a parcel spanning the globe is indexed once and still found by every query"""
+        world = LandParcel.objects.create(
+            parcel_id='WORLD',
+            address='Everywhere',
+            area=Decimal('1.00'),
+            coordinates=[[-180.0, -90.0], [180.0, -90.0], [180.0, 90.0], [-180.0, 90.0]],
+            current_owner=self.officer,
+            blockchain_hash='0xworld'
+        )
+        self.assertEqual(list(world.grid_cells.values_list('cell_x', 'cell_y')),
+                         [(spatial.OVERSIZED_CELL, spatial.OVERSIZED_CELL)])
+        response = self.client.get(reverse('landparcel-within'), {'bbox': '38.999,-6.001,39.001,-5.999'})
+        self.assertEqual({parcel['parcel_id'] for parcel in response.data['results']}, {'GRID00', 'WORLD'})
+        response = self.client.get(reverse('landparcel-nearest'), {'lat': 50.0, 'lng': 0.0, 'k': 1})
+        self.assertEqual(response.data[0]['parcel_id'], 'WORLD')
+
+        boxes = np.array([[-180, -90, 180, 90], [0, 0, 1, 1], [0.5, 0.5, 2, 2], [5, 5, 6, 6], [-10, -10, 10, 10]],
+                         dtype=np.float64)
+        with override_settings(SPATIAL_MAX_CELLS_PER_PARCEL=50):
+            first, second = overlaps.candidate_pairs(boxes, 1.0)
+        self.assertEqual(sorted(zip(first.tolist(), second.tolist())),
+                         [(0, 1), (0, 2), (0, 3), (0, 4), (1, 2), (1, 4), (2, 4), (3, 4)])
+
+    def test_index_follows_coordinate_updates(self):
+        """Test that moving a parcel moves it in the spatial index"""
+        parcel = self.parcels['GRID00']
+        parcel.coordinates = {'lat': 10.0, 'lng': 10.0}
+        parcel.save()
+        self.assertFalse(spatial.filter_within(LandParcel.objects.all(), (38.99, -6.01, 39.001, -5.999)).exists())
+        self.assertTrue(spatial.filter_within(LandParcel.objects.all(), (9.9, 9.9, 10.1, 10.1)).exists())
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='AdminPass123!',
+            user_type='ADMIN',
+            national_id='admin123'
+        )
+        for index in range(25):
+            LandParcel.objects.create(
+                parcel_id=f'PAGE{index:02d}',
+                address='Page Avenue',
+                area=Decimal('10.00'),
+                coordinates={'lat': 0.0, 'lng': 0.0},
+                current_owner=self.admin,
+                blockchain_hash='0xpage'
+            )
+        # Force ties on the ordering column so the id tie-breaker matters
+        first = LandParcel.objects.order_by('id').first()
+        LandParcel.objects.filter(id__lte=first.id + 11).update(registration_date=first.registration_date)
+        self.client.force_authenticate(user=self.admin)
+
+    def test_cursor_pages_cover_every_row_once_in_order(self):
+        """Test walking cursor pages returns all parcels in ordering order"""
+        expected = list(LandParcel.objects.order_by('-registration_date', '-id').values_list('id', flat=True))
+        seen = []
+        url = reverse('landparcel-list') + '?cursor='
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(parcel['id'] for parcel in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+    def test_count_is_opt_in(self):
+        """Test that the total is only computed when requested"""
+        response = self.client.get(reverse('landparcel-list'), {'cursor': '', 'count': 'true'})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_page_number_pagination_remains_default(self):
+        """Test that requests without a cursor keep page number pagination"""
+        response = self.client.get(reverse('landparcel-list'), {'page': 3})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get(reverse('landparcel-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        for position in (['x', 'y'], [{'a': 1}, 1], [None, 1], ['2024-01-01T00:00:00+00:00', 'seven']):
+            with self.subTest(position=position):
+                cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+                response = self.client.get(reverse('landparcel-list'), {'cursor': cursor})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ImportParcelsTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username='importer',
+            password='ImportPass123!',
+            national_id='NID-1'
+        )
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def _write(self, name, content):
+        path = Path(self.tempdir.name) / name
+        path.write_text(content)
+        return path
+
+    def test_import_csv_with_validation_and_spatial_index(self):
+        """Test importing CSV rows, rejecting bad ones and indexing the good ones"""
+        path = self._write('parcels.csv', (
+            'parcel_id,address,area,lat,lng,owner_national_id\n'
+            'CSV1,One Road,100.00,-6.8,39.2,NID-1\n'
+            'CSV2,Two Road,200.00,-6.9,39.3,NID-1\n'
+            'CSV3,Bad Owner,50.00,-6.9,39.3,UNKNOWN\n'
+            'CSV4,Bad Area,not-a-number,-6.9,39.3,NID-1\n'
+        ))
+        call_command('import_parcels', str(path), batch_size=2, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(set(LandParcel.objects.values_list('parcel_id', flat=True)), {'CSV1', 'CSV2'})
+        found = spatial.filter_within(LandParcel.objects.all(), (39.19, -6.81, 39.21, -6.79))
+        self.assertEqual([parcel.parcel_id for parcel in found], ['CSV1'])
+        self.assertFalse(Path(f'{path}.checkpoint').exists())
+
+    def test_unreadable_and_invalid_rows_are_rejected(self):
+        """Test that malformed rows and crossing boundaries are rejected without stopping the import"""
+        bowtie = json.dumps([[39.0, -6.0], [39.001, -5.999], [39.001, -6.0], [39.0, -5.999]])
+        rows = [
+            ['parcel_id', 'address', 'area', 'lat', 'lng', 'coordinates', 'owner_national_id'],
+            ['BAD1', 'Bad JSON', '10.00', '', '', '{not json', 'NID-1'],
+            ['BAD2', 'Bad Lat', '10.00', 'north', '39.2', '', 'NID-1'],
+            ['BAD3', 'Crossing', '10.00', '', '', bowtie, 'NID-1'],
+            ['GOOD', 'Good Road', '10.00', '-6.8', '39.2', '', 'NID-1'],
+        ]
+        buffer = StringIO()
+        csv.writer(buffer).writerows(rows)
+        path = self._write('parcels.csv', buffer.getvalue())
+        stderr = StringIO()
+        call_command('import_parcels', str(path), stdout=StringIO(), stderr=stderr)
+        self.assertEqual(list(LandParcel.objects.values_list('parcel_id', flat=True)), ['GOOD'])
+        errors = stderr.getvalue()
+        self.assertIn('Row 1: coordinates are unreadable', errors)
+        self.assertIn('Row 2: coordinates are unreadable', errors)
+        self.assertIn('Row 3: Boundary edges cross each other', errors)
+
+    def test_imported_overlaps_are_disputed(self):
+        """Test that imports encode boundaries a batch at a time and dispute what overlaps"""
+        def square(lng, size=0.001):
+            return {'type': 'Polygon', 'coordinates': [[
+                [lng, -6.0], [lng + size, -6.0], [lng + size, -6.0 + size], [lng, -6.0 + size], [lng, -6.0],
+            ]]}
+
+        area = f'{geometry.check_polygons(geometry.polygon_rings(square(39.0))):.2f}'
+        registered = LandParcel.objects.create(parcel_id='REGISTERED', address='Old Road', area=Decimal(area),
+                                               coordinates=square(39.0), current_owner=self.owner,
+                                               blockchain_hash='0xold', status='ACTIVE')
+        lines = [json.dumps({'type': 'Feature', 'geometry': square(lng), 'properties': {
+            'parcel_id': parcel_id, 'address': 'New Road', 'area': area, 'owner_national_id': 'NID-1',
+        }}) for parcel_id, lng in (('CLAIM', 39.0005), ('APART', 39.1), ('LEFT', 39.2), ('RIGHT', 39.2005))]
+        path = self._write('parcels.geojsonl', '\n'.join(lines))
+
+        with mock.patch.object(geometry, 'update_geometries', wraps=geometry.update_geometries) as encode:
+            call_command('import_parcels', str(path), batch_size=2, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual([len(call.args[0]) for call in encode.call_args_list], [2, 2])
+        statuses = dict(LandParcel.objects.values_list('parcel_id', 'status'))
+        self.assertEqual(statuses, {'REGISTERED': 'DISPUTED', 'CLAIM': 'DISPUTED', 'APART': 'PENDING',
+                                    'LEFT': 'DISPUTED', 'RIGHT': 'DISPUTED'})
+        pairs = {tuple(LandParcel.objects.get(pk=pk).parcel_id for pk in pair)
+                 for pair in ParcelOverlap.objects.values_list('parcel_a', 'parcel_b')}
+        self.assertEqual(pairs, {('REGISTERED', 'CLAIM'), ('LEFT', 'RIGHT')})
+        self.assertIsNotNone(LandParcel.objects.get(parcel_id='APART').geometry)
+
+    def test_import_geojson_resumes_from_checkpoint(self):
+        """Test streaming a FeatureCollection and resuming after a checkpoint"""
+        features = [{
+            'type': 'Feature',
+            'properties': {'parcel_id': f'GEO{index}', 'address': 'Geo Street',
+                           'area': '10.00', 'owner_national_id': 'NID-1'},
+            'geometry': {'type': 'Point', 'coordinates': [39.0 + index, -6.0]},
+        } for index in range(5)]
+        path = self._write('parcels.geojson', json.dumps({'type': 'FeatureCollection', 'features': features}, indent=2))
+        Path(f'{path}.checkpoint').write_text(json.dumps({'rows_done': 3}))
+
+        call_command('import_parcels', str(path), stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(set(LandParcel.objects.values_list('parcel_id', flat=True)), {'GEO3', 'GEO4'})
+
+    def test_geojson_reader_handles_features_split_across_reads(self):
+        """Test the streaming reader with a read buffer smaller than a feature"""
+        from land_registry.management.commands import import_parcels
+        features = [{'type': 'Feature', 'properties': {'n': index}, 'geometry': None} for index in range(50)]
+        handle = StringIO(json.dumps({'type': 'FeatureCollection', 'features': features}))
+        with mock.patch.object(import_parcels, 'READ_CHUNK_SIZE', 7):
+            parsed = list(import_parcels.read_geojson_features(handle))
+        self.assertEqual([feature['properties']['n'] for feature in parsed], list(range(50)))
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='AdminPass123!',
+            user_type='ADMIN',
+            national_id='admin123'
+        )
+        self.buyer = User.objects.create_user(
+            username='buyer',
+            password='BuyerPass123!',
+            national_id='buyer123'
+        )
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='SHAPE1',
+            address='Shape Street',
+            area=Decimal('10.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.admin,
+            blockchain_hash='0xshape'
+        )
+        self.transaction = LandTransaction.objects.create(
+            land_parcel=self.land_parcel,
+            from_owner=self.admin,
+            to_owner=self.buyer,
+            price=Decimal('10.00'),
+            transaction_hash='0xshape'
+        )
+        self.url = reverse('landtransaction-detail', kwargs={'pk': self.transaction.pk})
+        self.client.force_authenticate(user=self.admin)
+
+    def test_nested_objects_collapse_to_ids(self):
+        """Test that nested serializers return primary keys unless expanded"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['land_parcel'], self.land_parcel.pk)
+        self.assertEqual(response.data['to_owner'], self.buyer.pk)
+        self.assertNotIn('JOIN', context.captured_queries[-1]['sql'])
+
+    def test_expand_nested_path(self):
+        """Test that dotted expansion reaches nested serializers"""
+        response = self.client.get(self.url, {'expand': 'land_parcel.current_owner,to_owner'})
+        self.assertEqual(response.data['land_parcel']['parcel_id'], 'SHAPE1')
+        self.assertEqual(response.data['land_parcel']['current_owner']['username'], 'admin')
+        self.assertEqual(response.data['to_owner']['username'], 'buyer')
+        self.assertEqual(response.data['from_owner'], self.admin.pk)
+
+    def test_fields_limit_output_and_columns(self):
+        """Test that ?fields= selects output fields and the columns loaded"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'fields': 'id,status,land_parcel.parcel_id'})
+        self.assertEqual(response.data, {
+            'id': self.transaction.pk,
+            'status': 'PENDING',
+            'land_parcel': {'parcel_id': 'SHAPE1'},
+        })
+        sql = context.captured_queries[-1]['sql']
+        self.assertNotIn('"price"', sql)
+        self.assertIn('"parcel_id"', sql)
+
+
+class OwnershipHistoryTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.seller = User.objects.create_user(username='seller', password='x', national_id='seller123')
+        self.buyer = User.objects.create_user(username='buyer', password='x', national_id='buyer123')
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='TITLE1',
+            address='Title Road',
+            area=Decimal('10.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.seller,
+            blockchain_hash='0xtitle'
+        )
+        self.transaction = LandTransaction.objects.create(
+            land_parcel=self.land_parcel,
+            from_owner=self.seller,
+            to_owner=self.buyer,
+            price=Decimal('10.00'),
+            transaction_hash='0xtitle'
+        )
+        self.client.force_authenticate(user=self.officer)
+
+    def _approve(self):
+        self.before = timezone.now()
+        self.client.post(reverse('landtransaction-approve', kwargs={'pk': self.transaction.pk}))
+        self.after = timezone.now()
+
+    def test_approve_records_chain_of_title(self):
+        """Test that approval closes the seller interval and opens the buyer's"""
+        self._approve()
+        response = self.client.get(reverse('landparcel-title-chain', kwargs={'pk': self.land_parcel.pk}))
+        self.assertEqual([interval['owner'] for interval in response.data], [self.seller.pk, self.buyer.pk])
+        self.assertIsNotNone(response.data[0]['valid_to'])
+        self.assertIsNone(response.data[1]['valid_to'])
+        self.assertEqual(response.data[1]['transaction'], self.transaction.pk)
+
+    def test_owner_at_point_in_time(self):
+        """Test as-of ownership lookups on either side of a transfer"""
+        self._approve()
+        url = reverse('landparcel-owner-at', kwargs={'pk': self.land_parcel.pk})
+        response = self.client.get(url, {'at': self.before.isoformat()})
+        self.assertEqual(response.data['owner'], self.seller.pk)
+        response = self.client.get(url, {'at': self.after.isoformat()})
+        self.assertEqual(response.data['owner'], self.buyer.pk)
+        response = self.client.get(url, {'at': '1990-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, {'at': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_parcels_owned_by_user_at_time(self):
+        """Test listing the parcels a user held at a given time"""
+        self._approve()
+        url = reverse('landparcel-owned-at')
+        response = self.client.get(url, {'owner': self.seller.pk, 'at': self.before.isoformat()})
+        self.assertEqual([parcel['parcel_id'] for parcel in response.data['results']], ['TITLE1'])
+        response = self.client.get(url, {'owner': self.seller.pk})
+        self.assertEqual(response.data['results'], [])
+
+
+class ParcelSearchTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.owner = User.objects.create_user(username='owner', password='x', national_id='owner123')
+        addresses = ['12 Msasani Peninsula, Dar es Salaam', 'Plot 4 Mikocheni', 'Msasani Road, Kinondoni']
+        self.parcels = [
+            LandParcel.objects.create(
+                parcel_id=f'SEARCH{index}',
+                address=address,
+                area=Decimal('10.00'),
+                coordinates={'lat': 0.0, 'lng': 0.0},
+                current_owner=self.owner if index == 2 else self.officer,
+                blockchain_hash='0xsearch'
+            )
+            for index, address in enumerate(addresses)
+        ]
+        self.url = reverse('landparcel-list')
+        self.client.force_authenticate(user=self.officer)
+
+    def _search(self, text):
+        response = self.client.get(self.url, {'q': text})
+        return [row['parcel_id'] for row in response.data['results']]
+
+    def test_search_matches_word_prefixes(self):
+        """Test that every term must match as a word prefix"""
+        self.assertEqual(self._search('msasani pen'), ['SEARCH0'])
+        self.assertEqual(sorted(self._search('msas')), ['SEARCH0', 'SEARCH2'])
+        self.assertEqual(self._search('search1'), ['SEARCH1'])
+        self.assertEqual(self._search('oyster'), [])
+
+    def test_search_index_follows_saves_and_deletes(self):
+        """Test that edited and deleted parcels are reflected in search results"""
+        parcel = self.parcels[1]
+        parcel.address = 'Oyster Bay'
+        parcel.save()
+        self.assertEqual(self._search('oyster'), ['SEARCH1'])
+        self.assertEqual(self._search('mikocheni'), [])
+        parcel.delete()
+        self.assertEqual(self._search('oyster'), [])
+
+    def test_search_respects_role_scoping(self):
+        """Test that citizens only find their own parcels"""
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(self._search('msasani'), ['SEARCH2'])
+
+    def test_search_results_page_with_cursors(self):
+        """Test walking ranked search results with keyset cursors"""
+        seen = []
+        params = {'q': 'msasani', 'cursor': '', 'page_size': 1}
+        while True:
+            response = self.client.get(self.url, params)
+            seen.extend(row['parcel_id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            params['cursor'] = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+        self.assertEqual(sorted(seen), ['SEARCH0', 'SEARCH2'])
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.owner = User.objects.create_user(username='owner', password='x', national_id='owner123')
+        for index in range(5):
+            LandParcel.objects.create(
+                parcel_id=f'EXPORT{index}',
+                address=f'{index} Export Street',
+                area=Decimal('10.50'),
+                coordinates={'lat': -6.8, 'lng': 39.2},
+                current_owner=self.owner if index < 2 else self.officer,
+                blockchain_hash='0xexport'
+            )
+        self.url = reverse('landparcel-export')
+
+    def test_csv_export_follows_role_scoping(self):
+        """Test that a citizen's CSV export holds only their parcels"""
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], list(LandParcelViewSet.export_fields))
+        self.assertEqual([row[1] for row in rows[1:]], ['EXPORT0', 'EXPORT1'])
+        self.assertEqual(json.loads(rows[1][4]), {'lat': -6.8, 'lng': 39.2})
+
+    def test_ndjson_export_is_gzipped_on_request(self):
+        """Test streaming a gzip-compressed NDJSON export"""
+        self.client.force_authenticate(user=self.officer)
+        response = self.client.get(self.url, {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['area'], '10.50')
+
+    def test_export_command_writes_every_row(self):
+        """Test the export_registry command with a small chunk size"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'parcels.ndjson.gz'
+            call_command('export_registry', 'parcels', output=str(path), gzip=True, chunk_size=2, stderr=StringIO())
+            lines = gzip.decompress(path.read_bytes()).decode().splitlines()
+        self.assertEqual([json.loads(line)['parcel_id'] for line in lines], [f'EXPORT{index}' for index in range(5)])
+
+    def test_export_command_scopes_to_a_user(self):
+        """Test that export_registry --as-user exports what that user's list endpoint serves"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'parcels.ndjson'
+            call_command('export_registry', 'parcels', output=str(path), as_user='owner', stderr=StringIO())
+            lines = path.read_text().splitlines()
+        self.assertEqual([json.loads(line)['parcel_id'] for line in lines], ['EXPORT0', 'EXPORT1'])
+
+class PriceRollupTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.seller = User.objects.create_user(username='seller', password='x', national_id='seller123')
+        self.buyer = User.objects.create_user(username='buyer', password='x', national_id='buyer123')
+        self.small = self._parcel('SMALL', Decimal('300.00'))
+        self.large = self._parcel('LARGE', Decimal('7500.00'))
+        self.url = reverse('landtransaction-analytics')
+        self.client.force_authenticate(user=self.officer)
+
+    def _parcel(self, parcel_id, area):
+        return LandParcel.objects.create(
+            parcel_id=parcel_id,
+            address='Market Street',
+            area=area,
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.seller,
+            blockchain_hash='0xrollup'
+        )
+
+    def _sale(self, parcel, price):
+        return LandTransaction.objects.create(
+            land_parcel=parcel,
+            from_owner=self.seller,
+            to_owner=self.buyer,
+            transaction_hash='0xsale',
+            price=Decimal(price)
+        )
+
+    def _rollups(self):
+        return sorted((r.month, r.status, r.area_from, r.count, r.total, json.dumps(r.sketch, sort_keys=True))
+                      for r in PriceRollup.objects.exclude(count=0))
+
+    def test_approve_rolls_up_completed_prices(self):
+        """Test that approved sales show up in the analytics with their median and mean"""
+        sales = [self._sale(self._parcel(f'SMALL{price}', Decimal('300.00')), price)
+                 for price in ('100000', '200000', '300000')]
+        self._sale(self.large, '900000')
+        for sale in sales:
+            self.client.post(reverse('landtransaction-approve', kwargs={'pk': sale.pk}))
+
+        response = self.client.get(self.url, {'group_by': 'area'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [summary] = response.data['results']
+        self.assertEqual((summary['area_from'], summary['area_to']), (0, 500))
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['volume'], Decimal('600000.00'))
+        self.assertEqual(summary['mean'], Decimal('200000.00'))
+        self.assertAlmostEqual(float(summary['median']), 200000, delta=200000 * rollups.RELATIVE_ACCURACY)
+
+        response = self.client.get(self.url, {'status': 'PENDING', 'group_by': 'status,area'})
+        self.assertEqual([(s['status'], s['area_from'], s['count']) for s in response.data['results']],
+                         [('PENDING', 5000, 1)])
+
+    def test_incremental_rollups_match_a_backfill(self):
+        """Test that edits, deletes and parcel area changes keep the rollups equal to a rebuild"""
+        first = self._sale(self.small, '1000')
+        second = self._sale(self.small, '2000')
+        self._sale(self.large, '3000')
+        self.client.patch(reverse('landtransaction-detail', kwargs={'pk': first.pk}), {'price': '1500.00'})
+        LandTransaction.objects.filter(pk=second.pk).first().delete()
+        self.small.area = Decimal('1200.00')
+        self.small.save()
+
+        incremental = self._rollups()
+        call_command('backfill_price_rollups', stdout=StringIO())
+        self.assertEqual(self._rollups(), incremental)
+        self.assertEqual(sum(row[3] for row in incremental), 2)
+
+    def test_sketch_quantiles_are_within_relative_accuracy(self):
+        """Test merged sketch quantiles against exact quantiles"""
+        rng = random.Random(7)
+        values = [rng.lognormvariate(12, 1.5) for _ in range(5000)]
+        sketch = rollups.PriceSketch()
+        other = rollups.PriceSketch()
+        for index, value in enumerate(values):
+            (sketch if index % 2 else other).add(value)
+        sketch = rollups.PriceSketch.from_json(sketch.merge(other).to_json())
+        ordered = sorted(values)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            self.assertLessEqual(abs(sketch.quantile(q) - exact) / exact, rollups.RELATIVE_ACCURACY + 1e-9)
+
+    def test_analytics_reads_only_rollups(self):
+        """Test that analytics cost one query however many transactions exist"""
+        for price in range(1, 30):
+            self._sale(self.small, price * 1000)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'status': 'PENDING'})
+        self.assertEqual(response.data['results'][0]['count'], 29)
+
+        response = self.client.get(self.url, {'group_by': 'owner'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+class TransferTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.seller = User.objects.create_user(username='seller', password='x', national_id='seller123')
+        self.buyer = User.objects.create_user(username='buyer', password='x', national_id='buyer123')
+        self.rival = User.objects.create_user(username='rival', password='x', national_id='rival123')
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='TRANSFER1',
+            address='Transfer Street',
+            area=Decimal('100.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.seller,
+            blockchain_hash='0xtransfer'
+        )
+        self.client.force_authenticate(user=self.officer)
+
+    def _transfer(self, buyer):
+        return LandTransaction.objects.create(
+            land_parcel=self.land_parcel,
+            from_owner=self.seller,
+            to_owner=buyer,
+            price=Decimal('5000.00'),
+            transaction_hash='0xtransfer'
+        )
+
+    def _approve(self, transaction, **data):
+        return self.client.post(reverse('landtransaction-approve', kwargs={'pk': transaction.pk}), data)
+
+    def test_second_approval_is_rejected(self):
+        """Test that approving the same transfer twice fails without a second ledger entry"""
+        transaction = self._transfer(self.buyer)
+        self.assertEqual(self._approve(transaction).status_code, status.HTTP_202_ACCEPTED)
+        response = self._approve(transaction)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['code'], 'already_processed')
+        self.assertEqual(LedgerEntry.objects.count(), 1)
+
+    def test_anchor_digest_is_ledger_entry_hash(self):
+        """Test that an approved transfer is anchored under its ledger entry hash"""
+        transaction = self._transfer(self.buyer)
+        self.assertEqual(self._approve(transaction).status_code, status.HTTP_202_ACCEPTED)
+        job = AnchorJob.objects.get(target='TRANSACTION', object_id=transaction.pk)
+        self.assertEqual(job.digest, LedgerEntry.objects.get(transaction=transaction).entry_hash)
+
+    def test_transfer_from_former_owner_is_rejected(self):
+        """Test that a competing transfer is refused once the seller has sold the parcel"""
+        winner = self._transfer(self.buyer)
+        loser = self._transfer(self.rival)
+        self._approve(winner)
+        response = self._approve(loser)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['code'], 'stale_owner')
+
+        self.land_parcel.refresh_from_db()
+        loser.refresh_from_db()
+        self.assertEqual(self.land_parcel.current_owner, self.buyer)
+        self.assertEqual(self.land_parcel.version, 1)
+        self.assertEqual(loser.status, 'PENDING')
+        self.assertEqual(self.land_parcel.ownership_intervals.filter(valid_to__isnull=True).get().owner, self.buyer)
+
+    def test_stale_parcel_version_is_rejected(self):
+        """Test that an approval made against an outdated parcel version changes nothing"""
+        transaction = self._transfer(self.buyer)
+        response = self._approve(transaction, parcel_version=3)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['code'], 'stale_version')
+        self.land_parcel.refresh_from_db()
+        self.assertEqual((self.land_parcel.current_owner, self.land_parcel.version), (self.seller, 0))
+
+        self.assertEqual(self._approve(transaction, parcel_version=0).status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.get(reverse('landparcel-detail', kwargs={'pk': self.land_parcel.pk}))
+        self.assertEqual(response.data['version'], 1)
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(APITestCase):
+    # The replica test database is never written to, so it stands in for a replica that has not caught up
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.other_officer = User.objects.create_user(
+            username='other', password='x', user_type='LAND_OFFICER', national_id='other123'
+        )
+        self.seller = User.objects.create_user(username='seller', password='x', national_id='seller123')
+        self.buyer = User.objects.create_user(username='buyer', password='x', national_id='buyer123')
+        self.land_parcel = LandParcel.objects.create(
+            parcel_id='REPLICA1',
+            address='Replica Street',
+            area=Decimal('100.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=self.seller,
+            blockchain_hash='0xreplica'
+        )
+        self.transaction = LandTransaction.objects.create(
+            land_parcel=self.land_parcel,
+            from_owner=self.seller,
+            to_owner=self.buyer,
+            price=Decimal('1000.00'),
+            transaction_hash='0xreplica'
+        )
+
+    def test_reads_are_served_by_the_replica(self):
+        """Test that list reads go to the replica and writes to the primary"""
+        self.client.force_authenticate(user=self.officer)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse('landparcel-list'))
+        self.assertEqual(response.data['count'], 0)
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse(LandParcel.objects.using('replica').exists())
+
+    def test_writers_read_their_writes_from_the_primary(self):
+        """Test that a user is pinned to the primary after a write and others are not"""
+        self.client.force_authenticate(user=self.officer)
+        response = self.client.post(reverse('landtransaction-approve', kwargs={'pk': self.transaction.pk}))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        detail_url = reverse('landtransaction-detail', kwargs={'pk': self.transaction.pk})
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(detail_url)
+        self.assertEqual(response.data['status'], 'COMPLETED')
+        self.assertEqual(replica.captured_queries, [])
+
+        self.client.force_authenticate(user=self.other_officer)
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND)
+
+        cache.delete(replicas.pin_key(self.officer.pk))
+        self.client.force_authenticate(user=self.officer)
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND)
+
+class AsyncReadTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.owner = User.objects.create_user(username='owner', password='x', national_id='owner123')
+        self.other = User.objects.create_user(username='other', password='x', national_id='other123')
+        for index in range(3):
+            parcel = LandParcel.objects.create(
+                parcel_id=f'ASYNC{index}',
+                address=f'{index} Async Avenue',
+                area=Decimal('120.00'),
+                coordinates={'lat': 0.0, 'lng': 0.0},
+                current_owner=self.owner if index else self.other,
+                blockchain_hash='0xasync'
+            )
+            LandTransaction.objects.create(
+                land_parcel=parcel,
+                from_owner=parcel.current_owner,
+                to_owner=self.officer,
+                price=Decimal('100.00'),
+                transaction_hash='0xasync'
+            )
+        self.parcel = parcel
+
+    def _headers(self, user):
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    async def _compare(self, user, sync_path, async_path, params=None):
+        sync_response = await sync_to_async(self.client.get)(sync_path, params, headers=self._headers(user))
+        async_response = await self.async_client.get(async_path, params, headers=self._headers(user))
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        # Page links point back at the endpoint that served them
+        self.assertEqual(async_response.content.replace(b'/api/async/', b'/api/'), sync_response.content)
+        return async_response
+
+    async def test_async_reads_match_sync_reads(self):
+        """Test that async list, detail and me responses equal the DRF ones for each role"""
+        routes = [
+            ('/api/land/parcels/', '/api/async/land/parcels/', {}),
+            ('/api/land/parcels/', '/api/async/land/parcels/', {'expand': 'current_owner', 'page_size': 2}),
+            ('/api/land/parcels/', '/api/async/land/parcels/', {'cursor': '', 'page_size': 2}),
+            ('/api/land/parcels/', '/api/async/land/parcels/', {'q': 'avenue'}),
+            (f'/api/land/parcels/{self.parcel.pk}/', f'/api/async/land/parcels/{self.parcel.pk}/', {}),
+            ('/api/land/transactions/', '/api/async/land/transactions/', {'expand': 'land_parcel.current_owner'}),
+            ('/api/documents/documents/', '/api/async/documents/documents/', {}),
+            ('/api/users/', '/api/async/users/', {}),
+            ('/api/users/me/', '/api/async/users/me/', {}),
+        ]
+        for user in (self.officer, self.owner):
+            for sync_path, async_path, params in routes:
+                with self.subTest(user=user.username, path=async_path, params=params):
+                    await self._compare(user, sync_path, async_path, params)
+
+    async def test_async_reads_enforce_permissions(self):
+        """Test that async reads refuse anonymous users and hide other owners' records"""
+        response = await self.async_client.get('/api/async/land/parcels/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+        response = await self._compare(self.other, f'/api/land/parcels/{self.parcel.pk}/',
+                                       f'/api/async/land/parcels/{self.parcel.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await self._compare(self.officer, '/api/land/parcels/', '/api/async/land/parcels/', {'page': 9})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await self.async_client.post('/api/async/land/parcels/', headers=self._headers(self.officer))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        instrumentation.get_registry().reset()
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        owner = User.objects.create_user(username='owner', password='x', national_id='owner123')
+        parcel = LandParcel.objects.create(
+            parcel_id='TIMED1',
+            address='1 Timing Road',
+            area=Decimal('100.00'),
+            coordinates={'lat': 0.0, 'lng': 0.0},
+            current_owner=owner,
+            blockchain_hash='0xtimed'
+        )
+        LandTransaction.objects.create(
+            land_parcel=parcel,
+            from_owner=owner,
+            to_owner=self.officer,
+            price=Decimal('100.00'),
+            transaction_hash='0xtimed'
+        )
+        self.client.force_authenticate(user=self.officer)
+
+    def test_server_timing_reports_each_phase(self):
+        """Test that list responses time auth, queryset, SQL, serialization and rendering"""
+        for path in ('/api/land/transactions/', '/api/async/land/transactions/'):
+            with self.subTest(path=path):
+                response = self.client.get(path, {'expand': 'land_parcel'},
+                                           headers={'Authorization': f'Bearer {AccessToken.for_user(self.officer)}'})
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                phases = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+                self.assertEqual(set(phases), {'auth', 'queryset', 'serialize', 'render', 'db', 'total'})
+                self.assertRegex(phases['db'], r'^dur=[\d.]+;desc="\d+ quer(y|ies)"$')
+
+    @override_settings(DEBUG=True)
+    def test_metrics_aggregate_per_route(self):
+        """Test that /metrics exposes per-route request counts and phase histograms"""
+        for _ in range(2):
+            self.client.get('/api/land/transactions/')
+        self.client.get('/api/land/parcels/')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('http_requests_total{route="landtransaction-list",method="GET",status="200"} 2', body)
+        self.assertIn('http_requests_total{route="landparcel-list",method="GET",status="200"} 1', body)
+        self.assertIn(
+            'http_request_phase_seconds_count{route="landtransaction-list",method="GET",phase="serialize"} 2', body
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="landtransaction-list",method="GET",le="+Inf"} 2', body
+        )
+        self.assertNotIn('route="metrics"', body)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_token(self):
+        """Test that /metrics requires the configured bearer token"""
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_are_closed_without_a_token(self):
+        """Test that /metrics is not served without a token unless DEBUG is on"""
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GeometryTests(APITestCase):
+    SQUARE = [[0.0, 0.0], [0.001, 0.0], [0.001, 0.001], [0.0, 0.001], [0.0, 0.0]]
+    HOLE = [[0.00025, 0.00025], [0.00025, 0.00075], [0.00075, 0.00075], [0.00075, 0.00025]]
+
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.client.force_authenticate(user=self.officer)
+
+    def _payload(self, parcel_id, area, rings):
+        return {
+            'parcel_id': parcel_id,
+            'address': '1 Boundary Road',
+            'area': area,
+            'coordinates': {'type': 'Polygon', 'coordinates': rings},
+            'current_owner_id': self.officer.id,
+            'status': 'ACTIVE',
+        }
+
+    def test_measure_square_with_hole(self):
+        """Test shoelace areas and centroids of encoded boundaries, holes included"""
+        side = geometry.METERS_PER_DEGREE * 0.001
+        square = geometry.encode(geometry.polygon_rings({'type': 'Polygon', 'coordinates': [self.SQUARE]}))
+        holed = geometry.encode([[geometry._ring(self.SQUARE), geometry._ring(self.HOLE)]])
+        areas, lngs, lats = geometry.measure([square, None, holed])
+
+        self.assertAlmostEqual(areas[0], side * side, delta=0.01)
+        self.assertAlmostEqual(areas[2], 0.75 * side * side, delta=0.01)
+        self.assertTrue(math.isnan(areas[1]))
+        self.assertAlmostEqual(lngs[0], 0.0005, places=9)
+        self.assertAlmostEqual(lats[2], 0.0005, places=9)
+
+        origin, sizes, offsets = geometry.decode(holed)
+        self.assertEqual(list(sizes), [4, -4])
+        self.assertEqual(len(holed), geometry.HEADER.size + 4 * 2 + 8 * 8)
+        # float32 offsets round-trip to well under a millimetre
+        self.assertLess(abs(offsets + origin - [*geometry._ring(self.SQUARE), *self.HOLE]).max(), 1e-8)
+
+    def test_area_must_match_boundary(self):
+        """Test that registration rejects crossing edges and areas far from the boundary's"""
+        url = reverse('landparcel-list')
+        response = self.client.post(url, self._payload('BOUND1', '9000.00', [self.SQUARE]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('area', response.data)
+
+        bowtie = [[0.0, 0.0], [0.001, 0.001], [0.001, 0.0], [0.0, 0.001]]
+        response = self.client.post(url, self._payload('BOUND2', '12392.14', [bowtie]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(str(response.data['coordinates'][0]), 'Boundary edges cross each other')
+
+        response = self.client.post(url, self._payload('BOUND3', '12300.00', [self.SQUARE]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        parcel = LandParcel.objects.get(parcel_id='BOUND3')
+        self.assertAlmostEqual(parcel.shape_area, 12392.14, delta=0.01)
+        self.assertAlmostEqual(parcel.centroid_lat, 0.0005, places=9)
+
+        response = self.client.get(url, {'geometry': 'packed'})
+        row = response.data['results'][0]
+        self.assertNotIn('coordinates', row)
+        self.assertEqual(base64.b64decode(row['geometry']), bytes(parcel.geometry))
+        self.assertNotIn('geometry', self.client.get(url).data['results'][0])
+
+    def test_vertex_cap_and_large_rings(self):
+        """Test that oversized boundaries are refused and crossings are found across edge blocks"""
+        circle = [[0.01 * math.cos(2 * math.pi * index / 600), 0.01 * math.sin(2 * math.pi * index / 600)]
+                  for index in range(600)]
+        self.assertGreater(geometry.check_polygons([[geometry._ring(circle)]]), 0)
+        crossed = circle[:]
+        crossed[10], crossed[500] = crossed[500], crossed[10]
+        with self.assertRaisesMessage(ValueError, 'Boundary edges cross each other'):
+            geometry.check_polygons([[geometry._ring(crossed)]])
+
+        with override_settings(PARCEL_MAX_VERTICES=500):
+            response = self.client.post(reverse('landparcel-list'), self._payload('HUGE', '1.00', [circle]),
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(str(response.data['coordinates'][0]), 'Boundaries may have at most 500 vertices')
+
+    def test_recompute_reports_mismatches(self):
+        """Test that the recompute command restores geometry and reports areas off the boundary"""
+        for parcel_id, area in (('FIT', '12392.00'), ('OFF', '500.00')):
+            LandParcel.objects.create(
+                parcel_id=parcel_id,
+                address='1 Boundary Road',
+                area=Decimal(area),
+                coordinates={'type': 'Polygon', 'coordinates': [self.SQUARE]},
+                current_owner=self.officer,
+                blockchain_hash='0xbound'
+            )
+        LandParcel.objects.update(geometry=None, shape_area=None)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'mismatches.json'
+            out = StringIO()
+            call_command('recompute_parcel_geometry', chunk_size=1, output=str(path), stdout=out)
+            mismatches = json.loads(path.read_text())
+        self.assertEqual([row['parcel_id'] for row in mismatches], ['OFF'])
+        self.assertIn('Measured 2 parcels (2 with polygon boundaries)', out.getvalue())
+        self.assertFalse(LandParcel.objects.filter(geometry=None).exists())
+
+
+class OverlapTests(APITestCase):
+    def setUp(self):
+        self.officer = User.objects.create_user(
+            username='officer',
+            password='OfficerPass123!',
+            user_type='LAND_OFFICER',
+            national_id='officer123'
+        )
+        self.client.force_authenticate(user=self.officer)
+
+    def _square(self, lng, lat, size=0.001):
+        return {'type': 'Polygon', 'coordinates': [[
+            [lng, lat], [lng + size, lat], [lng + size, lat + size], [lng, lat + size], [lng, lat],
+        ]]}
+
+    def _area(self, coordinates):
+        return f'{geometry.check_polygons(geometry.polygon_rings(coordinates)):.2f}'
+
+    def _parcel(self, parcel_id, coordinates, status='ACTIVE'):
+        return LandParcel.objects.create(
+            parcel_id=parcel_id,
+            address='1 Boundary Road',
+            area=Decimal(self._area(coordinates)),
+            coordinates=coordinates,
+            current_owner=self.officer,
+            blockchain_hash='0xoverlap',
+            status=status
+        )
+
+    def _register(self, parcel_id, coordinates):
+        return self.client.post(reverse('landparcel-list'), {
+            'parcel_id': parcel_id,
+            'address': '2 Boundary Road',
+            'area': self._area(coordinates),
+            'coordinates': coordinates,
+            'current_owner_id': self.officer.id,
+        }, format='json')
+
+    def test_overlap_area_is_exact(self):
+        """Test intersection areas of identical, shifted, neighbouring and nested boundaries"""
+        def blob(coordinates):
+            return geometry.encode(geometry.polygon_rings(coordinates))
+
+        square = blob(self._square(39.0, -6.0))
+        area = geometry.measure([square])[0][0]
+        self.assertAlmostEqual(geometry.overlap_area(square, square), area, delta=0.01)
+        self.assertAlmostEqual(geometry.overlap_area(square, blob(self._square(39.0005, -5.9995))), area / 4, delta=0.01)
+        self.assertLess(geometry.overlap_area(square, blob(self._square(39.001, -6.0))), 0.01)
+        self.assertEqual(geometry.overlap_area(square, blob(self._square(39.01, -6.0))), 0)
+
+        holed = {'type': 'Polygon', 'coordinates': [
+            self._square(39.0, -6.0)['coordinates'][0],
+            self._square(39.00025, -5.99975, 0.0005)['coordinates'][0][::-1],
+        ]}
+        inner = blob(self._square(39.00025, -5.99975, 0.0005))
+        self.assertLess(geometry.overlap_area(blob(holed), inner), 0.01)
+        self.assertAlmostEqual(geometry.overlap_area(inner, square), area / 4, delta=0.01)
+
+    def test_overlap_area_at_the_vertex_cap(self):
+        """Test that boundaries with PARCEL_MAX_VERTICES vertices intersect exactly in bounded memory"""
+        def circle(lng, vertices=2000, radius=0.01):
+            angles = 2 * np.pi * np.arange(vertices) / vertices
+            return geometry.encode([[list(zip(lng + radius * np.cos(angles), radius * np.sin(angles)))]])
+
+        radius, distance = 0.01 * geometry.METERS_PER_DEGREE, 0.005 * geometry.METERS_PER_DEGREE
+        lens = (2 * radius ** 2 * math.acos(distance / (2 * radius))
+                - distance / 2 * math.sqrt(4 * radius ** 2 - distance ** 2))
+        tracemalloc.start()
+        try:
+            area = geometry.overlap_area(circle(0.0), circle(0.005))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertAlmostEqual(area / lens, 1, delta=1e-3)
+        self.assertLess(peak, 100 * 2 ** 20)
+
+    def test_registration_and_verify_flag_overlaps(self):
+        """Test that overlapping registrations are disputed and cannot be verified until moved"""
+        first = self._parcel('FIRST', self._square(39.0, -6.0))
+        response = self._register('NEIGHBOUR', self._square(39.001, -6.0))
+        self.assertEqual(response.data['status'], 'PENDING')
+
+        response = self._register('CLAIM', self._square(39.0005, -6.0))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'DISPUTED')
+        claim = LandParcel.objects.get(parcel_id='CLAIM')
+        neighbour = LandParcel.objects.get(parcel_id='NEIGHBOUR')
+        self.assertEqual(
+            set(ParcelOverlap.objects.values_list('parcel_a', 'parcel_b')),
+            {(first.pk, claim.pk), (neighbour.pk, claim.pk)},
+        )
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'DISPUTED')
+        self.assertTrue(ChangeEvent.objects.filter(object_id=first.pk, action='DISPUTED').exists())
+
+        verify_url = reverse('landparcel-verify', kwargs={'pk': claim.pk})
+        response = self.client.post(verify_url)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['code'], 'overlap')
+        self.assertEqual([row['parcel'] for row in response.data['overlaps']], [first.pk, neighbour.pk])
+
+        moved = self._square(39.01, -6.0)
+        response = self.client.patch(reverse('landparcel-detail', kwargs={'pk': claim.pk}),
+                                      {'coordinates': moved, 'area': self._area(moved)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(ParcelOverlap.objects.exists())
+        self.assertEqual(self.client.post(verify_url).status_code, status.HTTP_202_ACCEPTED)
+
+    def test_bulk_verify_leaves_disputes_alone(self):
+        """Test that bulk verification skips disputed and overlapping parcels"""
+        clean = self._parcel('CLEAN', self._square(39.1, -6.0), status='PENDING')
+        first = self._parcel('FIRST', self._square(39.0, -6.0), status='PENDING')
+        claim = self._parcel('CLAIM', self._square(39.0005, -6.0), status='PENDING')
+        disputed = self._parcel('DISPUTED', self._square(39.2, -6.0), status='DISPUTED')
+
+        response = self.client.post(reverse('landparcel-bulk-verify'),
+                                    {'ids': [clean.pk, first.pk, claim.pk, disputed.pk]}, format='json')
+        self.assertEqual((response.data['verified'], response.data['skipped']), (1, 3))
+        codes = {row['id']: row.get('code') for row in response.data['results']}
+        self.assertEqual(codes, {clean.pk: None, first.pk: 'overlap', claim.pk: 'overlap', disputed.pk: 'disputed'})
+        statuses = dict(LandParcel.objects.values_list('parcel_id', 'status'))
+        self.assertEqual(statuses, {'CLEAN': 'ACTIVE', 'FIRST': 'DISPUTED', 'CLAIM': 'DISPUTED', 'DISPUTED': 'DISPUTED'})
+        self.assertEqual(list(ParcelOverlap.objects.values_list('parcel_a', 'parcel_b')), [(first.pk, claim.pk)])
+
+    def test_bulk_verify_checks_each_batch_at_once(self):
+        """Test that bulk overlap checks cost the same queries for any batch and roll back with it"""
+        def verify(count, offset):
+            pks = [self._parcel(f'ROW{offset + index}', self._square(39.0 + (offset + index) * 0.01, -6.0),
+                                status='PENDING').pk for index in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('landparcel-bulk-verify'), {'ids': pks}, format='json')
+            self.assertEqual(response.data['verified'], count)
+            return len(queries)
+
+        self.assertEqual(verify(2, 0), verify(8, 10))
+
+        registered = self._parcel('REGISTERED', self._square(39.3, -6.0))
+        claim = self._parcel('CLAIM', self._square(39.3005, -6.0), status='PENDING')
+        clean = self._parcel('CLEAN', self._square(39.5, -6.0), status='PENDING')
+        with mock.patch('land_management.bulk.anchor_queue.enqueue_many', side_effect=RuntimeError('queue down')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('landparcel-bulk-verify'), {'ids': [claim.pk, clean.pk]}, format='json')
+        self.assertFalse(ParcelOverlap.objects.exists())
+        self.assertEqual(LandParcel.objects.get(pk=registered.pk).status, 'ACTIVE')
+        self.assertEqual(LandParcel.objects.get(pk=claim.pk).status, 'PENDING')
+
+        with override_settings(SPATIAL_MAX_CELLS_PER_PARCEL=1):
+            inside = self._parcel('INSIDE', self._square(39.705, -5.995))
+            estate = self._parcel('ESTATE', self._square(39.7, -6.0, size=0.02), status='PENDING')
+            response = self.client.post(reverse('landparcel-bulk-verify'), {'ids': [estate.pk]}, format='json')
+        self.assertEqual(response.data['results'][0]['code'], 'overlap')
+        self.assertTrue(ParcelOverlap.objects.filter(parcel_a=inside, parcel_b=estate).exists())
+
+    def test_sweep_matches_brute_force(self):
+        """Test that the grid sweep finds every overlapping pair and disputes only those parcels"""
+        rng = random.Random(7)
+        parcels = []
+        for index in range(60):
+            coordinates = self._square(39.0 + rng.randint(0, 20) * 0.0005, -6.0 + rng.randint(0, 20) * 0.0005)
+            status_ = 'INACTIVE' if index % 10 == 0 else 'PENDING'
+            parcel = LandParcel(parcel_id=f'SWEEP{index}', address='Sweep Road', area=Decimal('1.00'),
+                                coordinates=coordinates, current_owner=self.officer, blockchain_hash='0xsweep',
+                                status=status_)
+            parcel.update_bounding_box()
+            parcels.append(parcel)
+        geometry.update_geometries(parcels)
+        parcels = LandParcel.objects.bulk_create(parcels)
+        ParcelOverlap.objects.create(parcel_a=parcels[1], parcel_b=parcels[2], overlap_area=1.0)
+
+        active = [parcel for parcel in parcels if parcel.status != 'INACTIVE']
+        expected = set()
+        for index, parcel in enumerate(active):
+            for other in active[index + 1:]:
+                if geometry.overlap_area(parcel.geometry, other.geometry) >= 1.0:
+                    expected.add((parcel.pk, other.pk))
+        self.assertTrue(expected)
+
+        out = StringIO()
+        call_command('detect_parcel_overlaps', stdout=out)
+        self.assertEqual(set(ParcelOverlap.objects.values_list('parcel_a', 'parcel_b')), expected)
+        disputed = {pk for pair in expected for pk in pair}
+        self.assertEqual(set(LandParcel.objects.filter(status='DISPUTED').values_list('pk', flat=True)), disputed)
+        self.assertIn(f'{len(expected)} overlapping, {len(disputed)} newly disputed', out.getvalue())
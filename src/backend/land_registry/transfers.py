@@ -0,0 +1,81 @@
+"""
+Approval of land transfers.
+
+A transfer is approved in one database transaction that starts by claiming the
+parcel with a compare-and-set UPDATE::
+
+    UPDATE parcel SET version = version + 1
+     WHERE id = ? AND current_owner_id = <from_owner> [AND version = <expected>]
+
+The UPDATE takes the parcel's row lock on every backend, so competing
+approvals for the same parcel queue behind it, and its WHERE clause is
+re-checked once the earlier approval commits. Whichever approval runs second
+finds the owner (and version) changed, matches no row and is rejected with
+TransferConflict. A transfer whose seller no longer owns the parcel, a second
+approval of the same transfer and an approval made against a stale parcel
+``version`` all fail the same way. Transfers on different parcels never wait
+for each other until the ledger append.
+
+Nothing is read under lock that could be read before it, and the ledger
+append, which serializes every approval on the ledger head row, runs last so
+that lock is held only until the commit.
+"""
+from django.db import transaction as db_transaction
+from django.db.models import F
+
+from anchoring import queue as anchor_queue
+from changes import feed as change_feed
+from .models import LandParcel, LandTransaction
+from . import ledger, ownership
+
+
+class TransferConflict(Exception):
+    """The transfer no longer applies to the parcel's current state."""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+def approve(land_transaction, approver, parcel_version=None):
+    """
+    Complete ``land_transaction``, moving its parcel to the buyer. Returns the
+    anchor job for the transfer; raises TransferConflict if the transfer is
+    not pending, the seller no longer owns the parcel or ``parcel_version`` is
+    given and stale.
+    """
+    if land_transaction.status != 'PENDING':
+        raise TransferConflict('Transaction has already been processed', 'already_processed')
+
+    with db_transaction.atomic():
+        claim = LandParcel.objects.filter(pk=land_transaction.land_parcel_id,
+                                          current_owner_id=land_transaction.from_owner_id)
+        if parcel_version is not None:
+            claim = claim.filter(version=parcel_version)
+        if not claim.update(version=F('version') + 1):
+            if parcel_version is not None and LandParcel.objects.filter(
+                    pk=land_transaction.land_parcel_id, current_owner_id=land_transaction.from_owner_id).exists():
+                raise TransferConflict('Parcel has changed since it was read', 'stale_version')
+            raise TransferConflict('Seller no longer owns the parcel', 'stale_owner')
+
+        # The parcel lock serializes approvals of its transfers, so this read is current
+        land_transaction = LandTransaction.objects.select_for_update().select_related('land_parcel').get(
+            pk=land_transaction.pk
+        )
+        if land_transaction.status != 'PENDING':
+            raise TransferConflict('Transaction has already been processed', 'already_processed')
+
+        land_transaction.status = 'COMPLETED'
+        change_feed.mark(land_transaction, 'APPROVED', approver)
+        land_transaction.save(update_fields=['status'])
+
+        # Update land parcel ownership and its history together
+        land_parcel = land_transaction.land_parcel
+        land_parcel.current_owner_id = land_transaction.to_owner_id
+        land_parcel.save(update_fields=['current_owner'])
+        ownership.record_transfer(land_parcel, land_transaction.to_owner_id, transaction=land_transaction)
+
+        # The anchor digest is the ledger entry's hash, so append before queueing
+        land_transaction.ledger_entry = ledger.append_transfer(land_transaction)
+        job = anchor_queue.enqueue('TRANSACTION', land_transaction, requested_by=approver)
+    return job
@@ -1,19 +1,104 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import models
-from .models import LandParcel, LandTransaction
-from .serializers import LandParcelSerializer, LandTransactionSerializer
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import LandParcel, LandTransaction, LedgerEntry, PriceRollup
+from .serializers import LandParcelSerializer, LandTransactionSerializer, OwnershipIntervalSerializer
+from land_management.bulk import BulkVerifyMixin
+from land_management.export import ExportMixin
+from land_management.fieldsets import ShapedQuerysetMixin
+from land_management.response_cache import CachedRetrieveMixin
+from land_management.instrumentation import TimedViewMixin
+from land_management.replicas import ReplicaReadsMixin
+from land_management.search import SearchMixin
+from anchoring import queue as anchor_queue
+from anchoring.views import accepted
+from changes import feed as change_feed
+from . import ledger, overlaps, ownership, rollups, spatial, transfers
+from .search import PARCEL_INDEX
 
-class LandParcelViewSet(viewsets.ModelViewSet):
+def parse_at(request):
+    """The ?at= timestamp of a point-in-time query, defaulting to now."""
+    value = request.query_params.get('at')
+    if not value:
+        return timezone.now()
+    at = parse_datetime(value)
+    if at is None:
+        raise ValueError(value)
+    if timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    return at
+
+class LandParcelViewSet(TimedViewMixin, ReplicaReadsMixin, ExportMixin, SearchMixin, BulkVerifyMixin, CachedRetrieveMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = LandParcel.objects.all()
     serializer_class = LandParcelSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_namespace = 'parcel'
+    # Auth + page count + page rows; expanded relations come from joins
+    query_budgets = {'list': 3, 'retrieve': 2, 'verify': 9, 'within': 3,
+                     'owner_at': 3, 'title_chain': 3, 'owned_at': 3}
+    bulk_filter_fields = ('status', 'current_owner')
+    search_index = PARCEL_INDEX
+    export_fields = ('id', 'parcel_id', 'address', 'area', 'coordinates', 'current_owner_id',
+                     'registration_date', 'blockchain_hash', 'status')
+    bulk_anchor_target = 'PARCEL'
+    bulk_cache_namespace = 'parcel'
 
     def get_queryset(self):
+        queryset = self.shape_queryset(LandParcel.objects.all())
         if self.request.user.user_type == 'ADMIN' or self.request.user.user_type == 'LAND_OFFICER':
-            return LandParcel.objects.all()
-        return LandParcel.objects.filter(current_owner=self.request.user)
+            return queryset
+        return queryset.filter(current_owner=self.request.user)
+
+    def cache_owners(self, instance):
+        return [instance.current_owner_id]
+
+    def cache_dependencies(self, instance):
+        return [('user', instance.current_owner_id)]
+
+    def bulk_pending(self):
+        return ~Q(status='ACTIVE')
+
+    def bulk_changes(self, request):
+        return {'status': 'ACTIVE'}
+
+    def bulk_check(self, pks):
+        # Disputed parcels and parcels overlapping others stay out of ACTIVE, as with verify
+        parcels = list(LandParcel.objects.filter(pk__in=pks).only(
+            'pk', 'status', 'geometry', 'min_lng', 'min_lat', 'max_lng', 'max_lat',
+        ))
+        refused = {parcel.pk: ('disputed', 'Parcel is under dispute')
+                   for parcel in parcels if parcel.status == 'DISPUTED'}
+        self.bulk_overlaps = overlaps.find_many([parcel for parcel in parcels if parcel.pk not in refused])
+        selected = set(pks)
+        for pair in self.bulk_overlaps:
+            for pk in pair:
+                if pk in selected:
+                    refused.setdefault(pk, ('overlap', 'Parcel boundary overlaps registered parcels'))
+        return refused
+
+    def bulk_refuse(self, refused):
+        if self.bulk_overlaps:
+            overlaps.record(self.bulk_overlaps, actor=self.request.user)
+
+    def perform_create(self, serializer):
+        with db_transaction.atomic():
+            parcel = serializer.save()
+            overlaps.check(parcel, actor=self.request.user)
+
+    def perform_update(self, serializer):
+        previous_owner_id = serializer.instance.current_owner_id
+        with db_transaction.atomic():
+            parcel = serializer.save()
+            if parcel.current_owner_id != previous_owner_id:
+                ownership.record_transfer(parcel, parcel.current_owner_id)
+                LandParcel.objects.filter(pk=parcel.pk).update(version=F('version') + 1)
+                parcel.refresh_from_db(fields=['version'])
+            if 'coordinates' in serializer.validated_data:
+                overlaps.check(parcel, actor=self.request.user)
 
     @action(detail=True, methods=['post'])
     def verify(self, request, pk=None):
@@ -21,35 +106,192 @@ class LandParcelViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
         
         parcel = self.get_object()
-        parcel.status = 'ACTIVE'
-        parcel.save()
-        return Response({'status': 'verified'})
+        with db_transaction.atomic():
+            # Lock the row so its boundary cannot change between the overlap check and activation
+            parcel = LandParcel.objects.select_for_update().get(pk=parcel.pk)
+            found = overlaps.check(parcel, actor=request.user)
+            if found:
+                # Returning (not raising) keeps the recorded dispute
+                return Response({
+                    'error': 'Parcel boundary overlaps registered parcels',
+                    'code': 'overlap',
+                    'overlaps': [{'parcel': pk, 'area': round(area, 2)} for pk, area in found],
+                }, status=status.HTTP_409_CONFLICT)
+            parcel.status = 'ACTIVE'
+            change_feed.mark(parcel, 'VERIFIED', request.user)
+            parcel.save(update_fields=['status'])
+            job = anchor_queue.enqueue('PARCEL', parcel, requested_by=request.user)
+        return accepted(request, job, status='verified')
+
+    @action(detail=False, methods=['get'])
+    def within(self, request):
+        """
+        Returns parcels intersecting ?bbox=min_lng,min_lat,max_lng,max_lat
+        """
+        try:
+            bbox = [float(value) for value in request.query_params['bbox'].split(',')]
+        except (KeyError, ValueError):
+            return Response({'error': 'bbox must be min_lng,min_lat,max_lng,max_lat'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return Response({'error': 'bbox must be min_lng,min_lat,max_lng,max_lat'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = spatial.filter_within(self.get_queryset(), bbox)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def nearest(self, request):
+        """
+        Returns the k parcels closest to ?lat=&lng=, with distance in metres
+        """
+        try:
+            lat = float(request.query_params['lat'])
+            lng = float(request.query_params['lng'])
+            k = int(request.query_params.get('k', 5))
+        except (KeyError, ValueError):
+            return Response({'error': 'lat and lng are required numbers, k an integer'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= k <= 100:
+            return Response({'error': 'k must be between 1 and 100'}, status=status.HTTP_400_BAD_REQUEST)
+
+        ranked = spatial.nearest(self.get_queryset(), lng, lat, k)
+        parcels = self.get_queryset().in_bulk([pk for pk, _ in ranked])
+        results = []
+        for pk, distance in ranked:
+            data = self.get_serializer(parcels[pk]).data
+            data['distance'] = round(distance, 2)
+            results.append(data)
+        return Response(results)
+
+    @action(detail=True, methods=['get'])
+    def owner_at(self, request, pk=None):
+        """
+        Returns who held title to the parcel at ?at= (default: now)
+        """
+        try:
+            at = parse_at(request)
+        except ValueError:
+            return Response({'error': 'at must be an ISO 8601 datetime'}, status=status.HTTP_400_BAD_REQUEST)
+        interval = ownership.interval_at(self.get_object(), at)
+        if interval is None:
+            return Response({'error': 'Parcel had no owner at that time'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(OwnershipIntervalSerializer(interval, context=self.get_serializer_context()).data)
 
-class LandTransactionViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def title_chain(self, request, pk=None):
+        """
+        Returns the full chain of title for the parcel, oldest first
+        """
+        intervals = ownership.chain_of_title(self.get_object())
+        serializer = OwnershipIntervalSerializer(intervals, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def owned_at(self, request):
+        """
+        Returns parcels owned by ?owner= at ?at= (default: now)
+        """
+        try:
+            owner_id = int(request.query_params['owner'])
+            at = parse_at(request)
+        except (KeyError, ValueError):
+            return Response({'error': 'owner must be a user id and at an ISO 8601 datetime'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = ownership.parcels_owned_at(self.get_queryset(), owner_id, at)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+class LandTransactionViewSet(TimedViewMixin, ReplicaReadsMixin, ExportMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = LandTransaction.objects.all()
     serializer_class = LandTransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budgets = {'list': 3, 'retrieve': 2, 'proof': 5, 'analytics': 1}
+    export_fields = ('id', 'land_parcel_id', 'from_owner_id', 'to_owner_id', 'transaction_date',
+                     'transaction_hash', 'price', 'status', 'documents')
 
     def get_queryset(self):
+        queryset = self.shape_queryset(LandTransaction.objects.all())
         if self.request.user.user_type == 'ADMIN' or self.request.user.user_type == 'LAND_OFFICER':
-            return LandTransaction.objects.all()
-        return LandTransaction.objects.filter(
-            models.Q(from_owner=self.request.user) | 
-            models.Q(to_owner=self.request.user)
+            return queryset
+        # A UNION of two index searches instead of an OR that defeats both indexes
+        involved = LandTransaction.objects.filter(from_owner=self.request.user).order_by().values('pk').union(
+            LandTransaction.objects.filter(to_owner=self.request.user).order_by().values('pk')
         )
+        return queryset.filter(pk__in=involved)
 
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
+        """
+        Completes the transfer. Send ?parcel_version= (or parcel_version in the
+        body) to refuse the approval if the parcel changed since it was read.
+        """
         if request.user.user_type not in ['ADMIN', 'LAND_OFFICER']:
             return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
-        
+
+        parcel_version = request.data.get('parcel_version', request.query_params.get('parcel_version'))
+        try:
+            parcel_version = None if parcel_version in (None, '') else int(parcel_version)
+        except (TypeError, ValueError):
+            return Response({'error': 'parcel_version must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            job = transfers.approve(self.get_object(), request.user, parcel_version=parcel_version)
+        except transfers.TransferConflict as exc:
+            return Response({'error': str(exc), 'code': exc.code}, status=status.HTTP_409_CONFLICT)
+        return accepted(request, job, status='approved')
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """
+        Returns count, volume, mean, median and p90 of transaction prices from the
+        price rollups. Filter with ?status= (comma separated, default COMPLETED),
+        ?from= and ?to= (YYYY-MM); break down with ?group_by= (any of month,
+        status, area). Quantiles are within 1% of the true price.
+        """
+        if request.user.user_type not in ['ADMIN', 'LAND_OFFICER']:
+            return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+
+        statuses = [value for value in request.query_params.get('status', 'COMPLETED').split(',') if value]
+        group_by = [value for value in request.query_params.get('group_by', 'month').split(',') if value]
+        if not set(group_by) <= set(rollups.GROUP_FIELDS) or len(set(group_by)) != len(group_by):
+            return Response({'error': f"group_by must be a list of {', '.join(rollups.GROUP_FIELDS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = PriceRollup.objects.filter(status__in=statuses)
+        try:
+            if request.query_params.get('from'):
+                queryset = queryset.filter(month__gte=rollups.parse_month(request.query_params['from']))
+            if request.query_params.get('to'):
+                queryset = queryset.filter(month__lte=rollups.parse_month(request.query_params['to']))
+        except ValueError:
+            return Response({'error': 'from and to must be YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': rollups.summarize(queryset, group_by)})
+
+    @action(detail=True, methods=['get'])
+    def proof(self, request, pk=None):
+        """
+        Returns the Merkle inclusion proof for an approved transaction
+        """
         transaction = self.get_object()
-        transaction.status = 'COMPLETED'
-        transaction.save()
-        
-        # Update land parcel ownership
-        land_parcel = transaction.land_parcel
-        land_parcel.current_owner = transaction.to_owner
-        land_parcel.save()
-        
-        return Response({'status': 'approved'})
\ No newline at end of file
+        try:
+            entry = transaction.ledger_entry
+        except LedgerEntry.DoesNotExist:
+            return Response({'error': 'Transaction is not on the ledger'}, status=status.HTTP_404_NOT_FOUND)
+
+        proof = ledger.inclusion_proof(entry)
+        if proof is None:
+            return Response({
+                'status': 'pending',
+                'sequence': entry.sequence,
+                'entry_hash': entry.entry_hash,
+            }, status=status.HTTP_202_ACCEPTED)
+        return Response(proof)
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+JWT authentication served from an in-process principal cache.
+
+Tokens carry ``user_type``, ``is_verified`` and ``ver``, the user's
+``token_version`` at issue time. Each user also has a version counter in the
+shared cache (the response cache's ``user`` version), bumped by every save,
+delete and bulk update of the user. Authenticating reads that counter and
+looks up the principal under (user id, counter) in a bounded LRU, so a
+request costs one cache read and no query. When the counter has moved the
+principal is reloaded; a token whose ``ver`` no longer matches the user's
+``token_version`` (role, verification, activation or password changed since
+it was issued) is rejected. Tokens issued without ``ver`` are accepted until
+the user's first such change.
+
+The counter only reaches every process when RESPONSE_CACHE_ALIAS is a
+shared backend, which ``check --deploy`` requires (users.E001). Cached
+principals also expire after AUTH_PRINCIPAL_CACHE_TTL seconds, so a change
+a process never hears about is picked up within that time.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from land_management import response_cache
+
+User = get_user_model()
+
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+class PrincipalCache:
+    """Thread-safe LRU of loaded users keyed by (user id, cache version), each kept for ``ttl`` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self.lock:
+            self.entries[key] = (user, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+principals = PrincipalCache(settings.AUTH_PRINCIPAL_CACHE_SIZE, settings.AUTH_PRINCIPAL_CACHE_TTL)
+
+
+def add_claims(token, user):
+    token['user_type'] = user.user_type
+    token['is_verified'] = user.is_verified
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+def check_token_version(token, user):
+    if token.get(TOKEN_VERSION_CLAIM, 0) != user.token_version:
+        raise exceptions.AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise exceptions.AuthenticationFailed('Token contained no recognizable user identification')
+
+        key = response_cache.version_key('user', user_id)
+        version = response_cache.current_versions([key])[key]
+        user = principals.get((user_id, version))
+        if user is None:
+            user = super().get_user(validated_token)
+            principals.set((user_id, version), user)
+        check_token_version(validated_token, user)
+        # Views may modify request.user; never hand out the shared instance
+        return copy.copy(user)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views: cache and database reads go through their async APIs."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise exceptions.AuthenticationFailed('Token contained no recognizable user identification')
+
+        key = response_cache.version_key('user', user_id)
+        version = (await response_cache.acurrent_versions([key]))[key]
+        user = principals.get((user_id, version))
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+            if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+                raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+            principals.set((user_id, version), user)
+        check_token_version(validated_token, user)
+        return copy.copy(user)
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Refuses to refresh a token revoked since it was issued."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).only(
+            'token_version', 'is_active'
+        ).first()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed('User not found or inactive', code='user_not_found')
+        check_token_version(refresh, user)
+        return super().validate(attrs)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries live in one process, so other workers never see them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, Tags.security, deploy=True)
+def check_shared_version_cache(app_configs, **kwargs):
+    """Token revocation relies on user version counters every worker can read."""
+    backend = settings.CACHES.get(settings.RESPONSE_CACHE_ALIAS, {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'RESPONSE_CACHE_ALIAS {settings.RESPONSE_CACHE_ALIAS!r} uses {backend}, which is not shared '
+            'between processes.',
+            hint='Point it at a shared backend such as Redis or Memcached, or revoked tokens and changed '
+                 'roles stay authorized in other workers for up to AUTH_PRINCIPAL_CACHE_TTL seconds.',
+            id='users.E001',
+        )]
+    return []
@@ -14,9 +14,37 @@ class User(AbstractUser):
     national_id = models.CharField(max_length=20, unique=True)
     blockchain_address = models.CharField(max_length=42, blank=True)  # For blockchain integration
     is_verified = models.BooleanField(default=False)
+    # Bumped whenever a change must revoke tokens issued earlier; see users.authentication
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+
+    # Changing any of these revokes existing tokens
+    TOKEN_FIELDS = ('user_type', 'is_verified', 'is_active', 'is_staff', 'is_superuser', 'password')
     
     class Meta:
         ordering = ['username']
+        indexes = [
+            models.Index(fields=['username', 'id'], name='user_keyset_idx'),
+        ]
         
     def __str__(self):
         return f"{self.get_full_name()} ({self.user_type})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_state = instance._loaded_token_state()
+        return instance
+
+    def _loaded_token_state(self):
+        # Deferred fields are left out rather than loaded
+        return {field: self.__dict__[field] for field in self.TOKEN_FIELDS if field in self.__dict__}
+
+    def save(self, *args, **kwargs):
+        previous = getattr(self, '_token_state', None)
+        if previous and any(self.__dict__.get(field, value) != value for field, value in previous.items()):
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._token_state = self._loaded_token_state()
@@ -1,9 +1,16 @@
-from django.test import TestCase
+from unittest import mock
+from django.core.checks import run_checks
+from django.test import TestCase, override_settings
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+from . import authentication
 
 User = get_user_model()
 
@@ -67,3 +74,132 @@ class AuthenticationTests(APITestCase):
         # Try to create duplicate
         response = self.client.post(self.register_url, self.user_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MeCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='dashboard',
+            password='DashPass123!',
+            first_name='Before',
+            national_id='dash123'
+        )
+        self.me_url = reverse('user-me')
+        self.client.force_authenticate(user=self.user)
+
+    def test_me_is_cached_until_the_user_is_saved(self):
+        """Test that me is served from cache and invalidated by saves"""
+        self.client.get(self.me_url)
+        # A write that bypasses signals is not seen, proving the response was cached
+        User.objects.filter(pk=self.user.pk).update(first_name='Sneaky')
+        response = self.client.get(self.me_url)
+        self.assertEqual(response.data['first_name'], 'Before')
+
+        self.user.first_name = 'After'
+        self.user.save()
+        response = self.client.get(self.me_url)
+        self.assertEqual(response.data['first_name'], 'After')
+
+    def test_bulk_verify_refreshes_cached_me(self):
+        """Test that bulk verifying users drops their cached me responses"""
+        self.client.get(self.me_url)
+        officer = User.objects.create_user(
+            username='officer', password='OfficerPass123!', user_type='LAND_OFFICER', national_id='officer123'
+        )
+        self.client.force_authenticate(user=officer)
+        response = self.client.post(reverse('user-bulk-verify'), {'filter': {'user_type': 'CITIZEN'}}, format='json')
+        self.assertEqual(response.data['verified'], 1)
+
+        self.user.refresh_from_db()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.me_url)
+        self.assertTrue(response.data['is_verified'])
+
+
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.password = 'CitizenPass123!'
+        self.user = User.objects.create_user(username='citizen', password=self.password, national_id='citizen123')
+        self.me_url = reverse('user-me')
+
+    def _login(self):
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'username': 'citizen', 'password': self.password,
+        }, format='json')
+        return response.data
+
+    def _me(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return self.client.get(self.me_url)
+
+    def test_tokens_carry_role_claims(self):
+        """Test that access tokens include the role, verification and version claims"""
+        token = AccessToken(self._login()['access'])
+        self.assertEqual((token['user_type'], token['is_verified'], token['ver']), ('CITIZEN', False, 0))
+
+    def test_cached_principal_skips_the_user_query(self):
+        """Test that a repeat request authenticates without querying the database"""
+        access = self._login()['access']
+        self._me(access)
+        with CaptureQueriesContext(connection) as context:
+            response = self._me(access)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_cached_principals_expire(self):
+        """Test that a change this process never heard about is picked up once the principal expires"""
+        access = self._login()['access']
+        self._me(access)
+        # As if another worker saved the user and bumped a counter this process cannot see
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self._me(access).status_code, 200)
+        later = authentication.time.monotonic() + authentication.principals.ttl + 1
+        with mock.patch.object(authentication.time, 'monotonic', return_value=later):
+            self.assertEqual(self._me(access).status_code, 401)
+
+    def test_deploy_check_requires_a_shared_version_cache(self):
+        """Test that check --deploy refuses a per-process cache for the user version counters"""
+        errors = [error.id for error in run_checks(include_deployment_checks=True)]
+        self.assertIn('users.E001', errors)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                              'LOCATION': 'redis://127.0.0.1:6379'}}
+        with override_settings(CACHES=shared):
+            errors = [error.id for error in run_checks(include_deployment_checks=True)]
+        self.assertNotIn('users.E001', errors)
+
+    def test_role_change_revokes_tokens(self):
+        """Test that changing a user's role rejects tokens issued before it"""
+        access = self._login()['access']
+        self._me(access)
+        self.user.user_type = 'NOTARY'
+        self.user.save()
+        self.assertEqual(self._me(access).status_code, 401)
+        response = self._me(self._login()['access'])
+        self.assertEqual(response.data['user_type'], 'NOTARY')
+
+    def test_password_change_revokes_access_and_refresh_tokens(self):
+        """Test that changing the password through the API revokes earlier tokens"""
+        tokens = self._login()
+        self._me(tokens['access'])
+        response = self.client.patch(
+            reverse('user-detail', kwargs={'pk': self.user.pk}), {'password': 'NewCitizenPass456!'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._me(tokens['access']).status_code, 401)
+        self.client.credentials()
+        response = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_bulk_verification_revokes_tokens(self):
+        """Test that verifying users in bulk rejects their earlier tokens"""
+        access = self._login()['access']
+        self._me(access)
+        User.objects.create_user(
+            username='officer', password='OfficerPass123!', user_type='LAND_OFFICER', national_id='officer123'
+        )
+        self.client.force_authenticate(user=User.objects.get(username='officer'))
+        self.client.post(reverse('user-bulk-verify'), {'ids': [self.user.pk]}, format='json')
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self._me(access).status_code, 401)
@@ -3,15 +3,25 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from .serializers import UserSerializer
+from django.db.models import F, Q
+from land_management.bulk import BulkVerifyMixin
+from land_management.fieldsets import ShapedQuerysetMixin
+from land_management import response_cache
+from land_management.instrumentation import TimedViewMixin
+from land_management.replicas import ReplicaReadsMixin
+from changes import feed as change_feed
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import api_view, permission_classes
 
 User = get_user_model()
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(TimedViewMixin, ReplicaReadsMixin, BulkVerifyMixin, ShapedQuerysetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budgets = {'list': 3, 'retrieve': 2, 'me': 1}
+    bulk_filter_fields = ('user_type', 'is_verified')
+    bulk_cache_namespace = 'user'
 
     def get_permissions(self):
         # Allow registration without authentication
@@ -25,19 +35,31 @@ class UserViewSet(viewsets.ModelViewSet):
             return User.objects.none()  # Return empty queryset for list view
             
         # For admin and land officers, show all users
+        queryset = self.shape_queryset(User.objects.all())
         if self.request.user.user_type in ['ADMIN', 'LAND_OFFICER']:
-            return User.objects.all()
+            return queryset
             
         # For regular users, only show their own profile
-        return User.objects.filter(id=self.request.user.id)
+        return queryset.filter(id=self.request.user.id)
+
+    def bulk_pending(self):
+        return Q(is_verified=False)
+
+    def bulk_changes(self, request):
+        # Verification changes the token claims, so revoke earlier tokens
+        return {'is_verified': True, 'token_version': F('token_version') + 1}
 
     @action(detail=False, methods=['get'])
     def me(self, request):
         """
         Returns the current authenticated user's data
         """
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        data = response_cache.fetch('user', request.user.pk, request)
+        if data is None:
+            versions = response_cache.dependency_versions([('user', request.user.pk)])
+            data = self.get_serializer(request.user).data
+            response_cache.store('user', request.user.pk, request, data, [request.user.pk], versions)
+        return Response(data)
         
     @action(detail=True, methods=['post'])
     def verify_user(self, request, pk=None):
@@ -46,5 +68,6 @@ class UserViewSet(viewsets.ModelViewSet):
         
         user = self.get_object()
         user.is_verified = True
+        change_feed.mark(user, 'VERIFIED', request.user)
         user.save()
         return Response({'status': 'verified'})
\ No newline at end of file